@@ -0,0 +1,17 @@
+"""
+仿真核心的基准测试，用法见__main__.py
+每个bench_*模块用benchmarks.common.benchmark注册基准测试
+"""
+from __future__ import annotations
+
+import importlib
+
+from benchmarks.common import BENCHMARKS, Benchmark, BenchmarkResult, benchmark, run_benchmark
+
+MODULES = ['bench_traj', 'bench_battle_area', 'bench_env', 'bench_bt']
+
+
+def load_benchmarks() -> list[Benchmark]:
+    for module in MODULES:
+        importlib.import_module(f'benchmarks.{module}')
+    return BENCHMARKS
@@ -0,0 +1,73 @@
+"""
+运行仿真核心的基准测试（在项目根目录下执行）：
+
+    python -m benchmarks                          # 运行所有基准测试
+    python -m benchmarks -k battle_area           # 只运行名称包含battle_area的
+    python -m benchmarks --json result.json       # 保存结果
+    python -m benchmarks --compare result.json    # 和之前保存的结果对比，变慢超过阈值的会标出来
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from benchmarks import load_benchmarks
+from benchmarks.common import run_benchmark
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks')
+parser.add_argument('-k', '--keyword', type=str, default='', help='只运行名称包含该关键字（或者分组等于该关键字）的基准测试')
+parser.add_argument('--min-time', type=float, default=0.2, help='每轮最少运行的秒数')
+parser.add_argument('--repeat', type=int, default=5, help='重复轮数，结果取最快的一轮')
+parser.add_argument('--json', type=str, default='', help='结果保存路径')
+parser.add_argument('--compare', type=str, default='', help='对比的基准结果（--json保存的文件）')
+parser.add_argument('--threshold', type=float, default=0.2, help='比基准结果慢多少（比例）算性能回退')
+
+
+def format_row(columns: list, widths: list[int]) -> str:
+    return '  '.join(str(c).ljust(w) if i == 0 else str(c).rjust(w) for i, (c, w) in enumerate(zip(columns, widths)))
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parser.parse_args(argv)
+    baseline = { }
+    if args.compare != '':
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = { item['name']: item for item in json.load(f)['results'] }
+
+    widths = [42, 12, 14, 14, 10]
+    print(format_row(['name', 'us/call', 'calls/s', 'sim-s/wall-s', 'change'], widths))
+    results = []
+    regressions = []
+    for bench in load_benchmarks():
+        if args.keyword not in bench.name and args.keyword != bench.group:
+            continue
+        result = run_benchmark(bench, min_time=args.min_time, repeat=args.repeat)
+        results.append(result)
+        change = ''
+        if bench.name in baseline:
+            ratio = result.best / baseline[bench.name]['best'] - 1
+            change = f'{ratio:+.0%}'
+            if ratio > args.threshold:
+                regressions.append(bench.name)
+                change += ' !'
+        print(format_row([
+            bench.name,
+            f'{result.best * 1e6:.1f}',
+            f'{result.calls_per_sec:.1f}',
+            f'{result.sim_speed:.1f}' if result.sim_time > 0 else '-',
+            change
+        ], widths), flush=True)
+
+    if args.json != '':
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({ 'results': [result.to_dict() for result in results] }, f, indent=4, ensure_ascii=False)
+
+    if len(regressions) > 0:
+        print(f'性能回退（慢了{args.threshold:.0%}以上）: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
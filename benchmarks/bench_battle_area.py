@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from benchmarks.common import benchmark, build_options, drive_agents, seed, warm_area
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.options import Options
+
+DELTA_TIME = Options.delta_time
+SIZES = [1, 4, 16]
+
+
+def update_case(agents: int, missiles: bool):
+    """
+    agents v agents对战中的一次BattleArea.update
+    missiles为True时每隔一段时间所有飞机都朝最近的敌机发射导弹，保持空中一直有导弹
+    """
+
+    def setup():
+        seed()
+        area = BattleArea(options=build_options(agents))
+        area.episode_start()
+        warm_area(area, fire=missiles)
+        step = 0
+
+        def case():
+            nonlocal step
+            step += 1
+            if step % 20 == 0:
+                drive_agents(area, fire=missiles)
+            area.update()
+
+        return case
+
+    return setup
+
+
+for _agents in SIZES:
+    for _missiles in [False, True]:
+        benchmark(name=f'battle_area_update_{_agents}v{_agents}{"_missiles" if _missiles else ""}',
+                  sim_time=DELTA_TIME)(update_case(_agents, _missiles))
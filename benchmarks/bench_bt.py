@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from benchmarks.common import benchmark, build_options, seed
+from pydogfight.core.options import Options
+
+UPDATE_INTERVAL = Options.update_interval
+
+TREES = {
+    'greedy'      : 'float_array/policy/greedy.xml',  # 追击最近的敌机并发射导弹
+    'greedy_evade': 'float_array/policy/greedy_evade.xml',  # 追击的同时规避来袭导弹
+}
+
+
+def build_policy(tree: str, agents: int):
+    """所有飞机都使用同一棵行为树（和scripts/float_array下的对战配置一致）"""
+    import bt
+    import utils
+    from pydogfight.envs import Dogfight2dEnv
+    from pydogfight.policy import MultiAgentPolicy
+
+    seed()
+    env = Dogfight2dEnv(options=build_options(agents, aircraft_fire_missile_interval=15))
+    env.reset()
+    builder = bt.CustomBTBuilder(folders=['scripts'])
+    policies = [utils.build_bt_policy(env=env, builder=builder, agent_name=agent_name, filepath=TREES[tree],
+                                      context={ 'train': False })
+                for agent_name in env.options.agents()]
+    policy = MultiAgentPolicy(policies=policies)
+    # 先跑一段时间，让飞机接近、导弹飞起来
+    for _ in range(30):
+        policy.take_action()
+        policy.put_action()
+        env.update()
+    return env, policy
+
+
+def decision_case(tree: str, agents: int):
+    """一次完整的决策周期：所有飞机的行为树tick、动作下发、环境更新update_interval"""
+
+    def setup():
+        env, policy = build_policy(tree, agents)
+
+        def case():
+            policy.take_action()
+            policy.put_action()
+            env.update()
+
+        return case
+
+    return setup
+
+
+def tick_case(tree: str, agents: int):
+    """只有所有飞机的行为树tick（战场状态不变）"""
+
+    def setup():
+        env, policy = build_policy(tree, agents)
+
+        def case():
+            policy.take_action()
+            for p in policy.policies:
+                # 丢掉产生的动作，避免动作堆积
+                while not p.actions.empty():
+                    p.actions.get_nowait()
+
+        return case
+
+    return setup
+
+
+for _tree in TREES:
+    for _agents in [1, 4]:
+        benchmark(name=f'bt_{_tree}_{_agents}v{_agents}', sim_time=UPDATE_INTERVAL)(decision_case(_tree, _agents))
+        benchmark(name=f'bt_{_tree}_tick_{_agents}v{_agents}')(tick_case(_tree, _agents))
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import numpy as np
+
+from benchmarks.common import benchmark, build_options, seed, warm_area
+from pydogfight.core.options import Options
+from pydogfight.envs import Dogfight2dEnv, Dogfight2dVecEnv
+
+UPDATE_INTERVAL = Options.update_interval  # 每次step推进的仿真时间
+
+
+def build_env(agents: int) -> Dogfight2dEnv:
+    seed()
+    env = Dogfight2dEnv(options=build_options(agents))
+    env.reset()
+    warm_area(env.battle_area, fire=True)
+    return env
+
+
+def gen_obs_case(agents: int):
+    def setup():
+        env = build_env(agents)
+        obs_utils = env.obs_utils_dict[env.options.red_agents[0]]
+        return obs_utils.gen_obs
+
+    return setup
+
+
+def gen_all_obs_case(agents: int):
+    def setup():
+        env = build_env(agents)
+        out = np.zeros((len(env.options.agents()), *env.agent_observation_space.shape), dtype=np.float32)
+        return lambda: env.gen_all_obs(out=out)
+
+    return setup
+
+
+def step_case(agents: int):
+    """Dogfight2dEnv.step（推进update_interval的仿真时间），动作是随机的飞行/发射导弹目标点，每10步重新选择一次"""
+
+    def setup():
+        env = build_env(agents)
+        rng = np.random.default_rng(0)
+        env.action_space.seed(0)
+        step = 0
+        action = np.zeros(env.action_space.shape)
+
+        def case():
+            nonlocal step
+            if step % 10 == 0:
+                action[:] = env.action_space.sample()
+                action[:, 0] = rng.choice([1, 2], size=len(action))
+            step += 1
+            env.step(action)
+
+        return case
+
+    return setup
+
+
+def random_actions(shape: tuple[int, ...], space, rng: np.random.Generator) -> np.ndarray:
+    """随机的飞行/发射导弹目标点，形状(..., agents, 3)"""
+    action = np.zeros(shape)
+    for index in np.ndindex(*shape[:-2]):
+        action[index] = space.sample()
+    action[..., 0] = rng.choice([1, 2], size=shape[:-1])
+    return action
+
+
+def vec_step_case(num_envs: int, agents: int):
+    """Dogfight2dVecEnv.step：num_envs场对战合并仿真内核的计算一起推进"""
+
+    def setup():
+        env = Dogfight2dVecEnv(num_envs=num_envs, options=build_options(agents))
+        for battle in env.envs:
+            # 和build_env一样准备每场对战，和sync_vec_env_step的对战过程一致
+            seed()
+            battle.reset()
+            warm_area(battle.battle_area, fire=True)
+        rng = np.random.default_rng(0)
+        space = env.envs[0].action_space
+        space.seed(0)
+        step = 0
+        action = np.zeros(env.action_space.shape)
+
+        def case():
+            nonlocal step
+            if step % 10 == 0:
+                action[:] = random_actions(action.shape, space, rng)
+            step += 1
+            env.step(action)
+
+        return case
+
+    return setup
+
+
+def sync_vec_step_case(num_envs: int, agents: int):
+    """同样的对战用gymnasium的SyncVectorEnv逐场step，作为vec_env_step的对照"""
+
+    def setup():
+        from gymnasium.vector import SyncVectorEnv
+        seed()
+        battles = [build_env(agents) for _ in range(num_envs)]
+        env = SyncVectorEnv([lambda battle=battle: battle for battle in battles])
+        rng = np.random.default_rng(0)
+        space = battles[0].action_space
+        space.seed(0)
+        step = 0
+        action = np.zeros((num_envs, *space.shape))
+
+        def case():
+            nonlocal step
+            if step % 10 == 0:
+                action[:] = random_actions(action.shape, space, rng)
+            step += 1
+            env.step(action)
+
+        return case
+
+    return setup
+
+
+for _agents in [1, 4, 16]:
+    benchmark(name=f'obs_gen_obs_{_agents}v{_agents}')(gen_obs_case(_agents))
+    benchmark(name=f'obs_gen_all_obs_{_agents}v{_agents}')(gen_all_obs_case(_agents))
+    benchmark(name=f'env_step_{_agents}v{_agents}', sim_time=UPDATE_INTERVAL)(step_case(_agents))
+
+for _num_envs, _agents in [(8, 1), (8, 4), (32, 1)]:
+    benchmark(name=f'vec_env_step_{_num_envs}x{_agents}v{_agents}', sim_time=UPDATE_INTERVAL * _num_envs)(
+            vec_step_case(_num_envs, _agents))
+    benchmark(name=f'sync_vec_env_step_{_num_envs}x{_agents}v{_agents}', sim_time=UPDATE_INTERVAL * _num_envs)(
+            sync_vec_step_case(_num_envs, _agents))
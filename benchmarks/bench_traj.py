@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import numpy as np
+
+from benchmarks.common import benchmark, seed
+from pydogfight.core.options import Options
+from pydogfight.utils.intercept import optimal_predict_intercept_point
+from pydogfight.utils.models import Waypoint
+from pydogfight.utils.path_lut import OptimalPathLengthLUT
+from pydogfight.utils.traj import calc_optimal_path
+
+SAMPLES = 256
+
+
+def random_waypoints(rng: np.random.Generator) -> list[Waypoint]:
+    return [Waypoint.build(x, y, psi) for x, y, psi in zip(
+            rng.uniform(-50000, 50000, SAMPLES), rng.uniform(-50000, 50000, SAMPLES), rng.uniform(-180, 180, SAMPLES))]
+
+
+@benchmark()
+def calc_optimal_path_single():
+    """单个起点到目标点的最短路径"""
+    rng = np.random.default_rng(0)
+    starts = random_waypoints(rng)
+    targets = rng.uniform(-50000, 50000, size=(SAMPLES, 2))
+    k = 0
+
+    def case():
+        nonlocal k
+        k = (k + 1) % SAMPLES
+        calc_optimal_path(starts[k], targets[k], 5000)
+
+    return case
+
+
+def intercept_case(lut: OptimalPathLengthLUT | None):
+    seed()
+    options = Options()
+    rng = np.random.default_rng(0)
+    selves = random_waypoints(rng)
+    targets = random_waypoints(rng)
+    k = 0
+
+    def case():
+        nonlocal k
+        k = (k + 1) % SAMPLES
+        optimal_predict_intercept_point(
+                self_wpt=selves[k], self_speed=options.missile_speed,
+                self_turn_radius=options.missile_min_turn_radius,
+                target_wpt=targets[k], target_speed=options.aircraft_speed, lut=lut)
+
+    return case
+
+
+@benchmark()
+def optimal_predict_intercept_point_exact():
+    """导弹拦截点（逐点计算路径长度）"""
+    return intercept_case(lut=None)
+
+
+@benchmark()
+def optimal_predict_intercept_point_lut():
+    """导弹拦截点（使用路径长度查找表，即开启options.missile_path_lut时的仿真）"""
+    options = Options()
+    options.missile_path_lut = True
+    return intercept_case(lut=OptimalPathLengthLUT.for_options(options))
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import dataclasses
+import gc
+import time
+import typing
+
+import numpy as np
+
+from pydogfight.core.actions import Actions
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.options import Options
+from pydogfight.core.world_obj import Aircraft
+
+BenchmarkCase = typing.Callable[[], None]
+
+
+@dataclasses.dataclass
+class Benchmark:
+    """
+    一个基准测试：setup返回每次调用执行一步的函数，sim_time为每一步推进的仿真时间（秒，不涉及仿真时间的为0）
+    group默认是所在模块名去掉bench_前缀，例如traj、battle_area
+    """
+    name: str
+    setup: typing.Callable[[], BenchmarkCase]
+    sim_time: float = 0
+    group: str = ''
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    name: str
+    calls: int  # 每轮调用次数
+    times: list[float]  # 每轮耗时（秒）
+    sim_time: float = 0
+
+    @property
+    def best(self) -> float:
+        """最快一轮的单次调用耗时（秒）"""
+        return min(self.times) / self.calls
+
+    @property
+    def median(self) -> float:
+        return float(np.median(self.times)) / self.calls
+
+    @property
+    def calls_per_sec(self) -> float:
+        return 1 / self.best
+
+    @property
+    def sim_speed(self) -> float:
+        """仿真时间 / 墙上时间"""
+        return self.sim_time / self.best
+
+    def to_dict(self) -> dict:
+        return {
+            'name'         : self.name,
+            'calls'        : self.calls,
+            'best'         : self.best,
+            'median'       : self.median,
+            'calls_per_sec': self.calls_per_sec,
+            'sim_speed'    : self.sim_speed,
+        }
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str = '', sim_time: float = 0, group: str = ''):
+    """
+    注册基准测试的装饰器，被装饰的函数做准备工作，返回每次调用执行一步的函数
+    """
+
+    def decorator(setup: typing.Callable[[], BenchmarkCase]):
+        BENCHMARKS.append(Benchmark(name=name or setup.__name__, setup=setup, sim_time=sim_time,
+                                    group=group or setup.__module__.split('.')[-1].removeprefix('bench_')))
+        return setup
+
+    return decorator
+
+
+def run_benchmark(bench: Benchmark, min_time: float = 0.2, repeat: int = 5, warmup: int = 3) -> BenchmarkResult:
+    """
+    先预热warmup次，再估计每轮调用次数使得一轮至少min_time秒，重复repeat轮
+    """
+    case = bench.setup()
+    for _ in range(warmup):
+        case()
+
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            case()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        calls *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    times = [elapsed]
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(calls):
+                case()
+            times.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return BenchmarkResult(name=bench.name, calls=calls, times=times, sim_time=bench.sim_time)
+
+
+def build_options(agents: int, **kwargs) -> Options:
+    """agents v agents的对战配置，飞机无敌、油量和导弹无限，保证测试过程中战场规模不变"""
+    options = Options()
+    options.red_agents = [f'red_{i + 1}' for i in range(agents)]
+    options.blue_agents = [f'blue_{i + 1}' for i in range(agents)]
+    options.indestructible = True
+    options.aircraft_missile_count = 10 ** 6
+    options.aircraft_fuel_capacity = 10 ** 9
+    options.max_duration = 10 ** 9
+    for key, value in kwargs.items():
+        setattr(options, key, value)
+    return options
+
+
+def drive_agents(area: BattleArea, fire: bool,
+                 target: typing.Callable[[Aircraft, Aircraft], tuple[float, float]] | None = None):
+    """
+    每架飞机飞向最近的敌机，fire为True时同时朝它发射导弹
+    :param target: target(agent, enemy) -> 飞向的位置，默认为敌机的位置
+    """
+    for agent in area.agents:
+        enemy = area.find_nearest_enemy(agent.name, ignore_radar=True)
+        if agent.destroyed or enemy is None:
+            continue
+        x, y = (enemy.waypoint.x, enemy.waypoint.y) if target is None else target(agent, enemy)
+        agent.put_action((Actions.go_to_location, x, y))
+        if fire:
+            agent.put_action((Actions.fire_missile, enemy.waypoint.x, enemy.waypoint.y))
+
+
+def warm_area(area: BattleArea, fire: bool, steps: int = 200, interval: int = 20):
+    """先跑一段时间，让飞机接近、导弹飞起来"""
+    for i in range(steps):
+        if i % interval == 0:
+            drive_agents(area, fire=fire)
+        area.update()
+
+
+def seed(value: int = 0):
+    import random
+    random.seed(value)
+    np.random.seed(value)
@@ -6,7 +6,10 @@ import argparse
 from pydogfight import Options
 import time
 import json
-import threading
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
 
 parser = argparse.ArgumentParser()
 # 批量执行脚本
@@ -22,26 +25,22 @@ parser.add_argument('--train', action='store_true',
 parser.add_argument('--output', type=str, default='', help='工作输出目录')
 parser.add_argument('--episodes', type=int, default=0, help='对战场次')
 
-args = parser.parse_args()
+# 多个配置文件时使用进程池并行执行，每个配置文件在一个进程里跑完所有的对战
+parser.add_argument('--workers', type=int, default=0,
+                    help='并行执行的进程数，默认为CPU核数（不超过配置文件的数量）')
+parser.add_argument('--seed', type=int, default=None,
+                    help='随机种子，第i个配置文件使用seed+i，不设置则不固定随机种子')
+parser.add_argument('--eval-workers', type=int, default=0,
+                    help='评估模式（不训练）下把一个配置文件的对战分给多少个进程并行执行，0代表不拆分')
 
-threads = []
+_progress_queue = None  # 子进程向主进程汇报进度的队列
 
 
-def run(files: list[str]):
-    global threads
-    if len(files) == 1:
-        run_one(files[0])
-        return
-    for file in files:
-        if 'base' in file:
-            continue
-        if file.endswith('.yaml'):
-            x = threading.Thread(target=run_one, args=(file,))
-            threads.append(x)
-            x.start()
+def collect_files(files: list[str]) -> list[str]:
+    return [file for file in files if 'base' not in file and file.endswith('.yaml')]
 
 
-def run_one(path: str):
+def load_config(path: str, args: argparse.Namespace) -> dict:
     filename = os.path.basename(path).split('.')[0]
     context = {
         'filename': filename,
@@ -55,15 +54,129 @@ def run_one(path: str):
         config['episodes'] = args.episodes
     if args.render:
         config = utils.merge_config(config, { 'options': { 'render': True } })
-    if config['episodes'] > 0:
-        manager = utils.BTManager(config=config, train=args.train)
+    return config
+
+
+def seed_everything(seed: int | None):
+    if seed is None:
+        return
+    from stable_baselines3.common.utils import set_random_seed
+    set_random_seed(seed)
+
+
+def run_manager(manager: utils.BTManager, config: dict, args: argparse.Namespace, seed: int | None):
+    if args.eval_workers > 1 and not args.train:
+        manager.run_parallel(episodes=config['episodes'], workers=args.eval_workers, seed=seed)
+    else:
         manager.run(episodes=config['episodes'])
 
+
+def run_one(path: str, args: argparse.Namespace, seed: int | None = None):
+    """在当前进程中执行一个配置文件"""
+    seed_everything(seed)
+    config = load_config(path, args)
+    if config['episodes'] > 0:
+        manager = utils.BTManager(config=config, train=args.train, display_tree=args.display_tree)
+        run_manager(manager, config, args, seed)
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _run_worker(job_id: int, path: str, args: argparse.Namespace, seed: int | None):
+    """
+    子进程执行一个配置文件，进度通过队列汇报给主进程
+    标准输出重定向到本次运行目录下的worker.log，避免多个进程的输出交错在一起
+    """
+    seed_everything(seed)
+    config = load_config(path, args)
+    if config['episodes'] <= 0:
+        return None
+    manager = utils.BTManager(config=config, train=args.train, display_tree=args.display_tree)
+    manager.show_pbar = False
+    manager.write('seed.txt', str(seed))
+    _progress_queue.put(('start', job_id, manager.output_run_id, config['episodes']))
+
+    def on_progress(m: utils.BTManager):
+        _progress_queue.put(('episode', job_id, m.env.episode, m.pbar.postfix))
+
+    manager.add_progress_handler(on_progress)
+
+    stdout, stderr = sys.stdout, sys.stderr
+    with open(os.path.join(manager.output_run_id, 'worker.log'), 'a', encoding='utf-8') as log:
+        sys.stdout = sys.stderr = log
+        try:
+            run_manager(manager, config, args, seed)
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+    _progress_queue.put(('end', job_id, manager.output_run_id, time.time() - manager.start_time))
+    return manager.output_run_id
+
+
+def run_pool(files: list[str], args: argparse.Namespace, workers: int):
+    """用进程池并行执行多个配置文件，主进程负责汇总显示每个配置的进度"""
+    ctx = multiprocessing.get_context('spawn')  # 不继承主进程的pygame/torch状态
+    progress_queue = ctx.Queue()
+    pbars: dict[int, tqdm] = { }
+    errors = []
+
+    def handle(message):
+        kind, job_id = message[0], message[1]
+        if kind == 'start':
+            pbars[job_id] = tqdm(total=message[3], desc=f'[{message[2]}] train={args.train}', position=job_id)
+        elif kind == 'episode':
+            pbar = pbars[job_id]
+            pbar.set_postfix_str(message[3] or '', refresh=False)
+            pbar.update(message[2] - pbar.n)
+        elif kind == 'end':
+            pbars[job_id].close()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(progress_queue,)) as executor:
+        futures = {
+            executor.submit(_run_worker, job_id, path, args, None if args.seed is None else args.seed + job_id): path
+            for job_id, path in enumerate(files)
+        }
+        while any(not future.done() for future in futures):
+            try:
+                handle(progress_queue.get(timeout=0.5))
+            except queue.Empty:
+                pass
+        while not progress_queue.empty():
+            handle(progress_queue.get())
+
+        for future, path in futures.items():
+            if future.exception() is not None:
+                errors.append((path, future.exception()))
+
+    for pbar in pbars.values():
+        pbar.close()
+    for path, e in errors:
+        print(f'{path} 执行失败: {e!r}')
+    return errors
+
+
+def run(files: list[str], args: argparse.Namespace):
+    if len(files) == 1:
+        run_one(files[0], args, seed=args.seed)
+        return
+    files = collect_files(files)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    workers = min(workers, len(files))
+    if workers <= 1:
+        for i, file in enumerate(files):
+            run_one(file, args, seed=None if args.seed is None else args.seed + i)
+        return
+    errors = run_pool(files, args, workers=workers)
+    if len(errors) > 0:
+        sys.exit(1)
+
+
 def main():
-    run(args.files)
-    # 等待所有线程完成
-    for index, thread in enumerate(threads):
-        thread.join()
+    args = parser.parse_args()
+    run(args.files, args)
 
 
 if __name__ == '__main__':
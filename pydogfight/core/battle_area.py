@@ -2,8 +2,31 @@ from __future__ import annotations
 
 from pydogfight.core.world_obj import *
 from pydogfight.core.options import Options
+from pydogfight.core.entity_store import EntityStore
+from pydogfight.core.spatial_index import UniformGridIndex
+from pydogfight.core.relation_matrix import RelationMatrix
+from pydogfight.core.kernel import SimulationKernel, MoveRequest, RerouteRequest, KernelRequest, home_contacts, \
+    collision_pairs
+from pydogfight.core.constants import OBJECT_TO_IDX
+from pydogfight.core.events import EventBus, EventType, DESTROY_REASON_TO_IDX
 from collections import defaultdict
 import typing
+import numpy as np
+
+
+EPISODE_STAT_KEYS = [
+    'destroyed_count',
+    'missile_fired_count',
+    'missile_fire_fail_count',
+    'missile_hit_self_count',
+    'missile_hit_enemy_count',
+    'missile_miss_count',
+    'missile_evade_success_count',
+    'home_returned_count',
+    'missile_count',
+    'missile_depletion_count',
+    'aircraft_collided_count',
+]  # 每轮对战结束时统计的飞机数据
 
 
 class BattleArea:
@@ -13,7 +36,21 @@ class BattleArea:
         self.time = 0  # 对战时长
         self.accum_time = 0  # 对战累积时长
         self.objs: dict[str, WorldObj] = { }
+        self.store = EntityStore()  # 实体状态的列式存储
+        self.kernel = SimulationKernel(backend=options.kernel_backend)  # 批量计算移动、燃油等的仿真内核
         self.cache = { }  # 缓存
+        self.colliding_pairs: set[tuple[int, int]] = set()  # 上一次碰撞检查时处于碰撞状态的槽位对
+        self.spatial_index = UniformGridIndex(cell_size=options.aircraft_radar_radius)  # 雷达查询用的空间索引
+        self.spatial_index_version = -1  # 空间索引对应的store版本
+        self.radar_cache = { }  # 雷达查询结果缓存，store发生变化后失效
+        self._relation: RelationMatrix | None = None  # 实体两两之间的相对关系
+        self.updating = False  # 是否正在update
+        self.events = EventBus()  # 仿真事件（发射导弹、命中、摧毁等），每一局的事件记录在self.events.log中
+        # 剩余实体数量和飞机被摧毁次数，在add_obj/remove_obj/实体被摧毁时增量维护，不需要每次遍历所有实体
+        self._remain_count = self.empty_remain_count()
+        self._destroyed_count = { 'red': 0, 'blue': 0 }
+        self._count_version = 0  # 计数每次变化都会递增
+        self._winner_cache: tuple[tuple, str] | None = None  # ((time, 计数版本), winner)
         self.stats = {
             'episode': 0,
             'red'    : {
@@ -40,11 +77,33 @@ class BattleArea:
         return self.stats['episode']
 
     def episode_end(self):
-        self.accum_time += self.time
-        self.stats['episode'] += 1
+        self.merge_episode_stats(self.episode_stats())
+
+    def episode_stats(self) -> dict:
+        """
+        本轮对战的统计数据（可以序列化，多进程评估时由子进程发给主进程）
+        :return: { winner, time, agent: { agent_name: { color, survival_time, EPISODE_STAT_KEYS... } } }
+        """
         winner = self.winner
         if winner == '':
             winner = 'draw'
+        return {
+            'winner': winner,
+            'time'  : self.time,
+            'agent' : {
+                agent.name: {
+                    'color'        : agent.color,
+                    'survival_time': agent.survival_time,
+                    **{ key: getattr(agent, key) for key in EPISODE_STAT_KEYS }
+                } for agent in self.agents
+            }
+        }
+
+    def merge_episode_stats(self, episode_stats: dict):
+        """将一轮对战的统计数据（episode_stats的返回值）累积到self.stats"""
+        self.accum_time += episode_stats['time']
+        self.stats['episode'] += 1
+        winner = episode_stats['winner']
         self.stats['winner'] = winner
 
         if winner == 'red':
@@ -67,33 +126,29 @@ class BattleArea:
             'agent': { }
         }
 
-        KEYS = [
-            'destroyed_count',
-            'missile_fired_count',
-            'missile_fire_fail_count',
-            'missile_hit_self_count',
-            'missile_hit_enemy_count',
-            'missile_miss_count',
-            'missile_evade_success_count',
-            'home_returned_count',
-            'missile_count',
-            'missile_depletion_count',
-            'aircraft_collided_count',
-        ]
-
-        for agent in self.agents:
-            if agent.name not in new_stats['agent']:
-                new_stats['agent'][agent.name] = { }
-
-            for key in KEYS:
-                new_stats['agent'][agent.name][key] = getattr(agent, key)
-                dict_incr(new_stats[agent.color], key=key, value=getattr(agent, key))
+        for agent_name, agent_stats in episode_stats['agent'].items():
+            if agent_name not in new_stats['agent']:
+                new_stats['agent'][agent_name] = { }
+
+            for key in EPISODE_STAT_KEYS:
+                new_stats['agent'][agent_name][key] = agent_stats[key]
+                dict_incr(new_stats[agent_stats['color']], key=key, value=agent_stats[key])
         merge_tow_dicts(new_stats, self.stats)
 
-    def episode_start(self):
+    def clear(self):
+        """清空战场上的实体和这一局的状态（不会加载新的实体）"""
         self.time = 0
         self.objs.clear()
+        self.store.clear()
         self.cache.clear()
+        self.colliding_pairs.clear()
+        self.events.clear()
+        self._remain_count = self.empty_remain_count()
+        self._destroyed_count = { 'red': 0, 'blue': 0 }
+        self._count_version += 1
+
+    def episode_start(self):
+        self.clear()
 
         # 加载
 
@@ -145,14 +200,54 @@ class BattleArea:
                     waypoint=Waypoint(data=wpt)))
 
     def add_obj(self, obj: WorldObj):
+        if obj.name in self.objs:
+            old = self.objs[obj.name]
+            self._count_obj(old, -1)
+            self.store.remove(old)
         self.objs[obj.name] = obj
         obj.attach(battle_area=self)
+        self.store.add(obj)
+        self._count_obj(obj, 1)
 
     def get_obj(self, name: str) -> WorldObj:
         return self.objs[name]
 
     def remove_obj(self, obj: WorldObj) -> None:
         del self.objs[obj.name]
+        self._count_obj(obj, -1)
+        self.store.remove(obj)
+
+    def _count_obj(self, obj: WorldObj, delta: int):
+        """实体加入/离开战场时更新剩余数量（被摧毁的实体已经在on_obj_destroyed中减掉了）"""
+        if isinstance(obj, Aircraft):
+            self._destroyed_count[obj.color] += delta * obj.destroyed_count
+        if obj.destroyed:
+            return
+        count = self._remain_count.setdefault(obj.type, { 'red': 0, 'blue': 0 })
+        count[obj.color] = count.get(obj.color, 0) + delta
+        self._count_version += 1
+
+    def on_obj_destroyed(self, obj: WorldObj, newly_destroyed: bool, reason: str = '', source=None):
+        """
+        实体被摧毁时的回调（由WorldObj.destroy调用）
+        :param newly_destroyed: 是否由未摧毁变成了摧毁（无敌模式下只会增加被摧毁次数）
+        :param reason: 摧毁原因
+        :param source: 造成摧毁的实体名称
+        """
+        if self.objs.get(obj.name) is not obj:
+            return
+        if isinstance(obj, Aircraft):
+            self._destroyed_count[obj.color] += 1
+        if newly_destroyed:
+            self._remain_count[obj.type][obj.color] -= 1
+        self._count_version += 1
+        self.emit(EventType.DESTROYED, obj=obj, other=self.objs.get(source) if isinstance(source, str) else None,
+                  value=DESTROY_REASON_TO_IDX.get(reason, -1))
+
+    def emit(self, type: EventType, obj: WorldObj, other: WorldObj | None = None, missile: WorldObj | None = None,
+             value: float = 0):
+        """发出仿真事件，时间为当前的对战时间"""
+        self.events.emit(type=type, time=self.time, obj=obj, other=other, missile=missile, value=value)
 
     @property
     def agents(self) -> list[Aircraft]:
@@ -189,50 +284,168 @@ class BattleArea:
         for obj in self.objs.values():
             obj.render(screen)
 
+    def render_states(self) -> list[dict]:
+        """所有物体的render_state（按照渲染顺序）"""
+        return [obj.render_state() for obj in self.objs.values()]
+
+    @classmethod
+    def render_from_states(cls, options: Options, screen, states: list[dict]):
+        """根据render_states画出所有物体，结果和render一致"""
+        for state in states:
+            RENDER_CLASSES[state['type']].render_from_state(options=options, screen=screen, state=state)
+
     ### 战场环境更新，每一轮每个物体只消费一个行为 ###
     def update(self):
         """
+        按照基地、飞机、导弹的顺序更新（和实体加入战场的顺序一致），数值计算由self.kernel批量完成，
+        事件按照实体的顺序回调，结果和逐个实体更新一致
         :return:
         """
-        not_destroyed_objs = [obj for obj in self.objs.values() if not obj.destroyed]
-        for obj in not_destroyed_objs:
-            obj.update(delta_time=self.options.delta_time)
+        self.kernel.run(self.update_stages())
 
-        # 检查碰撞，通过缓存来确保只触发一次（需要先进入非碰撞状态才能触发碰撞）
-        for i in range(len(not_destroyed_objs)):
-            obj_1 = not_destroyed_objs[i]
-            if obj_1.collision_radius <= 0:
-                continue
-            for j in range(i + 1, len(not_destroyed_objs)):
-                obj_2 = not_destroyed_objs[j]
-
-                if obj_2.collision_radius <= 0:
-                    continue
-
-                new_collided = obj_1.will_collide(obj_2)
-                collided_key = f'collided-{obj_1.name}-{obj_2.name}'
-                old_collided = self.cache.get(collided_key, None)
-                if new_collided and old_collided == False:
-                    obj_1.on_collision(obj_2)
-                    obj_2.on_collision(obj_1)
-                self.cache[collided_key] = new_collided
+    def update_stages(self) -> typing.Iterator[KernelRequest]:
+        """
+        update的分阶段版本：移动、重新规划航迹作为请求yield出去，由调用方执行之后再继续
+        SimulationKernel.run_batched可以把多场对战同一阶段的请求合并成一次计算
+        """
+        store = self.store
+        delta_time = self.options.delta_time
+        not_destroyed_indices = store.indices(alive=True)
+        route_version = store.route_version[:store.size].copy()
+        self.updating = True
+        try:
+            for index in not_destroyed_indices.tolist():
+                obj = store.objs[index]
+                if not isinstance(obj, (Aircraft, Missile)):
+                    obj.update(delta_time=delta_time)
+            self.update_homes()
+            yield from self.update_aircraft(not_destroyed_indices)
+            yield from self.update_missiles(not_destroyed_indices)
+        finally:
+            self.updating = False
+
+        if self.options.render_enabled():
+            changed = np.flatnonzero(store.route_version[:len(route_version)] != route_version)
+            for index in changed.tolist():
+                if store.objs[index] is not None:
+                    store.objs[index].on_route_changed()
+
+        self.update_collision(not_destroyed_indices)
 
         # 移除掉被摧毁的导弹
-        destroyed_objs = [obj for obj in self.objs.values() if obj.destroyed]
-
-        for obj in destroyed_objs:
-            if isinstance(obj, Missile):
-                self.remove_obj(obj)
-
-        self.time += self.options.delta_time
-
-    @property
-    def remain_count(self) -> dict:
+        missile_indices = store.indices(type='missile')
+        for index in missile_indices[store.destroyed[missile_indices]]:
+            self.remove_obj(store.objs[index])
+
+        self.time += delta_time
+
+    def update_homes(self):
+        """检查飞机是否进出基地的范围（用飞机这一步移动之前的位置）"""
+        store = self.store
+        home_indices = store.indices(type='home', alive=True)
+        aircraft_indices = store.indices(type='aircraft')
+        if len(home_indices) == 0 or len(aircraft_indices) == 0:
+            return
+        inside = home_contacts(
+                home_x=store.x[home_indices], home_y=store.y[home_indices],
+                home_radius=np.array([store.objs[index].radius for index in home_indices]),
+                x=store.x[aircraft_indices], y=store.y[aircraft_indices])
+        aircraft = [store.objs[index] for index in aircraft_indices]
+        for k, index in enumerate(home_indices.tolist()):
+            store.objs[index].update_contacts(aircraft=aircraft, inside=inside[k].tolist())
+
+    def update_aircraft(self, indices: np.ndarray) -> typing.Iterator[KernelRequest]:
         """
-        获取剩余实体数量
-        :return:
+        飞机先依次执行动作，再由仿真内核批量移动、检查边界、消耗燃油（update_stages的一个阶段）
+        发射导弹时需要读取前面的飞机移动之后的位置，所以在发射导弹之前先把前面的飞机更新完
+        :param indices: 这一步开始时没有被摧毁的实体槽位
+        """
+        store = self.store
+        pending = []
+        for index in indices[store.type[indices] == OBJECT_TO_IDX['aircraft']].tolist():
+            obj = store.objs[index]
+            if len(pending) > 0 and obj.has_pending_fire_missile():
+                yield from self._move_aircraft(np.array(pending))
+                pending = []
+            obj.update(delta_time=self.options.delta_time)
+            pending.append(index)
+        yield from self._move_aircraft(np.array(pending, dtype=np.intp))
+
+    def _move_aircraft(self, indices: np.ndarray) -> typing.Iterator[KernelRequest]:
+        if len(indices) == 0:
+            return
+        store = self.store
+        yield MoveRequest(store=store, indices=indices, time=self.time, delta_time=self.options.delta_time)
+        exited, depleted = self.kernel.check_aircraft(
+                store, indices,
+                delta_time=self.options.delta_time,
+                game_size=self.options.game_size,
+                destroy_on_boundary_exit=self.options.destroy_on_boundary_exit)
+        x, y = store.x[indices].tolist(), store.y[indices].tolist()
+        for k, index in enumerate(indices.tolist()):
+            obj = store.objs[index]
+            if exited[k]:
+                obj.on_exit_game_range()
+            # 记忆路径点
+            obj.position_memory.add_position((x[k], y[k]))
+            if depleted[k]:
+                obj.on_fuel_depleted()
+
+    def update_missiles(self, indices: np.ndarray) -> typing.Iterator[KernelRequest]:
+        """
+        导弹消耗燃油、重新规划飞向目标的航迹并移动，这一步新发射的导弹不参与更新（update_stages的一个阶段）
+        :param indices: 这一步开始时没有被摧毁的实体槽位
         """
-        count = {
+        store = self.store
+        indices = indices[store.type[indices] == OBJECT_TO_IDX['missile']]
+        if len(indices) == 0:
+            return
+        missiles: list[Missile] = [store.objs[index] for index in indices]
+        target_indices = np.array([missile.target.index for missile in missiles], dtype=np.intp)
+        delta_time = self.options.delta_time
+        depleted = self.kernel.burn_missile_fuel(store, indices, delta_time=delta_time)
+        due = self.kernel.reroute_due(store, indices, time=self.time,
+                                      reroute_interval=self.options.missile_reroute_interval)
+        if due.any():
+            yield RerouteRequest(store=store, indices=indices[due], target_indices=target_indices[due],
+                                 time=self.time, delta_time=delta_time)
+        yield MoveRequest(store=store, indices=indices, time=self.time, delta_time=delta_time)
+        for k in np.flatnonzero(depleted).tolist():
+            missiles[k].on_fuel_depleted()
+
+    def update_collision(self, indices: np.ndarray):
+        """
+        检查碰撞，通过colliding_pairs来确保只触发一次（需要先进入非碰撞状态才能触发碰撞）
+        先用扫掠包围盒做排序扫描粗筛，再对候选组合向量化计算时间段内的最近距离
+        :param indices: 参与碰撞检查的槽位
+        """
+        store = self.store
+        indices = indices[store.collision_radius[indices] > 0]
+        i, j = collision_pairs(
+                x=store.x[indices], y=store.y[indices],
+                last_x=store.last_x[indices], last_y=store.last_y[indices],
+                radius=store.collision_radius[indices])
+        i, j = indices[i], indices[j]
+
+        new_colliding_pairs = set()
+        checked = store.collision_checked
+        # 按照实体加入战场的顺序依次触发
+        order = np.lexsort((j, i))
+        for a, b in zip(i[order].tolist(), j[order].tolist()):
+            pair = (a, b)
+            new_colliding_pairs.add(pair)
+            if checked[a] and checked[b] and pair not in self.colliding_pairs:
+                obj_1 = store.objs[a]
+                obj_2 = store.objs[b]
+                obj_1.on_collision(obj_2)
+                obj_2.on_collision(obj_1)
+
+        self.colliding_pairs = new_colliding_pairs
+        checked[indices] = True
+
+    @classmethod
+    def empty_remain_count(cls) -> dict:
+        return {
             'aircraft': {
                 'red' : 0,
                 'blue': 0
@@ -246,18 +459,14 @@ class BattleArea:
                 'blue': 0
             }
         }
-        for obj in self.objs.values():
-            if obj.destroyed:
-                continue
-            if obj.type not in count:
-                count[obj.type] = {
-                    'red' : 0,
-                    'blue': 0
-                }
-            if obj.color not in count[obj.type]:
-                count[obj.type][obj.color] = 0
-            count[obj.type][obj.color] += 1
-        return count
+
+    @property
+    def remain_count(self) -> dict:
+        """
+        获取剩余实体数量（返回的是拷贝，可以随意修改）
+        :return:
+        """
+        return { obj_type: count.copy() for obj_type, count in self._remain_count.items() }
 
     @property
     def winner(self) -> str:
@@ -269,21 +478,20 @@ class BattleArea:
             draw: 平局
 
         """
-        remain_count = self.remain_count
+        key = (self.time, self._count_version)
+        if self._winner_cache is None or self._winner_cache[0] != key:
+            self._winner_cache = (key, self._calc_winner())
+        return self._winner_cache[1]
+
+    def _calc_winner(self) -> str:
+        remain_count = self._remain_count
 
         if self.options.indestructible:
             # 无敌模式下，用到达结束时间时双方的被摧毁数量来判断胜负
             if self.time < self.options.max_duration:
                 return ''
 
-            destroyed_count = {
-                'red' : 0,
-                'blue': 0
-            }
-
-            for agent in self.agents:
-                destroyed_count[agent.color] += agent.destroyed_count
-
+            destroyed_count = self._destroyed_count
             if destroyed_count['red'] > destroyed_count['blue']:
                 # 红方被摧毁次数多，蓝方获胜
                 return 'blue'
@@ -313,6 +521,84 @@ class BattleArea:
                 return 'red'
         return ''
 
+    @property
+    def relation(self) -> RelationMatrix | None:
+        """
+        实体两两之间的距离/方位/相对朝向矩阵，store发生变化后惰性重新计算，一般每次update之后只计算一次
+        update过程中实体在逐个移动，此时如果矩阵已经过期则返回None，调用方需要自行计算
+        """
+        if self._relation is None or self._relation.version != self.store.version:
+            if self.updating:
+                return None
+            self._relation = RelationMatrix(self.store)
+        return self._relation
+
+    def _relation_of(self, obj1: WorldObj, obj2: WorldObj) -> RelationMatrix | None:
+        if obj1._store is not self.store or obj2._store is not self.store:
+            # 没有挂载到战场上的实体（例如记忆中的实体副本）
+            return None
+        return self.relation
+
+    def distance_between(self, obj1: WorldObj, obj2: WorldObj) -> float:
+        """两个实体之间的距离"""
+        relation = self._relation_of(obj1, obj2)
+        if relation is None:
+            return obj1.waypoint.distance(obj2.waypoint)
+        return relation.distance[obj1.index, obj2.index]
+
+    def relative_polar(self, obj1: WorldObj, obj2: WorldObj) -> PolarWaypoint:
+        """obj2相对obj1的极坐标航迹点"""
+        relation = self._relation_of(obj1, obj2)
+        if relation is None:
+            return obj1.waypoint.relative_polar_waypoint(obj2.waypoint)
+        return relation.polar(obj1.index, obj2.index)
+
+    def _ensure_spatial_index(self):
+        """store发生变化后（一般是每次update之后）重建空间索引，并清空雷达查询缓存"""
+        store = self.store
+        if self.spatial_index_version == store.version:
+            return
+        indices = store.indices(alive=True)
+        self.spatial_index.build(x=store.x[indices], y=store.y[indices], indices=indices)
+        self.spatial_index_version = store.version
+        self.radar_cache.clear()
+
+    def _radar_detect(self, agent_name: str, obj_type: str, ignore_radar: bool, only_enemy: bool) -> list:
+        """
+        雷达探测，结果按照距离从小到大排序（距离相同时按照加入战场的顺序）
+        同一个store版本内相同的查询只计算一次
+        """
+        self._ensure_spatial_index()
+        key = (agent_name, obj_type, ignore_radar, only_enemy)
+        if key in self.radar_cache:
+            return list(self.radar_cache[key])
+
+        agent = self.get_obj(agent_name)
+        assert isinstance(agent, Aircraft)
+        store = self.store
+        if ignore_radar:
+            indices = store.indices(alive=True)
+        else:
+            indices = self.spatial_index.query(x=agent.waypoint.x, y=agent.waypoint.y, radius=agent.radar_radius)
+        indices = indices[store.type[indices] == OBJECT_TO_IDX[obj_type]]
+        if only_enemy:
+            indices = indices[store.color[indices] != COLOR_TO_IDX[agent.color]]
+        relation = self.relation
+        if relation is not None:
+            dis = relation.distance[agent.index, indices]
+        else:
+            dx = store.x[indices] - store.x[agent.index]
+            dy = store.y[indices] - store.y[agent.index]
+            dis = np.sqrt(dx * dx + dy * dy)
+        mask = indices != agent.index
+        if not ignore_radar:
+            mask &= dis <= agent.radar_radius
+        indices, dis = indices[mask], dis[mask]
+        order = np.argsort(dis, kind='stable')
+        result = [store.objs[i] for i in indices[order].tolist()]
+        self.radar_cache[key] = result
+        return list(result)
+
     def detect_missiles(self, agent_name: str, ignore_radar: bool = False, only_enemy: bool = True) -> list[Missile]:
         """
         检测来袭导弹
@@ -324,20 +610,8 @@ class BattleArea:
         Returns: 来袭导弹，按照距离从小到大排序
 
         """
-        missiles = []
-        agent = self.get_obj(agent_name)
-        assert isinstance(agent, Aircraft)
-        for obj in self.objs.values():
-            if obj.name == agent_name or not isinstance(obj, Missile) or obj.destroyed:
-                continue
-            if not ignore_radar and not agent.in_radar_range(obj):
-                # 不在雷达范围内
-                continue
-            if only_enemy and obj.color == agent.color:
-                # 不检测相同战队的导弹
-                continue
-            missiles.append((obj, obj.distance(agent)))
-        return list(map(lambda it: it[0], sorted(missiles, key=lambda it: it[1])))
+        return self._radar_detect(
+                agent_name=agent_name, obj_type='missile', ignore_radar=ignore_radar, only_enemy=only_enemy)
 
     def detect_aircraft(self, agent_name: str, ignore_radar: bool = False, only_enemy: bool = True) -> list[Aircraft]:
         """
@@ -350,20 +624,8 @@ class BattleArea:
         Returns: 来袭飞机，按照距离从小到大排序
 
         """
-        aircraft_items = []
-        agent = self.get_obj(agent_name)
-        assert isinstance(agent, Aircraft)
-        for obj in self.objs.values():
-            if obj.name == agent_name or not isinstance(obj, Aircraft) or obj.destroyed:
-                continue
-            if not ignore_radar and not agent.in_radar_range(obj):
-                # 不在雷达范围内
-                continue
-            if only_enemy and obj.color == agent.color:
-                # 只检测敌机
-                continue
-            aircraft_items.append((obj, obj.distance(agent)))
-        return list(map(lambda it: it[0], sorted(aircraft_items, key=lambda it: it[1])))
+        return self._radar_detect(
+                agent_name=agent_name, obj_type='aircraft', ignore_radar=ignore_radar, only_enemy=only_enemy)
 
     def find_nearest_enemy(self, agent_name: str, ignore_radar: bool = False) -> Aircraft | None:
         """
@@ -372,22 +634,8 @@ class BattleArea:
         :param ignore_radar: 是否忽略雷达因素（设为false则只会返回雷达范围内的敌机）
         :return:
         """
-        agent = self.objs[agent_name]
-        assert isinstance(agent, Aircraft)
-        min_dis = float('inf')
-        enemy = None
-        for obj in self.objs.values():
-            if obj.destroyed or not isinstance(obj, Aircraft):
-                continue
-            if obj.color == agent.color:
-                continue
-
-            dis = obj.distance(agent)
-            if not ignore_radar and dis > agent.radar_radius:
-                continue
-
-            if dis < min_dis:
-                min_dis = dis
-                enemy = obj
-
-        return enemy
+        enemies = self._radar_detect(
+                agent_name=agent_name, obj_type='aircraft', ignore_radar=ignore_radar, only_enemy=True)
+        if len(enemies) == 0:
+            return None
+        return enemies[0]
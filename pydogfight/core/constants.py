@@ -42,6 +42,8 @@ COLOR_TO_IDX = {
     'black' : 7,
 }
 
+IDX_TO_COLOR = dict(zip(COLOR_TO_IDX.values(), COLOR_TO_IDX.keys()))
+
 # Map of object type to integers
 OBJECT_TO_IDX = {
     "empty"   : 0,
@@ -77,12 +79,3 @@ class DestroyReason:
     FUEL_DEPLETION = "fuel depletion"  # 燃油耗尽
     # 基地攻击
     HOME_ATTACK = 'home attack'  # 基地攻击
-
-# class Events:
-#     """事件"""
-#     # 物体被摧毁
-#     # 发射导弹
-#     # 飞机碰撞
-#     # 导弹命中敌机
-#     # 导弹未命中
-#     # 回家
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import math
+import typing
+
+import numpy as np
+
+from pydogfight.core.constants import COLOR_TO_IDX, OBJECT_TO_IDX
+
+from pydogfight.utils.models import Waypoint
+from pydogfight.utils.traj import OptimalPathParam
+
+if typing.TYPE_CHECKING:
+    from pydogfight.core.world_obj import WorldObj
+
+
+class EntityStore:
+    """
+    战场实体的列式存储（Structure of Arrays）
+    每个挂载到战场上的实体占用一个槽位（index），实体的位置、速度、燃油等状态保存在连续的NumPy数组中，
+    WorldObj通过StoreField按照index读写对应的列，这样战场可以在一次遍历中对所有实体做向量化计算。
+
+    同一局对战内槽位只追加不复用，保证槽位顺序和BattleArea.objs的插入顺序一致，episode开始时调用clear重置
+    """
+
+    FLOAT_COLUMNS = ['x', 'y', 'psi', 'last_x', 'last_y', 'last_psi', 'speed', 'turn_radius', 'collision_radius',
+                     'fuel', 'fuel_consumption_rate', 'route_time', 'reroute_time']
+    # 当前航迹（OptimalPathParam）的参数，保存在(capacity, len(ROUTE_COLUMNS))的route数组中，has_route为False时无效
+    ROUTE_COLUMNS = ['route_start_x', 'route_start_y', 'route_start_psi', 'route_target_x', 'route_target_y',
+                     'route_target_psi', 'route_turn_radius', 'route_length', 'route_turn_angle', 'route_turn_length',
+                     'route_direct_length', 'route_turn_point_x', 'route_turn_point_y', 'route_turn_center_x',
+                     'route_turn_center_y']
+    INT_COLUMNS = ['color', 'type']
+    LONG_COLUMNS = ['route_version']  # route_version: 航迹每次变化都会递增，用于判断实体缓存的OptimalPathParam是否过期
+    # collision_checked: 是否已经参与过碰撞检查
+    BOOL_COLUMNS = ['destroyed', 'used', 'collision_checked', 'has_route', 'last_is_in_game_range']
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = 0
+        self.size = 0  # 已经分配的槽位数量
+        self.version = 0  # 每次写入都会递增，用于判断依赖store的缓存（例如空间索引）是否过期
+        self.objs: list[WorldObj | None] = []  # 槽位对应的实体
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.float64))
+        self.route = np.zeros((0, len(self.ROUTE_COLUMNS)), dtype=np.float64)
+        for name in self.INT_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.int8))
+        for name in self.LONG_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.int64))
+        for name in self.BOOL_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=bool))
+        self._reserve(capacity)
+
+    @classmethod
+    def columns(cls) -> list[str]:
+        return cls.FLOAT_COLUMNS + ['route'] + cls.INT_COLUMNS + cls.LONG_COLUMNS + cls.BOOL_COLUMNS
+
+    def _reserve(self, capacity: int):
+        if capacity <= self.capacity:
+            return
+        for name in self.columns():
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def clear(self):
+        """清空所有槽位，已经挂载的实体会被卸载"""
+        for obj in self.objs:
+            if obj is not None:
+                self._detach(obj)
+        self.objs.clear()
+        self.size = 0
+        self.version += 1
+        for name in self.columns():
+            getattr(self, name)[:] = 0
+
+    def add(self, obj: WorldObj) -> int:
+        """
+        为实体分配一个槽位，并把实体当前的状态写入到列中
+        :return: 槽位index
+        """
+        if obj._store is not None:
+            obj._store.remove(obj)
+        if self.size >= self.capacity:
+            self._reserve(max(self.capacity * 2, 1))
+        index = self.size
+        self.size += 1
+        self.version += 1
+        self.objs.append(obj)
+
+        wpt = obj.waypoint
+        self.x[index] = wpt.x
+        self.y[index] = wpt.y
+        self.psi[index] = wpt.psi
+        last_wpt = obj.last_waypoint or wpt
+        self.last_x[index] = last_wpt.x
+        self.last_y[index] = last_wpt.y
+        self.last_psi[index] = last_wpt.psi
+        self.set_route(index, obj.route_param)
+        for name in StoreField.managed_columns(obj):
+            getattr(self, name)[index] = obj.__dict__[StoreField.local_name(name)]
+        self.color[index] = COLOR_TO_IDX.get(obj.color, 0)
+        self.type[index] = OBJECT_TO_IDX.get(obj.type, 0)
+        self.used[index] = True
+
+        obj._store = self
+        obj._index = index
+        return index
+
+    def remove(self, obj: WorldObj):
+        """释放实体的槽位，实体的状态会写回到实体自身上，之后对实体的读写不再影响store"""
+        if obj._store is not self:
+            return
+        index = obj._index
+        self._detach(obj)
+        self.objs[index] = None
+        self.used[index] = False
+        self.version += 1
+        self.destroyed[index] = False
+
+    def _detach(self, obj: WorldObj):
+        index = obj._index
+        obj._waypoint = self.waypoint(index)
+        obj._last_waypoint = self.last_waypoint(index)
+        obj._route_param = self.route_param(index)
+        for name in StoreField.managed_columns(obj):
+            obj.__dict__[StoreField.local_name(name)] = getattr(self, name).item(index)
+        obj._store = None
+        obj._index = -1
+
+    def set_waypoint(self, index: int, wpt: Waypoint):
+        self.version += 1
+        self.x[index] = wpt.x
+        self.y[index] = wpt.y
+        self.psi[index] = wpt.psi
+
+    def move(self, index: int, wpt: Waypoint):
+        """实体移动到新的航迹点，同时记录上一刻的位置"""
+        self.last_x[index] = self.x[index]
+        self.last_y[index] = self.y[index]
+        self.last_psi[index] = self.psi[index]
+        self.set_waypoint(index, wpt)
+
+    def waypoint(self, index: int) -> Waypoint:
+        return Waypoint.raw(x=self.x.item(index), y=self.y.item(index), psi=self.psi.item(index))
+
+    def last_waypoint(self, index: int) -> Waypoint:
+        return Waypoint.raw(x=self.last_x.item(index), y=self.last_y.item(index), psi=self.last_psi.item(index))
+
+    def set_route(self, index: int, param: OptimalPathParam | None):
+        """写入实体当前的航迹，None代表没有航迹"""
+        self.version += 1
+        self.route_version[index] += 1
+        if param is None:
+            self.has_route[index] = False
+            return
+        self.has_route[index] = True
+        turn_center = param.turn_center if param.turn_center is not None else (np.nan, np.nan)
+        self.route[index] = (
+            param.start.x, param.start.y, param.start.psi,
+            param.target.x, param.target.y, param.target.psi,
+            param.turn_radius, param.length, param.turn_angle, param.turn_length, param.direct_length,
+            param.turn_point[0], param.turn_point[1], turn_center[0], turn_center[1])
+
+    def route_param(self, index: int) -> OptimalPathParam | None:
+        """根据航迹列重建OptimalPathParam"""
+        if not self.has_route[index]:
+            return None
+        (start_x, start_y, start_psi, target_x, target_y, target_psi, turn_radius, length, turn_angle, turn_length,
+         direct_length, turn_point_x, turn_point_y, turn_center_x, turn_center_y) = self.route[index].tolist()
+        param = OptimalPathParam(
+                start=Waypoint.raw(x=start_x, y=start_y, psi=start_psi),
+                target=Waypoint.raw(x=target_x, y=target_y, psi=target_psi),
+                turn_radius=turn_radius)
+        param.length = length
+        param.turn_angle = turn_angle
+        param.turn_length = turn_length
+        param.direct_length = direct_length
+        param.turn_point = (turn_point_x, turn_point_y)
+        if not math.isnan(turn_center_x):
+            param.turn_center = (turn_center_x, turn_center_y)
+        return param
+
+    def indices(self, type: str = '', color: str = '', alive: bool = False) -> np.ndarray:
+        """
+        按照条件筛选槽位，返回的槽位按照实体加入战场的顺序排列
+        :param type: 实体类型，空代表不限
+        :param color: 战队颜色，空代表不限
+        :param alive: 是否只返回未被摧毁的实体
+        """
+        mask = self.used[:self.size].copy()
+        if type != '':
+            mask &= self.type[:self.size] == OBJECT_TO_IDX[type]
+        if color != '':
+            mask &= self.color[:self.size] == COLOR_TO_IDX[color]
+        if alive:
+            mask &= ~self.destroyed[:self.size]
+        return np.flatnonzero(mask)
+
+    def positions(self, indices: np.ndarray | None = None) -> np.ndarray:
+        """(N, 2)的位置矩阵"""
+        if indices is None:
+            indices = slice(0, self.size)
+        return np.stack([self.x[indices], self.y[indices]], axis=-1)
+
+
+class StoreField:
+    """
+    WorldObj的属性描述符
+    实体挂载到EntityStore之后读写store中对应的列，未挂载时（例如复制出来的实体）读写实例自身的属性
+    """
+
+    def __init__(self, column: str = ''):
+        self.column = column
+        self.local = ''
+
+    def __set_name__(self, owner, name):
+        if self.column == '':
+            self.column = name
+        self.local = self.local_name(self.column)
+        owner_columns = list(getattr(owner, '_store_columns', ()))
+        if self.column not in owner_columns:
+            owner_columns.append(self.column)
+        owner._store_columns = tuple(owner_columns)
+
+    @classmethod
+    def local_name(cls, column: str) -> str:
+        return f'_{column}'
+
+    @classmethod
+    def managed_columns(cls, obj) -> tuple[str, ...]:
+        return getattr(obj, '_store_columns', ())
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        store = obj._store
+        if store is None:
+            return obj.__dict__[self.local]
+        return getattr(store, self.column).item(obj._index)
+
+    def __set__(self, obj, value):
+        store = obj._store
+        if store is None:
+            obj.__dict__[self.local] = value
+        else:
+            getattr(store, self.column)[obj._index] = value
+            store.version += 1
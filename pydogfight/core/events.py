@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import typing
+from enum import IntEnum
+from typing import Callable, Iterable, NamedTuple
+
+import numpy as np
+
+from pydogfight.core.constants import DestroyReason
+
+if typing.TYPE_CHECKING:
+    from pydogfight.core.world_obj import WorldObj
+
+
+class EventType(IntEnum):
+    """仿真事件类型"""
+    DESTROYED = 0  # 实体被摧毁（无敌模式下也会触发），value为摧毁原因在DESTROY_REASONS中的下标，other为造成摧毁的实体
+    MISSILE_FIRED = 1  # 发射导弹，obj为发射的飞机，other为目标敌机
+    MISSILE_FIRE_FAIL = 2  # 发射导弹失败（不满足发射条件）
+    MISSILE_HIT = 3  # 导弹命中敌机，obj为发射的飞机，other为被命中的敌机
+    MISSILE_MISS = 4  # 导弹没有命中，obj为发射的飞机，other为目标敌机
+    MISSILE_EVADE = 5  # 成功规避导弹，obj为被追踪的飞机，other为发射导弹的飞机
+    AIRCRAFT_COLLISION = 6  # 飞机之间相撞，obj为被撞毁的飞机，other为另一架飞机
+    HOME_RETURN = 7  # 飞机回到己方基地，other为基地
+    FUEL_DEPLETED = 8  # 飞机燃油耗尽
+    OUT_OF_GAME_RANGE = 9  # 飞出战场边界
+
+
+DESTROY_REASONS = [
+    DestroyReason.OUT_OF_GAME_RANGE,
+    DestroyReason.COLLIDED_WITH_MISSILE,
+    DestroyReason.COLLIDED_WITH_AIRCRAFT,
+    DestroyReason.FUEL_DEPLETION,
+    DestroyReason.HOME_ATTACK,
+]
+DESTROY_REASON_TO_IDX = { reason: i for i, reason in enumerate(DESTROY_REASONS) }
+
+
+class Event(NamedTuple):
+    """传给订阅者的事件"""
+    type: EventType
+    time: float
+    obj: WorldObj
+    other: WorldObj | None = None
+    missile: WorldObj | None = None  # 相关的导弹
+    value: float = 0
+
+
+EventHandler = Callable[[Event], None]
+
+
+class EventLog:
+    """
+    一局对战的事件日志，按列保存（每个事件一行）
+    实体用EntityStore中的槽位表示（同一局内槽位不会复用），没有的用-1，names记录槽位对应的实体名称
+    """
+
+    INT_COLUMNS = ['obj', 'other', 'missile']
+    FLOAT_COLUMNS = ['time', 'value']
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = 0
+        self.size = 0
+        self._type = np.zeros(0, dtype=np.int8)
+        for name in self.INT_COLUMNS:
+            setattr(self, f'_{name}', np.zeros(0, dtype=np.int32))
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, f'_{name}', np.zeros(0, dtype=np.float64))
+        self.names: dict[int, str] = { }
+        self._reserve(capacity)
+
+    @classmethod
+    def columns(cls) -> list[str]:
+        return ['type'] + cls.INT_COLUMNS + cls.FLOAT_COLUMNS
+
+    def _reserve(self, capacity: int):
+        if capacity <= self.capacity:
+            return
+        for name in self.columns():
+            old = getattr(self, f'_{name}')
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, f'_{name}', new)
+        self.capacity = capacity
+
+    def clear(self):
+        self.size = 0
+        self.names.clear()
+
+    def _slot(self, obj: WorldObj | None) -> int:
+        if obj is None or obj.index < 0:
+            return -1
+        self.names[obj.index] = obj.name
+        return obj.index
+
+    def append(self, type: EventType, time: float, obj: WorldObj, other: WorldObj | None = None,
+               missile: WorldObj | None = None, value: float = 0):
+        if self.size >= self.capacity:
+            self._reserve(max(self.capacity * 2, 1))
+        k = self.size
+        self._type[k] = type
+        self._time[k] = time
+        self._obj[k] = self._slot(obj)
+        self._other[k] = self._slot(other)
+        self._missile[k] = self._slot(missile)
+        self._value[k] = value
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def type(self) -> np.ndarray:
+        return self._type[:self.size]
+
+    @property
+    def time(self) -> np.ndarray:
+        return self._time[:self.size]
+
+    @property
+    def obj(self) -> np.ndarray:
+        return self._obj[:self.size]
+
+    @property
+    def other(self) -> np.ndarray:
+        return self._other[:self.size]
+
+    @property
+    def missile(self) -> np.ndarray:
+        return self._missile[:self.size]
+
+    @property
+    def value(self) -> np.ndarray:
+        return self._value[:self.size]
+
+    def since(self, start: int) -> dict[str, np.ndarray]:
+        """
+        第start个事件之后的事件（增量），用于奖励计算等只关心新事件的场景
+        :return: 列名 -> 数组（视图，下一次append之前有效）
+        """
+        return { name: getattr(self, f'_{name}')[start:self.size] for name in self.columns() }
+
+    def mask(self, type: EventType, obj: int | None = None, start: int = 0) -> np.ndarray:
+        """第start个事件之后类型为type（obj不为None时还要求是这个槽位的实体）的事件"""
+        mask = self._type[start:self.size] == type
+        if obj is not None:
+            mask &= self._obj[start:self.size] == obj
+        return mask
+
+    def count(self, type: EventType, obj: int | None = None, start: int = 0) -> int:
+        return int(np.count_nonzero(self.mask(type=type, obj=obj, start=start)))
+
+
+class EventBus:
+    """
+    仿真事件总线：事件写入当前这一局的EventLog，同时回调订阅者
+    没有订阅者的事件只会写日志，不会创建Event对象
+    """
+
+    def __init__(self):
+        self.log = EventLog()
+        self.handlers: dict[EventType, list[EventHandler]] = { event_type: [] for event_type in EventType }
+
+    def subscribe(self, handler: EventHandler, types: Iterable[EventType] | None = None):
+        """
+        订阅事件
+        :param types: 订阅的事件类型，None代表所有类型
+        """
+        for event_type in (EventType if types is None else types):
+            self.handlers[EventType(event_type)].append(handler)
+
+    def unsubscribe(self, handler: EventHandler):
+        for handlers in self.handlers.values():
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def clear(self):
+        """开始新的一局时清空日志（订阅者保留）"""
+        self.log.clear()
+
+    def emit(self, type: EventType, time: float, obj: WorldObj, other: WorldObj | None = None,
+             missile: WorldObj | None = None, value: float = 0):
+        self.log.append(type=type, time=time, obj=obj, other=other, missile=missile, value=value)
+        handlers = self.handlers[type]
+        if len(handlers) > 0:
+            event = Event(type=type, time=time, obj=obj, other=other, missile=missile, value=value)
+            for handler in handlers:
+                handler(event)
@@ -0,0 +1,452 @@
+"""
+仿真内核：BattleArea.update中和实体数量成正比的数值计算
+模块级的函数都是纯函数，只读取传入的数组并返回新的数组；SimulationKernel负责从EntityStore中取出对应的列、调用这些函数并写回
+事件（摧毁、命中、回到基地等）由BattleArea根据返回的掩码按照实体的顺序回调给WorldObj，保证和逐个实体更新的结果一致
+BattleArea.update_stages把移动、重新规划航迹作为MoveRequest/RerouteRequest交给内核执行，
+同时运行多场对战时（Dogfight2dVecEnv）各场对战同一阶段的请求合并成一次批量计算（SimulationKernel.run_batched）
+"""
+from __future__ import annotations
+
+import math
+import typing
+
+import numpy as np
+
+from pydogfight.utils.common import wrap_angles_to_180, sweep_and_prune, will_collide_pairs
+from pydogfight.utils.traj import calc_optimal_path, calc_optimal_path_pairs
+
+if typing.TYPE_CHECKING:
+    from pydogfight.core.entity_store import EntityStore
+
+
+class MoveRequest(typing.NamedTuple):
+    """store中indices的实体沿着航迹或者航向前进一步（SimulationKernel.move）"""
+    store: EntityStore
+    indices: np.ndarray
+    time: float
+    delta_time: float
+
+
+class RerouteRequest(typing.NamedTuple):
+    """重新规划store中indices的实体飞向target_indices当前位置的航迹（SimulationKernel.reroute）"""
+    store: EntityStore
+    indices: np.ndarray
+    target_indices: np.ndarray
+    time: float
+    delta_time: float
+
+
+KernelRequest = typing.Union[MoveRequest, RerouteRequest]
+
+
+def advance(
+        x: np.ndarray, y: np.ndarray, psi: np.ndarray, speed: np.ndarray,
+        has_route: np.ndarray, route_time: np.ndarray, route: np.ndarray,
+        time: float, delta_time: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    所有实体前进一步：有航迹的沿着航迹飞行（OptimalPathParam.next_waypoint），航迹走完或者没有航迹的沿着航向直线飞行（Waypoint.move）
+    :param x, y, psi, speed: (K,) 实体当前的状态
+    :param has_route: (K,) 是否有航迹
+    :param route_time: (K,) 航迹开始的时间
+    :param route: (K, len(EntityStore.ROUTE_COLUMNS)) 航迹参数
+    :param time: 当前时间，合并多场对战一起计算时为(K,)
+    :param delta_time: 时间步长，合并多场对战一起计算时为(K,)
+    :return: 新的x, y, psi，以及航迹是否已经走完（需要清除）
+    """
+    (sx, sy, spsi, _, _, tpsi, r, length, turn_angle, turn_length, direct_length,
+     px, py, cx, cy) = route.T
+    move_length = speed * (time - route_time)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        follow = has_route & ~(move_length > length) & (length != float('inf')) & (length != 0)
+        turning = follow & (move_length < turn_length)
+        straight = follow & ~turning & (direct_length > 0)
+    forward = ~(turning | straight)
+
+    new_x, new_y, new_psi = x.copy(), y.copy(), psi.copy()
+
+    # 沿着航向直线飞行
+    if np.ndim(delta_time) > 0:
+        delta_time = delta_time[forward]
+    d = delta_time * speed[forward]
+    theta = np.radians((90 - psi[forward]) % 360 % 360)
+    new_x[forward] = x[forward] + d * np.cos(theta)
+    new_y[forward] = y[forward] + d * np.sin(theta)
+
+    # 沿着航迹转弯
+    init_theta = np.arctan2(sy[turning] - cy[turning], sx[turning] - cx[turning])
+    curr_turn_rad = np.radians(turn_angle[turning]) * move_length[turning] / turn_length[turning]
+    new_x[turning] = cx[turning] + r[turning] * np.cos(init_theta + curr_turn_rad)
+    new_y[turning] = cy[turning] + r[turning] * np.sin(init_theta + curr_turn_rad)
+    new_psi[turning] = wrap_angles_to_180(spsi[turning] - np.degrees(curr_turn_rad))
+
+    # 转弯结束后沿着航迹直线飞行
+    curr_direct_length = direct_length[straight] * (move_length[straight] - turn_length[straight]) / direct_length[
+        straight]
+    target_rad = np.radians(90 - tpsi[straight])
+    new_x[straight] = px[straight] + curr_direct_length * np.cos(target_rad)
+    new_y[straight] = py[straight] + curr_direct_length * np.sin(target_rad)
+    new_psi[straight] = wrap_angles_to_180(tpsi[straight])
+
+    return new_x, new_y, new_psi, has_route & forward
+
+
+def advance_loop(
+        x: np.ndarray, y: np.ndarray, psi: np.ndarray, speed: np.ndarray,
+        has_route: np.ndarray, route_time: np.ndarray, route: np.ndarray,
+        time: float, delta_time: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    advance的逐个实体循环版本，只使用math和标量运算，numba后端用numba.njit编译这个函数
+    （numba只能调用编译过的函数，所以角度放缩直接写在循环里）
+    """
+    n = len(x)
+    new_x, new_y, new_psi = x.copy(), y.copy(), psi.copy()
+    done = np.zeros(n, dtype=np.bool_)
+    for k in range(n):
+        mode = 0  # 0: 直线飞行 1: 沿航迹转弯 2: 沿航迹直线飞行
+        move_length = speed[k] * (time - route_time[k])
+        length = route[k, 7]
+        turn_length = route[k, 9]
+        if has_route[k] and not move_length > length and length != math.inf and length != 0:
+            if move_length < turn_length:
+                mode = 1
+            elif route[k, 10] > 0:
+                mode = 2
+
+        if mode == 0:
+            done[k] = has_route[k]
+            theta = math.radians((90 - psi[k]) % 360 % 360)
+            d = delta_time * speed[k]
+            new_x[k] = x[k] + d * math.cos(theta)
+            new_y[k] = y[k] + d * math.sin(theta)
+            continue
+
+        if mode == 1:
+            cx, cy = route[k, 13], route[k, 14]
+            init_theta = math.atan2(route[k, 1] - cy, route[k, 0] - cx)
+            curr_turn_rad = math.radians(route[k, 8]) * move_length / turn_length
+            new_x[k] = cx + route[k, 6] * math.cos(init_theta + curr_turn_rad)
+            new_y[k] = cy + route[k, 6] * math.sin(init_theta + curr_turn_rad)
+            angle = route[k, 2] - math.degrees(curr_turn_rad)
+        else:
+            direct_length = route[k, 10]
+            curr_direct_length = direct_length * (move_length - turn_length) / direct_length
+            target_rad = math.radians(90 - route[k, 5])
+            new_x[k] = route[k, 11] + curr_direct_length * math.cos(target_rad)
+            new_y[k] = route[k, 12] + curr_direct_length * math.sin(target_rad)
+            angle = route[k, 5]
+
+        # 和wrap_angle_to_180一致
+        if angle < -180 or 180 < angle:
+            shifted = angle + 180
+            wrapped = shifted % 360
+            if wrapped == 0 and shifted > 0:
+                wrapped = 360
+            angle = wrapped - 180
+        new_psi[k] = angle
+    return new_x, new_y, new_psi, done
+
+
+def burn_fuel(fuel: np.ndarray, rate: np.ndarray, delta_time: float, stop_when_empty: bool) \
+        -> tuple[np.ndarray, np.ndarray]:
+    """
+    消耗燃油
+    :param stop_when_empty: 燃油耗尽之后是否不再消耗（飞机）
+    :return: 新的燃油，以及这一步是否燃油耗尽
+    """
+    new_fuel = fuel - rate * delta_time
+    depleted = new_fuel <= 0
+    if stop_when_empty:
+        burning = fuel > 0
+        new_fuel = np.where(burning, new_fuel, fuel)
+        depleted &= burning
+    return new_fuel, depleted
+
+
+def in_game_range(x: np.ndarray, y: np.ndarray, game_size: tuple[float, float]) -> np.ndarray:
+    """是否在战场范围内（和WorldObj.is_in_game_range一致）"""
+    x0, y0 = -game_size[0] / 2, -game_size[1] / 2
+    x1, y1 = x0 + (game_size[0] / 2 - x0), y0 + (game_size[1] / 2 - y0)
+    return (x0 <= x) & (x <= x1) & (y0 <= y) & (y <= y1)
+
+
+def home_contacts(home_x: np.ndarray, home_y: np.ndarray, home_radius: np.ndarray,
+                  x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """(H, N) 第n个实体是否在第h个基地的范围内"""
+    distance = np.hypot(x[None, :] - home_x[:, None], y[None, :] - home_y[:, None])
+    return distance <= home_radius[:, None]
+
+
+def collision_pairs(x: np.ndarray, y: np.ndarray, last_x: np.ndarray, last_y: np.ndarray,
+                    radius: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    这一步内发生碰撞的所有组合
+    先用扫掠包围盒做排序扫描粗筛，再对候选组合向量化计算时间段内的最近距离
+    :return: (i, j) 两个下标数组，i < j
+    """
+    i, j = sweep_and_prune(np.minimum(x, last_x) - radius, np.maximum(x, last_x) + radius)
+
+    lo_y = np.minimum(y, last_y) - radius
+    hi_y = np.maximum(y, last_y) + radius
+    overlap = (lo_y[i] <= hi_y[j]) & (lo_y[j] <= hi_y[i])
+    i, j = i[overlap], j[overlap]
+
+    current = np.stack([x, y], axis=-1)
+    last = np.stack([last_x, last_y], axis=-1)
+    collided = will_collide_pairs(
+            a1=last[i], a2=current[i], ra=radius[i],
+            b1=last[j], b2=current[j], rb=radius[j])
+    return i[collided], j[collided]
+
+
+class SimulationKernel:
+    """
+    在EntityStore上执行仿真内核
+    backend: numpy（默认）或者numba（需要安装numba，逐个实体的循环会被编译成机器码）
+    实体数量较少时NumPy每次调用的固定开销比计算本身大，numpy后端在实体数量少于VECTORIZE_MIN时改为逐个计算
+    """
+
+    BACKENDS = ('numpy', 'numba')
+
+    VECTORIZE_MIN = 32  # 批量计算的最少实体数量
+    # 合并多场对战规划航迹时批量计算的最少实体数量（calc_optimal_path_pairs从十几个实体开始就比逐个计算快）
+    BATCH_REROUTE_MIN = 12
+
+    _numba_advance = None  # 编译好的advance_loop，进程内只编译一次
+
+    def __init__(self, backend: str = 'numpy'):
+        assert backend in self.BACKENDS, f'Unknown kernel backend: {backend}'
+        self.backend = backend
+        if backend == 'numba':
+            self._load_numba_advance()
+
+    @classmethod
+    def _load_numba_advance(cls):
+        if cls._numba_advance is None:
+            try:
+                import numba
+            except ImportError as e:
+                raise ImportError('kernel_backend=numba requires numba to be installed') from e
+            # numba的Dispatcher实现了__get__，作为类属性通过实例访问时会绑定self，所以要包成staticmethod
+            cls._numba_advance = staticmethod(numba.njit(cache=True)(advance_loop))
+        return cls._numba_advance
+
+    def advance(self, *args, **kwargs) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """按照后端和实体数量选择advance的实现，参数和advance一致"""
+        if self.backend == 'numba':
+            return self._numba_advance(*args, **kwargs)
+        if len(args[0]) < self.VECTORIZE_MIN:
+            return advance_loop(*args, **kwargs)
+        return advance(*args, **kwargs)
+
+    def move(self, store: EntityStore, indices: np.ndarray, time: float, delta_time: float):
+        """实体沿着航迹或者航向前进一步，航迹走完的实体会清除航迹"""
+        if len(indices) == 0:
+            return
+        x, y, psi = store.x[indices], store.y[indices], store.psi[indices]
+        moved = self.advance(
+                x, y, psi, store.speed[indices],
+                store.has_route[indices], store.route_time[indices], store.route[indices],
+                float(time), float(delta_time))
+        self._write_moved(store, indices, x, y, psi, *moved)
+
+    def move_batch(self, requests: list[MoveRequest]):
+        """
+        合并多场对战的移动一起计算，结果和逐个执行move一致
+        numba后端逐个实体的循环已经编译过了，合并没有收益，总实体数量少于VECTORIZE_MIN时也逐个执行
+        """
+        if self.backend == 'numba' or len(requests) == 1 or \
+                sum(len(request.indices) for request in requests) < self.VECTORIZE_MIN:
+            for request in requests:
+                self.move(*request)
+            return
+        columns = { name: [] for name in ['x', 'y', 'psi', 'speed', 'has_route', 'route_time', 'route'] }
+        for request in requests:
+            for name, values in columns.items():
+                values.append(getattr(request.store, name)[request.indices])
+        columns = { name: np.concatenate(values) for name, values in columns.items() }
+        counts = [len(request.indices) for request in requests]
+        moved = advance(
+                **columns,
+                time=np.repeat([float(request.time) for request in requests], counts),
+                delta_time=np.repeat([float(request.delta_time) for request in requests], counts))
+        start = 0
+        for request, count in zip(requests, counts):
+            rows = slice(start, start + count)
+            self._write_moved(request.store, request.indices,
+                              columns['x'][rows], columns['y'][rows], columns['psi'][rows],
+                              *(value[rows] for value in moved))
+            start += count
+
+    @staticmethod
+    def _write_moved(store: EntityStore, indices: np.ndarray, x: np.ndarray, y: np.ndarray, psi: np.ndarray,
+                     new_x: np.ndarray, new_y: np.ndarray, new_psi: np.ndarray, done: np.ndarray):
+        """写回移动的结果，当前位置保存为上一刻的位置"""
+        store.last_x[indices] = x
+        store.last_y[indices] = y
+        store.last_psi[indices] = psi
+        store.x[indices] = new_x
+        store.y[indices] = new_y
+        store.psi[indices] = new_psi
+        if done.any():
+            finished = indices[done]
+            store.has_route[finished] = False
+            store.route_version[finished] += 1
+            store.route_time[finished] = 0
+        store.version += 1
+
+    def update_aircraft(self, store: EntityStore, indices: np.ndarray, time: float, delta_time: float,
+                        game_size: tuple[float, float], destroy_on_boundary_exit: bool) \
+            -> tuple[np.ndarray, np.ndarray]:
+        """
+        飞机：前进一步、检查边界、消耗燃油
+        :return: (飞出战场边界, 燃油耗尽) 两个(K,)的掩码，和indices对应
+        """
+        self.move(store, indices, time=time, delta_time=delta_time)
+        return self.check_aircraft(store, indices, delta_time=delta_time, game_size=game_size,
+                                   destroy_on_boundary_exit=destroy_on_boundary_exit)
+
+    def check_aircraft(self, store: EntityStore, indices: np.ndarray, delta_time: float,
+                       game_size: tuple[float, float], destroy_on_boundary_exit: bool) \
+            -> tuple[np.ndarray, np.ndarray]:
+        """飞机移动之后检查边界、消耗燃油，返回值和update_aircraft一致"""
+        in_range = in_game_range(store.x[indices], store.y[indices], game_size)
+        if destroy_on_boundary_exit:
+            exited = ~in_range & store.last_is_in_game_range[indices]
+        else:
+            exited = np.zeros(len(indices), dtype=bool)
+        store.last_is_in_game_range[indices] = in_range
+
+        store.fuel[indices], depleted = burn_fuel(
+                store.fuel[indices], store.fuel_consumption_rate[indices], delta_time, stop_when_empty=True)
+        store.version += 1
+        return exited, depleted
+
+    def update_missiles(self, store: EntityStore, indices: np.ndarray, target_indices: np.ndarray,
+                        time: float, delta_time: float, reroute_interval: float) \
+            -> tuple[np.ndarray, np.ndarray]:
+        """
+        导弹：消耗燃油、每隔reroute_interval重新规划飞向目标的航迹，然后前进一步
+        :param target_indices: (K,) 每个导弹的目标所在的槽位
+        :return: (燃油耗尽的掩码, 重新规划了航迹的槽位)
+        """
+        depleted = self.burn_missile_fuel(store, indices, delta_time=delta_time)
+        due = self.reroute_due(store, indices, time=time, reroute_interval=reroute_interval)
+        rerouted = self.reroute(store, indices[due], target_indices[due], time=time, delta_time=delta_time)
+
+        self.move(store, indices, time=time, delta_time=delta_time)
+        return depleted, rerouted
+
+    @staticmethod
+    def burn_missile_fuel(store: EntityStore, indices: np.ndarray, delta_time: float) -> np.ndarray:
+        """导弹消耗燃油，返回燃油耗尽的掩码"""
+        store.fuel[indices], depleted = burn_fuel(
+                store.fuel[indices], store.fuel_consumption_rate[indices], delta_time, stop_when_empty=False)
+        return depleted
+
+    @staticmethod
+    def reroute_due(store: EntityStore, indices: np.ndarray, time: float, reroute_interval: float) -> np.ndarray:
+        """距离上一次规划超过reroute_interval、需要重新规划航迹的掩码"""
+        return time - store.reroute_time[indices] > reroute_interval
+
+    def reroute(self, store: EntityStore, indices: np.ndarray, target_indices: np.ndarray,
+                time: float, delta_time: float) -> np.ndarray:
+        """
+        重新规划飞向目标当前位置的最短航迹（和WorldObj.go_to_location一致），无法到达或者已经到达的保留原来的航迹
+        :return: 航迹发生变化的槽位
+        """
+        store.reroute_time[indices] = time
+        if len(indices) == 0:
+            return indices
+        if len(indices) < self.VECTORIZE_MIN:
+            ok = np.zeros(len(indices), dtype=bool)
+            for k, (index, target_index) in enumerate(zip(indices.tolist(), target_indices.tolist())):
+                param = calc_optimal_path(
+                        start=store.waypoint(index),
+                        target=(store.x.item(target_index), store.y.item(target_index)),
+                        turn_radius=store.turn_radius.item(index))
+                if param.length != 0 and param.length != float('inf'):
+                    ok[k] = True
+                    store.set_route(index, param)
+            indices = indices[ok]
+        else:
+            paths = calc_optimal_path_pairs(
+                    starts=np.stack([store.x[indices], store.y[indices], store.psi[indices]], axis=-1),
+                    targets=np.stack([store.x[target_indices], store.y[target_indices]], axis=-1),
+                    turn_radius=store.turn_radius[indices],
+                    format_starts=False)
+            indices = self._write_routes(store, indices, paths, slice(None))
+        store.route_time[indices] = time - delta_time  # 保证当前帧就能沿着新的航迹移动
+        store.version += 1
+        return indices
+
+    def reroute_batch(self, requests: list[RerouteRequest]):
+        """合并多场对战的重新规划一起计算，结果和逐个执行reroute一致"""
+        if len(requests) == 1 or sum(len(request.indices) for request in requests) < self.BATCH_REROUTE_MIN:
+            for request in requests:
+                self.reroute(*request)
+            return
+        paths = calc_optimal_path_pairs(
+                starts=np.concatenate([
+                    np.stack([store.x[indices], store.y[indices], store.psi[indices]], axis=-1)
+                    for store, indices, *_ in requests]),
+                targets=np.concatenate([
+                    np.stack([store.x[target_indices], store.y[target_indices]], axis=-1)
+                    for store, _, target_indices, *_ in requests]),
+                turn_radius=np.concatenate([store.turn_radius[indices] for store, indices, *_ in requests]),
+                format_starts=False)
+        start = 0
+        for store, indices, _, time, delta_time in requests:
+            store.reroute_time[indices] = time
+            rows = slice(start, start + len(indices))
+            start += len(indices)
+            indices = self._write_routes(store, indices, paths, rows)
+            store.route_time[indices] = time - delta_time
+            store.version += 1
+
+    @staticmethod
+    def _write_routes(store: EntityStore, indices: np.ndarray, paths, rows: slice) -> np.ndarray:
+        """把paths[rows]中可以到达的航迹写入indices的槽位，返回写入的槽位"""
+        length = paths.length[rows]
+        ok = (length != 0) & (length != float('inf'))
+        indices = indices[ok]
+
+        def column(values: np.ndarray, k: int | None = None) -> np.ndarray:
+            values = values[rows]
+            return (values if k is None else values[:, k])[ok]
+
+        store.has_route[indices] = True
+        store.route_version[indices] += 1
+        store.route[indices] = np.stack([
+            column(paths.starts, 0), column(paths.starts, 1), column(paths.starts, 2),
+            column(paths.targets, 0), column(paths.targets, 1), column(paths.target_psi),
+            column(paths.turn_radius), column(paths.length), column(paths.turn_angle), column(paths.turn_length),
+            column(paths.direct_length), column(paths.turn_point, 0), column(paths.turn_point, 1),
+            column(paths.turn_center, 0), column(paths.turn_center, 1)], axis=-1)
+        return indices
+
+    def execute(self, request: KernelRequest):
+        """执行BattleArea.update_stages产生的一个请求"""
+        if isinstance(request, MoveRequest):
+            self.move(*request)
+        else:
+            self.reroute(*request)
+
+    def run(self, stages: typing.Iterator[KernelRequest]):
+        """依次执行一场对战的update_stages"""
+        for request in stages:
+            self.execute(request)
+
+    def run_batched(self, stages: list[typing.Iterator[KernelRequest]]):
+        """
+        多场对战一起执行update_stages：每一轮从每场还没有结束的对战取出下一个请求，同类请求合并成一次计算
+        各场对战的实体数量、是否发射导弹不同，请求的数量可以不一样，先结束的对战不再参与
+        """
+        pending = [next(stage, None) for stage in stages]
+        while any(request is not None for request in pending):
+            moves = [request for request in pending if isinstance(request, MoveRequest)]
+            reroutes = [request for request in pending if isinstance(request, RerouteRequest)]
+            if len(moves) > 0:
+                self.move_batch(moves)
+            if len(reroutes) > 0:
+                self.reroute_batch(reroutes)
+            pending = [None if request is None else next(stage, None) for stage, request in zip(stages, pending)]
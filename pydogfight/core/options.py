@@ -1,4 +1,5 @@
 import math
+import os
 import random
 import typing
 
@@ -12,6 +13,7 @@ class Options:
 
     debug: bool = True
     render: bool = False
+    render_mode: str = ''  # 渲染模式 human/rgb_array（rgb_array不需要显示窗口），为空时render=True表示human
     ### 实体设置 ###
     red_agents = ['red_1']
     blue_agents = ['blue_1']
@@ -31,9 +33,14 @@ class Options:
     max_duration = 30 * 60  # 一局对战最多时长30分钟，超过这个就会truncated
     screen_size = (800, 800)  # 屏幕宽度 屏幕高度
     render_fps = 50  # 渲染的fps
+    render_rotate_step = 0  # 渲染时图片旋转角度的量化步长（度），大于0时同一个格子里的角度共用缓存的旋转图片（画面会有细微差别），0表示不量化
+    render_process = False  # 是否在单独的进程中渲染（仿真不用等待渲染，也不按simulation_rate限速，渲染跟不上时丢帧）
+    render_buffer_slots = 4  # 渲染进程共享内存环形缓冲区的帧数
+    render_buffer_slot_size = 1 << 20  # 每一帧序列化后最多占用的字节数，超过的帧会被丢掉
     delta_time = 0.1  # 每次env的更新步长
     update_interval = 1  # 每轮策略更新的时间间隔
     simulation_rate = 30.0  # 仿真的时间倍数，真实世界的1s对应游戏世界的多长时间
+    kernel_backend: str = 'numpy'  # 仿真内核的计算后端 numpy/numba（numba需要额外安装）
 
     reach_location_threshold = 2  # 用来判断是否接近目标点的时间片尺度（乘以delta_time*速度后就能得出距离多近就算到达目标点）
 
@@ -111,6 +118,10 @@ class Options:
 
     missile_can_only_hit_enemy: bool = True  # 导弹是否只能攻击敌方（如果设为False，则导弹可以打中友方）
 
+    missile_path_lut: bool = False  # 预测导弹拦截点时是否用查找表近似计算导弹的最短航迹长度
+    missile_path_lut_cache_dir: str = os.path.join(os.path.expanduser('~'), '.cache', 'pydogfight')  # 查找表的磁盘缓存目录，为空则不缓存
+    missile_path_lut_check: bool = False  # 第一次使用查找表时是否和精确解对比并打印精度
+
     ### 基地 ###
     home_area_radius = 2e3  # 基地范围半径
     home_return_time_interval = 10  # 触发返回基地的时间间隔
@@ -153,6 +164,10 @@ class Options:
                 center=[0, 0], size=[self.game_size[0] - self.safe_boundary_distance * 2,
                                      self.game_size[1] - self.safe_boundary_distance * 2])
 
+    def render_enabled(self) -> bool:
+        """是否需要渲染（human窗口或者rgb_array离屏渲染），开启时实体会生成用于画图的航迹"""
+        return self.render or self.render_mode != ''
+
     def validate(self):
         """校验是否合法"""
         assert self.delta_time > 0
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import typing
+
+import numpy as np
+
+from pydogfight.utils.models import PolarWaypoint
+from pydogfight.utils.common import wrap_angles_to_180
+
+if typing.TYPE_CHECKING:
+    from pydogfight.core.entity_store import EntityStore
+
+
+class RelationMatrix:
+    """
+    战场实体两两之间的相对关系（NxN矩阵，下标是EntityStore中的槽位）
+    distance[i, j]: i和j之间的距离
+    theta[i, j]: j相对i的方位角（角度，-180到180度，0代表j在i的正前方）
+    phi[i, j]: j相对i的相对朝向（角度，-180到180度）
+    和Waypoint.relative_polar_waypoint的计算结果一致
+    """
+
+    def __init__(self, store: EntityStore):
+        self.version = store.version  # 计算时store的版本
+        size = store.size
+        x = store.x[:size]
+        y = store.y[:size]
+        psi = store.psi[:size]
+
+        dx = x[None, :] - x[:, None]
+        dy = y[None, :] - y[:, None]
+        self.distance: np.ndarray = np.hypot(dx, dy)
+        theta = np.degrees(np.arctan2(dy, dx) - np.radians(psi)[:, None])
+        self.theta: np.ndarray = wrap_angles_to_180(theta)
+        self.phi: np.ndarray = wrap_angles_to_180(psi[None, :] - psi[:, None])
+
+    def polar(self, i: int, j: int) -> PolarWaypoint:
+        """槽位j相对槽位i的极坐标航迹点"""
+        return PolarWaypoint(self.distance[i, j], self.theta[i, j], self.phi[i, j])
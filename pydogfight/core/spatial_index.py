@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+class UniformGridIndex:
+    """
+    均匀网格空间索引
+    将实体按照所在的网格（边长cell_size）分桶，查询某个圆形范围内的实体时只需要检查覆盖该范围的网格
+    网格边长一般设置为雷达半径，这样一次雷达查询只需要检查周围3x3个网格
+    """
+
+    _KEY_OFFSET = 1 << 20  # 保证网格坐标编码为非负整数
+
+    def __init__(self, cell_size: float):
+        assert cell_size > 0
+        self.cell_size = cell_size
+        self.sorted_keys = np.zeros(0, dtype=np.int64)
+        self.sorted_indices = np.zeros(0, dtype=np.intp)
+
+    def _cell(self, v: np.ndarray | float):
+        return np.floor(np.asarray(v, dtype=np.float64) / self.cell_size).astype(np.int64)
+
+    @classmethod
+    def _key(cls, cx: np.ndarray | int, cy: np.ndarray | int):
+        return (cx + cls._KEY_OFFSET) * (cls._KEY_OFFSET * 2) + (cy + cls._KEY_OFFSET)
+
+    def build(self, x: np.ndarray, y: np.ndarray, indices: np.ndarray):
+        """
+        重建索引
+        :param x: 实体的x坐标
+        :param y: 实体的y坐标
+        :param indices: 实体对应的槽位
+        """
+        keys = self._key(self._cell(x), self._cell(y))
+        order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[order]
+        self.sorted_indices = np.asarray(indices)[order]
+
+    def query(self, x: float, y: float, radius: float) -> np.ndarray:
+        """
+        查询可能处于圆形范围内的实体（粗筛，调用方需要再按照精确距离过滤）
+        :return: 槽位，按照槽位从小到大排列
+        """
+        if len(self.sorted_keys) == 0:
+            return self.sorted_indices
+        rings = max(1, int(math.ceil(radius / self.cell_size)))
+        cx = int(self._cell(x))
+        cy = int(self._cell(y))
+        offsets = np.arange(-rings, rings + 1)
+        keys = self._key(cx + offsets[:, None], cy + offsets[None, :]).ravel()
+        starts = np.searchsorted(self.sorted_keys, keys, side='left')
+        ends = np.searchsorted(self.sorted_keys, keys, side='right')
+        parts = [self.sorted_indices[s:e] for s, e in zip(starts.tolist(), ends.tolist()) if e > s]
+        if len(parts) == 0:
+            return self.sorted_indices[:0]
+        return np.sort(np.concatenate(parts))
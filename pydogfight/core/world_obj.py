@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
 from typing import Tuple, TYPE_CHECKING, Union, Optional
 
 import numpy as np
@@ -9,11 +10,14 @@ from queue import Queue
 from pydogfight.utils.models import Waypoint
 from pydogfight.utils.traj import calc_optimal_path, OptimalPathParam
 from pydogfight.utils.intercept import *
+from pydogfight.utils.path_lut import OptimalPathLengthLUT
 from pydogfight.utils.rendering import *
 import weakref
 from pydogfight.utils.position_memory import PositionMemory
 from pydogfight.utils.models import *
 from pydogfight.utils.common import will_collide
+from pydogfight.core.entity_store import EntityStore, StoreField
+from pydogfight.core.events import EventType
 
 if TYPE_CHECKING:
     from pydogfight.core.options import Options
@@ -25,6 +29,22 @@ class WorldObj:
     Base class for grid world objects
     """
 
+    # 挂载到战场之后，下面这些状态保存在BattleArea.store中
+    speed = StoreField()
+    turn_radius = StoreField()
+    collision_radius = StoreField()
+    destroyed = StoreField()
+    route_param_time = StoreField('route_time')
+    last_is_in_game_range = StoreField()
+
+    _store: EntityStore | None = None
+    _index: int = -1
+
+    # to_dict输出的字段（除了动作队列，都是同名的属性）
+    DICT_FIELDS = ('name', 'type', 'color', 'speed', 'turn_radius', 'collision_radius', 'indestructible', 'waypoint',
+                   'destroyed', 'destroyed_reason', 'destroyed_count', 'destroyed_time', 'survival_time',
+                   'waiting_actions', 'consumed_actions', 'is_in_game_range')
+
     def __init__(self,
                  name: str,
                  options: Options,
@@ -35,6 +55,12 @@ class WorldObj:
                  turn_radius: float = 0,
                  collision_radius: float = 0):
         assert speed >= 0
+        self._store = None  # 实体所在的列式存储
+        self._index = -1  # 实体在列式存储中的槽位
+        self._waypoint: Waypoint | None = None
+        self._last_waypoint: Waypoint | None = None
+        self._route_param: OptimalPathParam | None = None
+        self._route_param_version = -1  # 缓存的_route_param对应的store.route_version
         self.name = name
         self.options = options
         self.type = type
@@ -57,7 +83,6 @@ class WorldObj:
 
         self._area = None  # 战场
         self.last_is_in_game_range = True  # 用来保存之前是否在游戏区域，避免超出游戏区域后每次都触发摧毁自己
-        self.last_waypoint: Waypoint | None = None  # 上一刻的航迹点
 
         self.route_param: None | OptimalPathParam = None
         self.route_param_time = 0
@@ -100,25 +125,18 @@ class WorldObj:
         self.route_param_time = obj.route_param_time
         self._area = obj._area
 
+    def dict_value(self, key: str):
+        """to_dict中key字段的值"""
+        if key == 'waiting_actions' or key == 'consumed_actions':
+            return [str(act) for act in read_queue_without_destroying(getattr(self, key))]
+        return getattr(self, key)
+
     def to_dict(self):
-        return {
-            'name'            : self.name,
-            'type'            : self.type,
-            'color'           : self.color,
-            'speed'           : self.speed,
-            'turn_radius'     : self.turn_radius,
-            'collision_radius': self.collision_radius,
-            'indestructible'  : self.indestructible,
-            'waypoint'        : self.waypoint,
-            'destroyed'       : self.destroyed,
-            'destroyed_reason': self.destroyed_reason,
-            'destroyed_count' : self.destroyed_count,
-            'destroyed_time'  : self.destroyed_time,
-            'survival_time'   : self.survival_time,
-            'waiting_actions' : [str(act) for act in read_queue_without_destroying(self.waiting_actions)],
-            'consumed_actions': [str(act) for act in read_queue_without_destroying(self.consumed_actions)],
-            'is_in_game_range': self.is_in_game_range
-        }
+        return { key: self.dict_value(key) for key in self.DICT_FIELDS }
+
+    def dict_view(self) -> ObjDictView:
+        """to_dict的惰性视图，只有读取到的字段才会计算"""
+        return ObjDictView(self)
 
     def __str__(self):
         return json.dumps(self.to_dict(), indent=4, ensure_ascii=False)
@@ -127,12 +145,15 @@ class WorldObj:
         return self.__str__()
 
     def destroy(self, reason: str, source=None):
+        newly_destroyed = not self.indestructible and not self.destroyed
         if not self.indestructible:
             self.destroyed = True
         if self.waiting_actions == 0:
             self.destroyed_time = self.area.time
         self.destroyed_count += 1
         self.destroyed_reason.append((reason, source))
+        if self.area is not None:
+            self.area.on_obj_destroyed(self, newly_destroyed=newly_destroyed, reason=reason, source=source)
 
     def put_action(self, action):
         if self.destroyed:
@@ -146,6 +167,53 @@ class WorldObj:
     def attach(self, battle_area: 'BattleArea'):
         self._area = weakref.ref(battle_area)
 
+    @property
+    def index(self) -> int:
+        """在战场列式存储中的槽位，-1代表没有挂载到战场上"""
+        return self._index
+
+    @property
+    def waypoint(self) -> Waypoint:
+        if self._store is not None:
+            return self._store.waypoint(self._index)
+        return self._waypoint
+
+    @waypoint.setter
+    def waypoint(self, value: Waypoint):
+        self._waypoint = value
+        if self._store is not None:
+            self._store.set_waypoint(self._index, value)
+
+    @property
+    def last_waypoint(self) -> Waypoint | None:
+        """上一刻的航迹点"""
+        if self._store is not None:
+            return self._store.last_waypoint(self._index)
+        return self._last_waypoint
+
+    @property
+    def route_param(self) -> OptimalPathParam | None:
+        """当前需要遵循的航迹"""
+        store = self._store
+        if store is None:
+            return self._route_param
+        index = self._index
+        if not store.has_route[index]:
+            return None
+        version = store.route_version.item(index)
+        if self._route_param_version != version:
+            # 航迹被仿真内核修改过，重新从store中读取
+            self._route_param = store.route_param(index)
+            self._route_param_version = version
+        return self._route_param
+
+    @route_param.setter
+    def route_param(self, value: OptimalPathParam | None):
+        self._route_param = value
+        if self._store is not None:
+            self._store.set_route(self._index, value)
+            self._route_param_version = self._store.route_version.item(self._index)
+
     @property
     def area(self) -> Optional['BattleArea']:
         if self._area is None:
@@ -177,13 +245,49 @@ class WorldObj:
 
     def render(self, screen):
         """Draw this object with the given renderer"""
+        self.render_from_state(options=self.options, screen=screen, state=self.render_state())
+
+    def render_state(self) -> dict:
+        """渲染需要用到的状态（只包含基础类型和数组，可以序列化后交给渲染进程）"""
+        return {
+            'type'     : self.type,
+            'name'     : self.name,
+            'color'    : self.color,
+            'position' : (float(self.waypoint.x), float(self.waypoint.y)),
+            'psi'      : float(self.waypoint.psi),
+            'destroyed': bool(self.destroyed),
+        }
+
+    @classmethod
+    def render_from_state(cls, options: Options, screen, state: dict):
+        """根据render_state画出物体"""
         raise NotImplementedError
 
     def distance(self, to: WorldObj | tuple[float, float] | Waypoint | np.ndarray) -> float:
         if isinstance(to, WorldObj):
+            area = self.area
+            if area is not None:
+                # 优先使用战场缓存的距离矩阵
+                return area.distance_between(self, to)
             to = to.waypoint
         return self.waypoint.distance(to)
 
+    def relative_polar_waypoint(self, obj: WorldObj) -> PolarWaypoint:
+        """obj相对自己的极坐标航迹点"""
+        area = self.area
+        if area is not None:
+            return area.relative_polar(self, obj)
+        return self.waypoint.relative_polar_waypoint(obj.waypoint)
+
+    def calculate_positioning(self, obj: WorldObj, angle_tolerance: float = 15) -> ObjPositioning:
+        """和obj之间的态势关系"""
+        return ObjPositioning(
+                wpt1=self.waypoint,
+                wpt2=obj.waypoint,
+                angle_tolerance=angle_tolerance,
+                rel_2_on_1=self.relative_polar_waypoint(obj),
+                rel_1_on_2=obj.relative_polar_waypoint(self))
+
     def will_collide(self, obj: WorldObj):
         # 假设物体是圆形的，可以通过计算它们中心点的距离来检测碰撞
         # 如果两个物体之间的距离小于它们的半径之和，则认为它们发生了碰撞
@@ -210,7 +314,10 @@ class WorldObj:
         return collided
 
     def update(self, delta_time: float):
-        """更新状态"""
+        """
+        更新状态，在仿真内核计算移动之前调用
+        移动、燃油消耗、边界检查等数值计算由BattleArea.kernel批量完成，这里只处理无法向量化的行为（例如执行动作）
+        """
         pass
 
     def calc_optimal_path(self, target: tuple[float, float], turn_radius: float) -> OptimalPathParam:
@@ -237,37 +344,24 @@ class WorldObj:
         return boundary.contains(self.waypoint.location)
 
     def do_move(self, waypoint: Waypoint):
-        self.last_waypoint = self.waypoint
-        self.waypoint = waypoint
+        if self._store is not None:
+            self._store.move(self._index, waypoint)
+            return
+        self._last_waypoint = self._waypoint
+        self._waypoint = waypoint
 
-    def update_follow_route(self) -> bool:
-        """
-        沿着轨迹运动
-        :return: 是否运动成功
-        """
-        if self.route_param is None:
-            return False
-        move_length = self.speed * (self.area.time - self.route_param_time)
-        if move_length > self.route_param.length:
+    def on_route_changed(self):
+        """航迹被仿真内核修改（走完或者重新规划）之后调用，只在渲染时需要"""
+        route_param = self.route_param
+        if route_param is None:
             self.render_route = None
-            self.route_param = None
-            self.route_param_time = 0
-            return False
+        elif self.options.render_enabled():
+            self.render_route = route_param.build_route(route_param.length / 20)
 
-        next_wpt = self.route_param.next_waypoint(length=self.speed * (self.area.time - self.route_param_time))
-        if next_wpt is None:
-            self.render_route = None
-            self.route_param = None
-            self.route_param_time = 0
-            return False
-        self.do_move(next_wpt)
-        return True
-
-    def update_move_forward(self, delta_time: float):
-        # 朝着psi的方向移动, psi是航向角，0度指向正北，90度指向正东
-        # 将航向角从度转换为弧度
-        new_wpt = self.waypoint.move(d=delta_time * self.speed, angle=0)
-        self.do_move(new_wpt)
+    def on_exit_game_range(self):
+        """飞出了战场边界（只在飞出的那一刻触发）"""
+        self.area.emit(EventType.OUT_OF_GAME_RANGE, obj=self)
+        self.destroy(reason=DestroyReason.OUT_OF_GAME_RANGE)
 
     def go_to_location(self, target: tuple[float, float]):
         # if self.route is not None and len(self.route) > 0 and not force:
@@ -288,7 +382,7 @@ class WorldObj:
             return
         self.route_param = route_param
         self.route_param_time = self.area.time - self.options.delta_time  # 需要通过这种方式来保证当前帧就能更新位置，不然会丢掉一帧
-        if self.options.render:
+        if self.options.render_enabled():
             self.render_route = self.route_param.build_route(self.route_param.length / 20)
 
     def generate_test_moves(self, in_safe_area: bool = True, angle_sep: int = 45, test_time: int = 15) -> list[
@@ -342,7 +436,46 @@ class WorldObj:
                 ).length)
 
 
+class ObjDictView(Mapping):
+    """
+    实体to_dict的只读惰性视图（例如行为树context里的agent）
+    字段在第一次读取时才计算并缓存，没有读取的字段（动作队列、各种列表）不会计算
+    可以像dict一样在jinja2模版中使用，例如{{agent.fuel}}
+    """
+
+    def __init__(self, obj: WorldObj):
+        self.obj = obj
+        self._values = { }
+
+    def __getitem__(self, key: str):
+        if key not in self._values:
+            if key not in self.obj.DICT_FIELDS:
+                raise KeyError(key)
+            self._values[key] = self.obj.dict_value(key)
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self.obj.DICT_FIELDS)
+
+    def __len__(self):
+        return len(self.obj.DICT_FIELDS)
+
+    def to_dict(self) -> dict:
+        return { key: self[key] for key in self }
+
+    def __repr__(self):
+        return f'ObjDictView({self.obj.name})'
+
+
 class Aircraft(WorldObj):
+    fuel = StoreField()
+    fuel_consumption_rate = StoreField()
+
+    DICT_FIELDS = WorldObj.DICT_FIELDS + (
+        'missile_count', 'fuel', 'fuel_consumption_rate', 'radar_radius', 'last_fire_missile_time',
+        'missile_hit_enemy', 'missile_hit_enemy_count', 'missile_hit_self', 'missile_hit_self_count', 'missile_miss',
+        'missile_miss_count', 'missile_evade_success', 'missile_evade_success_count', 'missile_fired',
+        'missile_fired_count', 'missile_fire_fail_count', 'aircraft_collided_count', 'home_returned_count')
 
     def __init__(self,
                  name: str,
@@ -434,60 +567,38 @@ class Aircraft(WorldObj):
 
         self.home_returned_count = obj.home_returned_count  # 到基地次数
 
-    def to_dict(self):
+    def render_state(self) -> dict:
         return {
-            **super().to_dict(),
-            'collision_radius'           : self.collision_radius,
-            'missile_count'              : self.missile_count,
-            'fuel'                       : self.fuel,
-            'fuel_consumption_rate'      : self.fuel_consumption_rate,
-            'radar_radius'               : self.radar_radius,
-            'last_fire_missile_time'     : self.last_fire_missile_time,
-            'missile_hit_enemy'          : self.missile_hit_enemy,
-            'missile_hit_enemy_count'    : self.missile_hit_enemy_count,
-            'missile_hit_self'           : self.missile_hit_self,
-            'missile_hit_self_count'     : self.missile_hit_self_count,
-            'missile_miss'               : self.missile_miss,
-            'missile_miss_count'         : self.missile_miss_count,
-            'missile_evade_success'      : self.missile_evade_success,
-            'missile_evade_success_count': self.missile_evade_success_count,
-            'missile_fired'              : self.missile_fired,
-            'missile_fired_count'        : self.missile_fired_count,
-            'missile_fire_fail_count'    : self.missile_fire_fail_count,
-            'aircraft_collided_count'    : self.aircraft_collided_count,
-            'home_returned_count'        : self.home_returned_count,
+            **super().render_state(),
+            'route'       : self.render_route,
+            'radar_radius': self.radar_radius,
         }
 
-    def render(self, screen):
-        try:
-            import pygame
-            from pygame import gfxdraw
-        except ImportError as e:
-            raise e
-
+    @classmethod
+    def render_from_state(cls, options: Options, screen, state: dict):
         assert screen is not None
 
-        render_img(options=self.options,
+        render_img(options=options,
                    screen=screen,
-                   position=self.waypoint.location,
-                   img_path=f'aircraft_{self.color}.svg',
-                   label=self.name,
-                   rotate=self.waypoint.psi + 180)
-        if self.destroyed:
-            render_img(options=self.options,
+                   position=state['position'],
+                   img_path=f'aircraft_{state["color"]}.svg',
+                   label=state['name'],
+                   rotate=state['psi'] + 180)
+        if state['destroyed']:
+            render_img(options=options,
                        screen=screen,
                        img_path='explosion.svg',
-                       position=self.waypoint.location)
+                       position=state['position'])
 
         # 画出导航轨迹
-        render_route(options=self.options, screen=screen, route=self.render_route, color=self.color)
+        render_route(options=options, screen=screen, route=state['route'], color=state['color'])
 
         # 画出雷达圆圈
         render_circle(
-                options=self.options,
+                options=options,
                 screen=screen,
-                position=self.waypoint.location,
-                radius=self.radar_radius,
+                position=state['position'],
+                radius=state['radar_radius'],
                 color='green'
         )
 
@@ -513,29 +624,15 @@ class Aircraft(WorldObj):
             elif action_type == Actions.go_home:
                 self.go_home()
 
-        # 执行移动
-        if not self.update_follow_route():
-            self.update_move_forward(delta_time=delta_time)
-
-        if self.options.destroy_on_boundary_exit and not self.is_in_game_range and self.last_is_in_game_range:
-            self.destroy(reason=DestroyReason.OUT_OF_GAME_RANGE)
+    def has_pending_fire_missile(self) -> bool:
+        """等待执行的动作中是否有发射导弹（发射导弹需要读取其他飞机这一步移动之后的位置）"""
+        return any(int(action[0]) == Actions.fire_missile for action in self.waiting_actions.queue)
 
-        self.last_is_in_game_range = self.is_in_game_range
-
-        # 记忆路径点
-        self.position_memory.add_position(self.waypoint.location)
-
-        if self.fuel <= 0:
-            return
-
-        # 消耗汽油
-        self.fuel -= self.fuel_consumption_rate * delta_time
-        # 检查剩余油量
-        if self.fuel <= 0:
-            # 只会在油量耗尽的那一刻触发一次被摧毁
-            # 耗尽燃油
-            self.destroy(reason=DestroyReason.FUEL_DEPLETION)
-            self.fuel_depletion_count += 1
+    def on_fuel_depleted(self):
+        """燃油耗尽，只会在油量耗尽的那一刻触发一次"""
+        self.area.emit(EventType.FUEL_DEPLETED, obj=self)
+        self.destroy(reason=DestroyReason.FUEL_DEPLETION)
+        self.fuel_depletion_count += 1
 
     def go_home(self):
         home_position = self.area.get_home(self.color).waypoint.location
@@ -552,6 +649,7 @@ class Aircraft(WorldObj):
         """
         if not self.can_fire_missile():
             self.missile_fire_fail_count += 1
+            self.area.emit(EventType.MISSILE_FIRE_FAIL, obj=self)
             return
 
         self.last_fire_missile_time = self.area.time
@@ -578,6 +676,7 @@ class Aircraft(WorldObj):
             self.missile_fired_count = len(self.missile_fired)
 
             self.area.add_obj(missile)
+            self.area.emit(EventType.MISSILE_FIRED, obj=self, other=fire_enemy, missile=missile)
             # print(f'发射了导弹: {missile.name}')
 
     def predict_missile_intercept_point(self, target_wpt: Waypoint, target_speed: float) -> InterceptPointResult | None:
@@ -593,10 +692,12 @@ class Aircraft(WorldObj):
                 self_turn_radius=self.options.missile_min_turn_radius,
                 target_wpt=target_wpt,
                 target_speed=target_speed,
+                lut=OptimalPathLengthLUT.for_options(self.options),
         )
 
     def on_collision(self, obj: WorldObj):
         if isinstance(obj, Aircraft):
+            self.area.emit(EventType.AIRCRAFT_COLLISION, obj=self, other=obj)
             self.destroy(reason=DestroyReason.COLLIDED_WITH_AIRCRAFT, source=obj.name)
             self.aircraft_collided_count += 1
         elif isinstance(obj, Missile) and obj.source.name != self.name:
@@ -619,6 +720,7 @@ class Aircraft(WorldObj):
         """自己发出的导弹命中敌人"""
         self.missile_hit_enemy.append((missile.name, enemy.name))
         self.missile_hit_enemy_count += 1
+        self.area.emit(EventType.MISSILE_HIT, obj=self, other=enemy, missile=missile)
 
     def on_missile_hit_self(self, missile: Missile):
         """自己被别人发出的导弹命中"""
@@ -631,6 +733,8 @@ class Aircraft(WorldObj):
         # 导弹针对的飞机规避成功
         missile.target.missile_evade_success_count += 1
         missile.target.missile_evade_success.append(missile.name)
+        self.area.emit(EventType.MISSILE_MISS, obj=self, other=missile.target, missile=missile)
+        self.area.emit(EventType.MISSILE_EVADE, obj=missile.target, other=self, missile=missile)
 
     def on_return_home(self):
         """
@@ -666,6 +770,10 @@ class Aircraft(WorldObj):
 
 
 class Missile(WorldObj):
+    fuel = StoreField()
+    fuel_consumption_rate = StoreField()
+    _last_generate_route_time = StoreField('reroute_time')
+
     def __init__(self, name: str, source: Aircraft, target: Aircraft, time: float):
         """
         :param source:
@@ -701,25 +809,31 @@ class Missile(WorldObj):
         self.fuel_consumption_rate = obj.fuel_consumption_rate
         self._last_generate_route_time = obj._last_generate_route_time
 
-    def render(self, screen):
-        # print('render missile', self.name, self.screen_position, self.destroyed)
-        if self.destroyed:
+    def render_state(self) -> dict:
+        return {
+            **super().render_state(),
+            'route': self.render_route,
+        }
+
+    @classmethod
+    def render_from_state(cls, options: Options, screen, state: dict):
+        if state['destroyed']:
             return
 
         render_img(
-                options=self.options,
+                options=options,
                 screen=screen,
-                position=self.waypoint.location,
-                img_path=f'missile_{self.color}.svg',
+                position=state['position'],
+                img_path=f'missile_{state["color"]}.svg',
                 # label=self.name,
-                rotate=self.waypoint.psi + 90,
+                rotate=state['psi'] + 90,
         )
 
         render_route(
-                options=self.options,
+                options=options,
                 screen=screen,
-                route=self.render_route,
-                color=self.color,
+                route=state['route'],
+                color=state['color'],
                 count=20
         )
 
@@ -731,30 +845,9 @@ class Missile(WorldObj):
             # 被摧毁的原因不是碰撞飞机，说明没有命中过敌机
             self.source.on_missile_miss(self)
 
-    def update(self, delta_time: float):
-        self.fuel -= self.fuel_consumption_rate * delta_time
-
-        if self.fuel <= 0:
-            # 燃油耗尽，说明没有命中过敌机
-            self.destroy(reason=DestroyReason.FUEL_DEPLETION)
-
-        # self.go_to_location(target=self.target.waypoint.location)
-        if self.area.time - self._last_generate_route_time > self.options.missile_reroute_interval:
-            self._last_generate_route_time = self.area.time
-
-            self.go_to_location(target=self.target.waypoint.location)
-        # # 每隔1秒重新生成一次轨迹
-        # hit_param = calc_optimal_path(
-        #         start=self.waypoint,
-        #         target=self.target.waypoint.location,
-        #         turn_radius=self.turn_radius
-        # )
-        # if hit_param.length != float('inf'):
-        #     self.route = hit_param.build_route(step=delta_time * self.speed)  # 生成轨迹
-        #     self.route_index = 0
-
-        if not self.update_follow_route():
-            self.update_move_forward(delta_time=delta_time)
+    def on_fuel_depleted(self):
+        # 燃油耗尽，说明没有命中过敌机
+        self.destroy(reason=DestroyReason.FUEL_DEPLETION)
 
     def on_collision(self, obj: WorldObj):
         if isinstance(obj, Aircraft):
@@ -770,55 +863,66 @@ class Bullseye(WorldObj):
         super().__init__(type='bullseye', options=options, name='bullseye', color='white', waypoint=Waypoint())
         self.radius = options.bullseye_safe_radius()  # 安全半径
 
-    def render(self, screen):
+    def render_state(self) -> dict:
+        return {
+            **super().render_state(),
+            'radius': self.radius,
+        }
+
+    @classmethod
+    def render_from_state(cls, options: Options, screen, state: dict):
         # 渲染安全区域
-        render_circle(options=self.options,
+        render_circle(options=options,
                       screen=screen,
                       radius=1,
-                      position=self.waypoint.location,
+                      position=state['position'],
                       color='black',
                       width=3)
 
-        render_circle(options=self.options,
+        render_circle(options=options,
                       screen=screen,
-                      radius=self.radius,
-                      position=self.waypoint.location,
+                      radius=state['radius'],
+                      position=state['position'],
                       color='grey',
                       width=3)
 
 
 class Home(WorldObj):
+    DICT_FIELDS = WorldObj.DICT_FIELDS + ('radius', 'in_range_objs')
+
     def __init__(self, name: str, color: str, options: Options, waypoint: Waypoint):
         super().__init__(type='home', options=options, name=name, color=color, waypoint=waypoint)
         self.radius = options.home_area_radius
         self.in_range_objs = { }
 
-    def render(self, screen):
-        render_img(options=self.options,
+    def render_state(self) -> dict:
+        return {
+            **super().render_state(),
+            'radius': self.radius,
+        }
+
+    @classmethod
+    def render_from_state(cls, options: Options, screen, state: dict):
+        render_img(options=options,
                    screen=screen,
-                   position=self.waypoint.location,
-                   img_path=f'home_{self.color}.svg',
-                   label=self.name)
+                   position=state['position'],
+                   img_path=f'home_{state["color"]}.svg',
+                   label=state['name'])
         # 画出安全圆圈
-        render_circle(options=self.options, screen=screen, position=self.waypoint.location, radius=self.radius,
+        render_circle(options=options, screen=screen, position=state['position'], radius=state['radius'],
                       color='green')
 
-    def to_dict(self):
-        return {
-            **super().to_dict(),
-            'radius'       : self.radius,
-            'in_range_objs': self.in_range_objs
-        }
-
-    def update(self, delta_time: float):
-        # 查看哪些飞机飞到了基地附近
+    def update_contacts(self, aircraft: list[Aircraft], inside: list[bool]):
+        """
+        查看哪些飞机飞到了基地附近
+        :param aircraft: 战场上所有的飞机
+        :param inside: 每架飞机是否在基地范围内（由仿真内核批量计算）
+        """
         assert self.area is not None
         area = self.area
 
-        for obj in area.objs.values():
-            if not isinstance(obj, Aircraft):
-                continue
-            if self.distance(obj) > self.radius:
+        for obj, is_inside in zip(aircraft, inside):
+            if not is_inside:
                 # 不在基地范围内
                 if obj.name in self.in_range_objs:
                     in_time = self.in_range_objs[obj.name]
@@ -837,6 +941,7 @@ class Home(WorldObj):
         # 飞机飞进来了
         if aircraft.color == self.color:
             aircraft.on_return_home()
+            self.area.emit(EventType.HOME_RETURN, obj=aircraft, other=self)
         else:
             # 摧毁敌机
             if self.options.home_attack:
@@ -854,6 +959,15 @@ class Home(WorldObj):
         """
         pass
 
+
+RENDER_CLASSES: dict[str, type[WorldObj]] = {
+    'aircraft': Aircraft,
+    'missile' : Missile,
+    'bullseye': Bullseye,
+    'home'    : Home,
+}  # render_state中type对应的类，用来从状态画出物体
+
+
 # class Obstacle(WorldObj):
 #     """障碍物，飞机飞到这里就会被摧毁"""
 #
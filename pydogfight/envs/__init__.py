@@ -1 +1,5 @@
 from .dogfight_2d_env import *
+from .vec_env import *
+from .recorder import *
+from .replay_env import *
+from .replay_dataset import *
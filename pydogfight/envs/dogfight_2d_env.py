@@ -10,24 +10,27 @@ from gymnasium.error import DependencyNotInstalled
 from pydogfight.core.world_obj import *
 from pydogfight.core.options import Options
 from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.kernel import KernelRequest
 from pydogfight.core.actions import Actions
 import time
 import threading
 import asyncio
 from pydogfight.utils.obs_utils import ObsUtils
+from pydogfight.envs.render_process import RenderProcess, RenderSnapshot, draw_snapshot
 from collections import defaultdict
 
 
 class Dogfight2dEnv(gym.Env):
     metadata = {
-        'render.modes': ['human'],
+        'render.modes': ['human', 'rgb_array'],
+        'render_modes': ['human', 'rgb_array'],
         # "render_fps"  : 50,
     }
 
     def __init__(self, options: Options = Options(), battle_area_class: BattleArea.__class__ = BattleArea, **kwargs):
         super().__init__()
         options.validate()
-        self.render_mode = 'human' if options.render else ''
+        self.render_mode = options.render_mode or ('human' if options.render else '')
         self.options = options
         self.battle_area = battle_area_class(options=options)
 
@@ -57,6 +60,8 @@ class Dogfight2dEnv(gym.Env):
         self.agent_observation_space = self.obs_utils_dict[options.red_agents[0]].observation_space
 
         self.screen = None
+        self.render_process: RenderProcess | None = None  # options.render_process开启时的渲染进程
+        self.offscreen = None  # render_rgb使用的离屏Surface，不需要显示窗口
         # self.clock # pygame.time.Clock
         self.isopen = True
         self.paused = False  # 是否暂停
@@ -169,6 +174,8 @@ class Dogfight2dEnv(gym.Env):
                 handler(self)
 
         self.battle_area.episode_start()
+        for obs_utils in self.obs_utils_dict.values():
+            obs_utils.reset()
 
         self.update_game_info()
 
@@ -176,35 +183,52 @@ class Dogfight2dEnv(gym.Env):
             handler(self)
 
         if self.render_mode == "human":
-            import pygame
-            if self.screen is None:
-                pygame.init()
-                pygame.display.init()
-                self.screen = pygame.display.set_mode(
-                        self.options.screen_size,
-                        pygame.HWSURFACE | pygame.DOUBLEBUF | pygame.RESIZABLE)
-                self.screen.fill((255, 255, 255))
-                pygame.display.set_caption(self.options.title)
-            # if self.clock is None:
-            #     self.clock = pygame.time.Clock()
+            self.init_render()
             self.render()
 
         return self.gen_obs(), self.gen_info()
 
+    def init_render(self):
+        """human模式下打开渲染窗口（或者启动渲染进程），已经打开时什么也不做"""
+        if self.options.render_process:
+            if self.render_process is None:
+                self.render_process = RenderProcess(options=self.options)
+        elif self.screen is None:
+            import pygame
+            pygame.init()
+            pygame.display.init()
+            self.screen = pygame.display.set_mode(
+                    self.options.screen_size,
+                    pygame.HWSURFACE | pygame.DOUBLEBUF | pygame.RESIZABLE)
+            self.screen.fill((255, 255, 255))
+            pygame.display.set_caption(self.options.title)
+        # if self.clock is None:
+        #     self.clock = pygame.time.Clock()
+
     def gen_obs(self):
         if self.options.self_side == 'red':
             return self.gen_agent_obs(self.options.red_agents[0])
         else:
             return self.gen_agent_obs(self.options.blue_agents[0])
 
-    def gen_agent_obs(self, agent_name: str):
+    def gen_agent_obs(self, agent_name: str, out: np.ndarray | None = None):
         """
         获取agent视角的obs
         注意这里的坐标用相对极坐标来表示
         :param agent_name:
+        :param out: 直接写入调用方提供的缓冲区（形状为agent_observation_space.shape）
         :return:
         """
-        return self.obs_utils_dict[agent_name].gen_obs()
+        return self.obs_utils_dict[agent_name].gen_obs(out=out)
+
+    def gen_all_obs(self, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        一次获取所有agent视角的obs，顺序和options.agents()一致，结果和逐个调用gen_agent_obs一致
+        :param out: 直接写入调用方提供的缓冲区（形状为(len(agents), *agent_observation_space.shape)）
+        :return: (agents, N, W)
+        """
+        return ObsUtils.gen_all_obs(
+                obs_utils=[self.obs_utils_dict[name] for name in self.options.agents()], out=out)
 
     def gen_info(self) -> dict:
         info = {
@@ -230,11 +254,15 @@ class Dogfight2dEnv(gym.Env):
             agent.put_action(act)
 
     def update(self):
+        self.battle_area.kernel.run(self.update_stages())
+
+    def update_stages(self) -> typing.Iterator[KernelRequest]:
+        """update的分阶段版本（BattleArea.update_stages），Dogfight2dVecEnv用来把多场对战的仿真内核计算合并在一起"""
         for handler in self.before_update_handlers:
             handler(self)
         next_time = self.battle_area.time + self.options.update_interval
         while self.battle_area.time < next_time:
-            self.battle_area.update()
+            yield from self.battle_area.update_stages()
         self.last_update_nanotime = time.perf_counter_ns()
         self.update_game_info()
         for handler in self.after_update_handlers:
@@ -264,6 +292,15 @@ class Dogfight2dEnv(gym.Env):
         # 注意这里返回的状态是更新动作之前的（想获取更新动作之后的状态需要手动调用update）
         return self.gen_obs(), reward, info['terminated'], info['truncated'], info
 
+    def render_snapshot(self) -> RenderSnapshot:
+        """当前这一帧的渲染状态"""
+        return RenderSnapshot(
+                time=self.battle_area.time,
+                paused=self.paused,
+                render_info=tuple(self.render_info),
+                states=tuple(self.battle_area.render_states()),
+        )
+
     def render(self):
         try:
             import pygame
@@ -275,13 +312,18 @@ class Dogfight2dEnv(gym.Env):
         # print(f'Render {self.duration} {self.last_render_time}')
         self.last_render_time = time.time()
 
-        if self.render_mode == "human":
-            self.screen.fill((255, 255, 255))
+        if self.render_process is not None:
+            # 交给渲染进程去画，暂停状态以渲染窗口为准
+            self.render_process.submit(self.render_snapshot())
+            self.paused = self.render_process.paused
+            return
 
-            play_pause_img = pygame_load_img('play.svg' if self.paused else 'pause.svg').convert_alpha()
-            play_pause_img_rect = play_pause_img.get_rect()
-            play_pause_img_rect.right = self.options.screen_size[0] - 10
-            play_pause_img_rect.top = 10
+        if self.render_mode == 'rgb_array':
+            return self.render_rgb()
+
+        if self.render_mode == "human":
+            play_pause_img_rect = draw_snapshot(screen=self.screen, options=self.options,
+                                                snapshot=self.render_snapshot())
 
             event = pygame.event.poll()
             if event is not None:
@@ -293,25 +335,27 @@ class Dogfight2dEnv(gym.Env):
                     if play_pause_img_rect.collidepoint(event.pos):
                         self.paused = not self.paused  # 切换暂停状态
 
-            render_y = 10
-            for text in self.render_info:
-                # 渲染文本到 Surface 对象
-                render_text(
-                        screen=self.screen,
-                        text=text,
-                        topleft=(10, render_y),
-                        text_size=18,
-                )
-                render_y += 20
-
-            # 渲染安全区域
-            # render_rect(self.options, screen=self.screen, rect=self.options.safe_boundary, color='grey')
-            self.screen.blit(play_pause_img, play_pause_img_rect)
-            self.battle_area.render(self.screen)
             pygame.event.pump()
             # self.clock.tick(self.options.render_fps)
             pygame.display.update()
 
+    def render_rgb(self, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        画到离屏Surface上（不需要显示窗口，任何render_mode下都可以调用）
+        :param out: 写入的数组，为None时新建
+        :return: (屏幕高度, 屏幕宽度, 3)的RGB数组
+        """
+        import pygame
+        size = (int(self.options.screen_size[0]), int(self.options.screen_size[1]))
+        if self.offscreen is None or self.offscreen.get_size() != size:
+            self.offscreen = pygame.Surface(size)
+        draw_snapshot(screen=self.offscreen, options=self.options, snapshot=self.render_snapshot())
+        if out is None:
+            out = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        # tobytes按行输出RGB，比surfarray（按列存储）转置复制快得多
+        out.reshape(-1)[:] = np.frombuffer(pygame.image.tobytes(self.offscreen, 'RGB'), dtype=np.uint8)
+        return out
+
     def should_render(self):
         if self.render_mode == 'human':
             time_passed = time.time() - self.last_render_time
@@ -323,7 +367,8 @@ class Dogfight2dEnv(gym.Env):
     def should_update(self):
         if self.paused:
             return
-        if self.render_mode == 'human':
+        if self.render_mode == 'human' and self.render_process is None:
+            # 在本进程中渲染时按照simulation_rate限制仿真速度，交给渲染进程时不等待（渲染进程只画最新的一帧）
             nanotime_passed = (time.perf_counter_ns() - self.last_update_nanotime)  # 真实世界过去1s
             # print('should_update', time_passed, 'seconds')
             return nanotime_passed >= self.options.update_interval / self.options.simulation_rate * 1e9
@@ -331,11 +376,16 @@ class Dogfight2dEnv(gym.Env):
             return True
 
     def close(self):
+        self.offscreen = None
+        if self.render_process is not None:
+            self.render_process.close()
+            self.render_process = None
         if self.screen is not None:
             import pygame
 
             pygame.display.quit()
             pygame.quit()
+            render_cache.clear()
             self.isopen = False
 
     def gen_reward(self, color: str, previous: dict | float | None):
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import json
+import os
+import typing
+
+import numpy as np
+
+from pydogfight.core.events import Event, EventType
+from pydogfight.core.world_obj import Aircraft, Missile
+from pydogfight.utils.episode_file import write_episode_file
+
+if typing.TYPE_CHECKING:
+    from pydogfight.envs.dogfight_2d_env import Dogfight2dEnv
+
+EPISODE_SUFFIX = '.dfep'
+
+# 每一步每个槽位记录的列（EntityStore中的列），形状(步数, 槽位数)
+# 位置和朝向保留float64，float32的误差会让雷达范围、±180°附近的相对角度等判断和记录时不一致
+SLOT_COLUMNS = {
+    'x'          : np.float64,
+    'y'          : np.float64,
+    'psi'        : np.float64,
+    'speed'      : np.float32,
+    'turn_radius': np.float32,
+    'fuel'       : np.float32,
+    'destroyed'  : np.bool_,
+    'used'       : np.bool_,  # 槽位上的实体是否还在战场上（被移除的导弹为False）
+}
+
+# 每一步每个槽位记录的飞机属性（不在EntityStore中，其他类型的实体为0）
+AIRCRAFT_COLUMNS = {
+    'missile_count'         : np.int32,
+    'last_fire_missile_time': np.float64,  # 和时间比较，用float32会有误差
+}
+
+WINNERS = ['', 'red', 'blue', 'draw']  # winner列的取值对应的胜者
+
+
+def json_options(options) -> dict:
+    """Options中可以写入JSON的配置项"""
+    return { k: v for k, v in options.to_dict().items() if
+             isinstance(v, (bool, int, float, str, list, tuple, dict, type(None))) }
+
+
+class EpisodeRecorder:
+    """
+    把对战过程按照列式数组记录下来，每一轮写成一个二进制文件folder/{episode}.dfep（格式见EpisodeFile）
+    - 第0步是reset之后的状态，之后每次env.update之后记录一步
+    - 每一步记录所有槽位的位置、速度、燃油、是否被摧毁等，以及飞机的导弹数，形状(步数, 槽位数)
+    - 航迹只在变化时记录一行（route_step/route_slot/route_has/route）
+    - 动作在update之前从飞机的等待队列中读取（action_step是做出动作时的步数/action_agent/action）
+    - 每一步的时间、胜者、双方的累积奖励、是否结束
+    ReplayEnv可以读取这个文件，跳转到任意时刻重新渲染/生成观测，不需要重新仿真
+    """
+
+    def __init__(self, env: Dogfight2dEnv, folder: str, episode_stride: int = 1):
+        self.env = env
+        self.folder = folder
+        self.episode_stride = max(1, episode_stride)
+        self.recording = False
+        self.episode = 0
+        self.written_paths: list[str] = []
+        # 这一轮发射的导弹：槽位 -> (名称, 发射者槽位, 目标槽位, 发射时间)
+        # 同一次update内发射又被移除的导弹在记录这一步时已经拿不到实体了，只能在发射时记下来
+        self.fired: dict[int, tuple[str, int, int, float]] = { }
+
+        env.battle_area.events.subscribe(self.on_missile_fired, types=[EventType.MISSILE_FIRED])
+        env.add_episode_start_handler(lambda _: self.on_episode_start())
+        env.add_before_update_handler(lambda _: self.before_update())
+        env.add_after_update_handler(lambda _: self.record_step())
+        env.add_episode_end_handler(lambda _: self.on_episode_end())
+
+    def episode_path(self, episode: int) -> str:
+        return os.path.join(self.folder, f'{episode}{EPISODE_SUFFIX}')
+
+    def on_episode_start(self):
+        self.recording = self.env.episode % self.episode_stride == 0
+        if not self.recording:
+            return
+        self.episode = self.env.episode
+        self.steps: dict[str, list] = { name: [] for name in
+                                        ['time', 'winner', 'red_reward', 'blue_reward', 'terminated', 'truncated',
+                                         'slot_count'] }
+        self.columns: dict[str, list[np.ndarray]] = { name: [] for name in [*SLOT_COLUMNS, *AIRCRAFT_COLUMNS] }
+        self.slots = {
+            'slot_name'  : [],
+            'slot_type'  : [],
+            'slot_color' : [],
+            'slot_source': [],  # 导弹发射者的槽位，其他为-1
+            'slot_target': [],  # 导弹目标的槽位，其他为-1
+            'fire_time'  : [],  # 导弹发射的时间
+        }
+        self.routes = { 'route_step': [], 'route_slot': [], 'route_has': [], 'route': [] }
+        self.actions = { 'action_step': [], 'action_agent': [], 'action': [] }
+        self.route_version = np.zeros(0, dtype=np.int64)
+        self.fired = { }
+        self.record_step()
+
+    def on_missile_fired(self, event: Event):
+        if not self.recording:
+            return
+        missile = event.missile
+        self.fired[missile.index] = (missile.name, event.obj.index, event.other.index, missile.fire_time)
+
+    def before_update(self):
+        if not self.recording:
+            return
+        step = len(self.steps['time']) - 1
+        for k, agent_name in enumerate(self.env.options.agents()):
+            agent = self.env.battle_area.objs.get(agent_name)
+            if agent is None:
+                continue
+            for action in list(agent.waiting_actions.queue):
+                self.actions['action_step'].append(step)
+                self.actions['action_agent'].append(k)
+                self.actions['action'].append(np.asarray(action, dtype=np.float32)[:3])
+
+    def _record_new_slots(self, start: int, size: int):
+        store = self.env.battle_area.store
+        for slot in range(start, size):
+            obj = store.objs[slot]
+            self.slots['slot_type'].append(store.type[slot])
+            self.slots['slot_color'].append(store.color[slot])
+            if isinstance(obj, Missile):
+                self.slots['slot_name'].append(obj.name)
+                self.slots['slot_source'].append(obj.source.index)
+                self.slots['slot_target'].append(obj.target.index)
+                self.slots['fire_time'].append(obj.fire_time)
+            elif obj is None and slot in self.fired:
+                # 同一次update内发射又被移除的导弹
+                name, source, target, fire_time = self.fired[slot]
+                self.slots['slot_name'].append(name)
+                self.slots['slot_source'].append(source)
+                self.slots['slot_target'].append(target)
+                self.slots['fire_time'].append(fire_time)
+            else:
+                self.slots['slot_name'].append(obj.name if obj is not None else f'slot_{slot}')
+                self.slots['slot_source'].append(-1)
+                self.slots['slot_target'].append(-1)
+                self.slots['fire_time'].append(np.nan)
+
+    def record_step(self):
+        if not self.recording:
+            return
+        env = self.env
+        area = env.battle_area
+        store = area.store
+        size = store.size
+        step = len(self.steps['time'])
+
+        self._record_new_slots(len(self.slots['slot_name']), size)
+        for name, dtype in SLOT_COLUMNS.items():
+            self.columns[name].append(getattr(store, name)[:size].astype(dtype))
+        missile_count = np.zeros(size, dtype=AIRCRAFT_COLUMNS['missile_count'])
+        last_fire_missile_time = np.zeros(size, dtype=AIRCRAFT_COLUMNS['last_fire_missile_time'])
+        for slot in store.indices(type='aircraft').tolist():
+            obj: Aircraft = store.objs[slot]
+            missile_count[slot] = obj.missile_count
+            last_fire_missile_time[slot] = obj.last_fire_missile_time
+        self.columns['missile_count'].append(missile_count)
+        self.columns['last_fire_missile_time'].append(last_fire_missile_time)
+
+        # 航迹只记录变化
+        route_version = store.route_version[:size]
+        seen = np.zeros(size, dtype=np.int64)
+        seen[:len(self.route_version)] = self.route_version
+        for slot in np.flatnonzero(route_version != seen).tolist():
+            self.routes['route_step'].append(step)
+            self.routes['route_slot'].append(slot)
+            self.routes['route_has'].append(store.has_route[slot])
+            self.routes['route'].append(store.route[slot].copy())
+        self.route_version = route_version.copy()
+
+        info = env.gen_info()
+        self.steps['time'].append(area.time)
+        self.steps['winner'].append(WINNERS.index(info['winner']))
+        self.steps['red_reward'].append(info['red_reward'])
+        self.steps['blue_reward'].append(info['blue_reward'])
+        self.steps['terminated'].append(info['terminated'])
+        self.steps['truncated'].append(info['truncated'])
+        self.steps['slot_count'].append(size)
+
+    def on_episode_end(self):
+        if not self.recording:
+            return
+        self.recording = False
+        self.written_paths.append(self.write())
+
+    def write(self) -> str:
+        """把这一轮的记录写入文件"""
+        env = self.env
+        steps = len(self.steps['time'])
+        slots = len(self.slots['slot_name'])
+        arrays = {
+            'time'       : np.array(self.steps['time'], dtype=np.float64),
+            'winner'     : np.array(self.steps['winner'], dtype=np.int8),
+            'red_reward' : np.array(self.steps['red_reward'], dtype=np.float64),
+            'blue_reward': np.array(self.steps['blue_reward'], dtype=np.float64),
+            'terminated' : np.array(self.steps['terminated'], dtype=np.bool_),
+            'truncated'  : np.array(self.steps['truncated'], dtype=np.bool_),
+            'slot_count' : np.array(self.steps['slot_count'], dtype=np.int32),
+            'slot_type'  : np.array(self.slots['slot_type'], dtype=np.int8),
+            'slot_color' : np.array(self.slots['slot_color'], dtype=np.int8),
+            'slot_source': np.array(self.slots['slot_source'], dtype=np.int32),
+            'slot_target': np.array(self.slots['slot_target'], dtype=np.int32),
+            'fire_time'  : np.array(self.slots['fire_time'], dtype=np.float64),
+        }
+        for name, dtype in { **SLOT_COLUMNS, **AIRCRAFT_COLUMNS }.items():
+            # 每一步的槽位数量不同，后面加入的槽位在之前的步中补0
+            column = np.zeros((steps, slots), dtype=dtype)
+            for i, row in enumerate(self.columns[name]):
+                column[i, :len(row)] = row
+            arrays[name] = column
+        arrays['route_step'] = np.array(self.routes['route_step'], dtype=np.int32)
+        arrays['route_slot'] = np.array(self.routes['route_slot'], dtype=np.int32)
+        arrays['route_has'] = np.array(self.routes['route_has'], dtype=np.bool_)
+        arrays['route'] = np.array(self.routes['route'], dtype=np.float64).reshape(-1, store_route_width(env))
+        arrays['action_step'] = np.array(self.actions['action_step'], dtype=np.int32)
+        arrays['action_agent'] = np.array(self.actions['action_agent'], dtype=np.int16)
+        arrays['action'] = np.array(self.actions['action'], dtype=np.float32).reshape(-1, 3)
+
+        meta = {
+            'episode'   : self.episode,
+            'steps'     : steps,
+            'slots'     : slots,
+            'agents'    : env.options.agents(),
+            'slot_names': self.slots['slot_name'],
+            'options'   : json.loads(json.dumps(json_options(env.options), default=str)),
+        }
+        path = self.episode_path(self.episode)
+        write_episode_file(path, meta=meta, arrays=arrays)
+        return path
+
+
+def store_route_width(env: Dogfight2dEnv) -> int:
+    return env.battle_area.store.route.shape[1]
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import multiprocessing
+import pickle
+import typing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.options import Options
+from pydogfight.utils.rendering import render_cache, render_text
+
+
+class RenderSnapshot(typing.NamedTuple):
+    """一帧的渲染状态，只包含基础类型和数组，可以序列化后交给渲染进程"""
+    time: float
+    paused: bool
+    render_info: tuple[str, ...]  # 左上角的文字信息
+    states: tuple[dict, ...]  # BattleArea.render_states
+
+
+def draw_snapshot(screen, options: Options, snapshot: RenderSnapshot):
+    """
+    画出一帧（不会刷新屏幕）
+    :return: 暂停/播放按钮的区域
+    """
+    screen.fill((255, 255, 255))
+
+    play_pause_img = render_cache.image('play.svg' if snapshot.paused else 'pause.svg')
+    play_pause_img_rect = play_pause_img.get_rect()
+    play_pause_img_rect.right = options.screen_size[0] - 10
+    play_pause_img_rect.top = 10
+
+    render_y = 10
+    for text in snapshot.render_info:
+        # 渲染文本到 Surface 对象
+        render_text(
+                screen=screen,
+                text=text,
+                topleft=(10, render_y),
+                text_size=18,
+        )
+        render_y += 20
+
+    # 渲染安全区域
+    # render_rect(options, screen=screen, rect=options.safe_boundary, color='grey')
+    screen.blit(play_pause_img, play_pause_img_rect)
+    BattleArea.render_from_states(options=options, screen=screen, states=snapshot.states)
+    return play_pause_img_rect
+
+
+class SnapshotRingBuffer:
+    """
+    共享内存里的环形缓冲区，一个进程写入序列化后的帧，另一个进程只读取最新的一帧（来不及读的帧直接丢掉）
+    每个槽位用序号做校验（seqlock）：写入前置为-1，写完后置为帧序号，读取前后序号不变才算读到了完整的一帧
+    """
+
+    HEADER_SIZE = 5
+    LATEST = 0  # 最新写入的帧序号（从1开始）
+    CLOSED = 1  # 渲染进程是否已经退出（或者被要求退出）
+    PAUSED = 2  # 渲染窗口上是否点了暂停
+    DROPPED = 3  # 渲染进程来不及画而丢掉的帧数（只由读取方修改）
+    OVERSIZE = 4  # 太大而没有写入的帧数（只由写入方修改）
+
+    def __init__(self, slots: int, slot_size: int, name: str | None = None):
+        self.slots = slots
+        self.slot_size = slot_size
+        size = 8 * (self.HEADER_SIZE + 2 * slots) + slots * slot_size
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        buf = self.shm.buf
+        self.header = np.ndarray((self.HEADER_SIZE,), dtype=np.int64, buffer=buf)
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=8 * self.HEADER_SIZE)
+        self.lengths = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=8 * (self.HEADER_SIZE + slots))
+        self.data = np.ndarray((slots, slot_size), dtype=np.uint8, buffer=buf,
+                               offset=8 * (self.HEADER_SIZE + 2 * slots))
+        if self.owner:
+            self.header[:] = 0
+            self.seqs[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, payload: bytes) -> bool:
+        """写入一帧，超过槽位大小的帧会被丢掉"""
+        if len(payload) > self.slot_size:
+            self.header[self.OVERSIZE] += 1
+            return False
+        seq = int(self.header[self.LATEST]) + 1
+        slot = seq % self.slots
+        self.seqs[slot] = -1
+        self.data[slot, :len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+        self.lengths[slot] = len(payload)
+        self.seqs[slot] = seq
+        self.header[self.LATEST] = seq
+        return True
+
+    def read_latest(self, last_seq: int = 0) -> tuple[int, bytes] | None:
+        """读取最新的一帧，没有比last_seq更新的帧（或者读取过程中被覆盖了）时返回None"""
+        seq = int(self.header[self.LATEST])
+        if seq <= last_seq:
+            return None
+        slot = seq % self.slots
+        if self.seqs[slot] != seq:
+            return None
+        payload = self.data[slot, :int(self.lengths[slot])].tobytes()
+        if self.seqs[slot] != seq:
+            return None
+        return seq, payload
+
+    def close(self):
+        # 先释放numpy对共享内存的引用，否则shm.close会报错
+        self.header = self.seqs = self.lengths = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _render_main(name: str, slots: int, slot_size: int, options: Options):
+    """渲染进程：打开pygame窗口，按照render_fps画出最新的一帧"""
+    import pygame
+
+    buffer = SnapshotRingBuffer(slots=slots, slot_size=slot_size, name=name)
+    header = buffer.header
+    try:
+        pygame.init()
+        pygame.display.init()
+        screen = pygame.display.set_mode(
+                options.screen_size,
+                pygame.HWSURFACE | pygame.DOUBLEBUF | pygame.RESIZABLE)
+        pygame.display.set_caption(options.title)
+        clock = pygame.time.Clock()
+
+        last_seq = 0
+        snapshot: RenderSnapshot | None = None
+        play_pause_img_rect = None
+        dirty = True
+        while header[buffer.CLOSED] == 0:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    header[buffer.CLOSED] = 1
+                elif event.type == pygame.VIDEORESIZE:
+                    options.screen_size = event.size
+                    dirty = True
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    if play_pause_img_rect is not None and play_pause_img_rect.collidepoint(event.pos):
+                        header[buffer.PAUSED] = 1 - header[buffer.PAUSED]  # 切换暂停状态
+                        dirty = True
+
+            latest = buffer.read_latest(last_seq)
+            if latest is not None:
+                seq, payload = latest
+                if last_seq > 0:
+                    header[buffer.DROPPED] += seq - last_seq - 1
+                last_seq = seq
+                snapshot = pickle.loads(payload)
+                dirty = True
+
+            if dirty and snapshot is not None:
+                snapshot = snapshot._replace(paused=bool(header[buffer.PAUSED]))
+                play_pause_img_rect = draw_snapshot(screen=screen, options=options, snapshot=snapshot)
+                pygame.display.update()
+                dirty = False
+            clock.tick(options.render_fps)
+    finally:
+        header[buffer.CLOSED] = 1
+        header = None
+        pygame.quit()
+        buffer.close()
+
+
+class RenderProcess:
+    """
+    在单独的进程里渲染，仿真进程只需要把每一帧的RenderSnapshot写入共享内存，不用等待pygame绘制
+    渲染跟不上时只画最新的一帧，中间的帧会被丢掉
+    """
+
+    def __init__(self, options: Options):
+        self.buffer = SnapshotRingBuffer(slots=options.render_buffer_slots, slot_size=options.render_buffer_slot_size)
+        # pygame/SDL在fork出来的进程里不可靠，所以用spawn
+        ctx = multiprocessing.get_context('spawn')
+        self.process = ctx.Process(
+                target=_render_main,
+                args=(self.buffer.name, self.buffer.slots, self.buffer.slot_size, options),
+                daemon=True)
+        self.process.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.buffer.header is not None and self.buffer.header[
+            SnapshotRingBuffer.CLOSED] == 0 and self.process.is_alive()
+
+    @property
+    def paused(self) -> bool:
+        return self.buffer.header is not None and bool(self.buffer.header[SnapshotRingBuffer.PAUSED])
+
+    @property
+    def dropped_frames(self) -> int:
+        header = self.buffer.header
+        return int(header[SnapshotRingBuffer.DROPPED] + header[SnapshotRingBuffer.OVERSIZE])
+
+    def submit(self, snapshot: RenderSnapshot) -> bool:
+        """提交一帧，渲染进程已经退出或者帧太大时返回False"""
+        if not self.alive:
+            return False
+        return self.buffer.write(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def close(self, timeout: float = 5):
+        if self.buffer.header is None:
+            return
+        self.buffer.header[SnapshotRingBuffer.CLOSED] = 1
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.buffer.close()
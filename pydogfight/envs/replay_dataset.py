@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import glob
+import math
+import os
+import typing
+
+import numpy as np
+
+from pydogfight.core.actions import Actions
+from pydogfight.envs.recorder import EPISODE_SUFFIX
+from pydogfight.envs.replay_env import ReplayEnv
+from pydogfight.utils.common import standard_to_heading, wrap_angle_to_180
+from pydogfight.utils.episode_file import EpisodeFile, write_episode_file
+
+FEATURE_SUFFIX = '.dfds'
+
+# obs_fn(env, agent_name) -> 观测数组，形状在整个数据集中必须一致
+ObsFn = typing.Callable[[ReplayEnv, str], np.ndarray]
+# action_fn(env, agent_name, actions) -> 动作数组，actions是这一步该agent做出的[(action_type, x, y)]
+ActionFn = typing.Callable[[ReplayEnv, str, list], np.ndarray]
+
+
+def agent_obs(env: ReplayEnv, agent_name: str) -> np.ndarray:
+    """和RLNode.rl_gen_obs一致的观测（ObsUtils）"""
+    return env.gen_agent_obs(agent_name)
+
+
+def env_action(env: ReplayEnv, agent_name: str, actions: list) -> np.ndarray:
+    """最后一个动作(action_type, x, y)，没有动作时为keep"""
+    if len(actions) == 0:
+        return np.zeros(3, dtype=np.float32)
+    return np.asarray(actions[-1], dtype=np.float32)
+
+
+def _go_to_angle(env: ReplayEnv, agent_name: str, actions: list) -> float:
+    """
+    目标点相对飞机航向的转弯角度/180（RLGoToLocation中waypoint.move的逆运算）
+    这一步没有go_to_location时用飞机当前的航迹目标，没有航迹时为0（保持直飞）
+    """
+    agent = env.get_agent(agent_name)
+    target = None
+    for action in actions:
+        if int(action[0]) == Actions.go_to_location:
+            target = (float(action[1]), float(action[2]))
+    if target is None:
+        route_param = agent.route_param
+        if route_param is None:
+            return 0.0
+        target = (route_param.target.x, route_param.target.y)
+    wpt = agent.waypoint
+    if target[0] == wpt.x and target[1] == wpt.y:
+        return 0.0
+    heading = standard_to_heading(math.degrees(math.atan2(target[1] - wpt.y, target[0] - wpt.x)))
+    return wrap_angle_to_180(heading - wpt.psi) / 180
+
+
+def go_to_location_action(env: ReplayEnv, agent_name: str, actions: list) -> np.ndarray:
+    """RLGoToLocation的动作空间：(转弯角度/180,)"""
+    return np.array([_go_to_angle(env, agent_name, actions)], dtype=np.float32)
+
+
+def fire_and_go_to_location_action(env: ReplayEnv, agent_name: str, actions: list) -> np.ndarray:
+    """RLFireAndGoToLocation的动作空间：(是否发射导弹（1/-1）, 转弯角度/180)"""
+    fire = any(int(action[0]) == Actions.fire_missile for action in actions)
+    return np.array([1 if fire else -1, _go_to_angle(env, agent_name, actions)], dtype=np.float32)
+
+
+class ReplayDataset:
+    """
+    把EpisodeRecorder记录的对战转换成离线强化学习/行为克隆用的数据集
+    每个记录文件回放一次（ReplayEnv，不重新仿真），逐步用obs_fn/action_fn生成每个agent的特征，
+    结果写到记录文件旁边的{记录文件名}.{name}.dfds中（格式同EpisodeFile），之后直接以内存映射的方式读取
+    - obs: (agent数, 步数, *观测形状)
+    - action: (agent数, 步数-1, 动作维度)  第t步到第t+1步之间做出的动作
+    - reward: (agent数, 步数-1)  第t步到第t+1步之间该agent所在战队获得的奖励
+    - done: (agent数, 步数-1)  第t+1步是否结束（最后一次转移总是结束）
+    每个agent的第t步到第t+1步是一次转移，sample随机抽取转移，只从磁盘读入抽到的行
+    """
+
+    def __init__(self, paths: str | list[str],
+                 obs_fn: ObsFn = agent_obs,
+                 action_fn: ActionFn = env_action,
+                 name: str = 'default',
+                 agents: list[str] | None = None,
+                 rebuild: bool = False,
+                 seed: int | None = None):
+        """
+        :param paths: 记录文件的列表，或者记录文件所在的文件夹（EpisodeRecorder的folder）
+        :param name: 特征的名称，不同的obs_fn/action_fn需要用不同的名称，否则会读到之前生成的特征
+        :param agents: 需要的agent，默认为记录中的所有agent
+        :param rebuild: 是否重新生成已经存在的特征文件（记录文件比特征文件新时总是会重新生成）
+        """
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(os.path.join(paths, f'*{EPISODE_SUFFIX}')),
+                           key=lambda p: (len(p), p))  # 按照轮次排序
+        self.paths = list(paths)
+        self.obs_fn = obs_fn
+        self.action_fn = action_fn
+        self.name = name
+        self.agents = agents
+        self.rng = np.random.default_rng(seed)
+        self.files: list[EpisodeFile] = []
+        for path in self.paths:
+            feature_path = self.feature_path(path)
+            if rebuild or not os.path.exists(feature_path) or os.path.getmtime(feature_path) < os.path.getmtime(
+                    path):
+                self.build(path, feature_path)
+            self.files.append(EpisodeFile(feature_path))
+
+        # 每个文件的转移数量和在整个数据集中的起始位置
+        counts = [file['reward'].size for file in self.files]
+        self.offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+
+    def feature_path(self, path: str) -> str:
+        return f'{os.path.splitext(path)[0]}.{self.name}{FEATURE_SUFFIX}'
+
+    def build(self, path: str, feature_path: str):
+        """回放一个记录文件并写入特征文件"""
+        env = ReplayEnv(path)
+        agents = self.agents or env.file.meta['agents']
+        steps = env.num_steps
+        colors = ['red' if agent in env.options.red_agents else 'blue' for agent in agents]
+
+        obs = None
+        action = None
+        reward = np.zeros((len(agents), max(steps - 1, 0)), dtype=np.float32)
+        done = np.zeros((len(agents), max(steps - 1, 0)), dtype=np.bool_)
+
+        env.reset()
+        for t in range(steps):
+            for k, agent in enumerate(agents):
+                value = np.asarray(self.obs_fn(env, agent), dtype=np.float32)
+                if obs is None:
+                    obs = np.zeros((len(agents), steps, *value.shape), dtype=np.float32)
+                obs[k, t] = value
+            if t == steps - 1:
+                break
+            actions = env.actions_at(t)
+            previous = { color: env.gen_reward(color=color, previous=0) for color in ['red', 'blue'] }
+            for k, agent in enumerate(agents):
+                value = np.asarray(self.action_fn(env, agent, [a for name, a in actions if name == agent]),
+                                   dtype=np.float32)
+                if action is None:
+                    action = np.zeros((len(agents), steps - 1, *value.shape), dtype=np.float32)
+                action[k, t] = value
+            _, _, terminated, truncated, _ = env.step(None)
+            for k, color in enumerate(colors):
+                reward[k, t] = env.gen_reward(color=color, previous=previous[color])
+            done[:, t] = terminated or truncated or t == steps - 2
+        env.close()
+
+        if action is None:
+            action = np.zeros((len(agents), 0, 0), dtype=np.float32)
+        write_episode_file(feature_path, meta={
+            'episode': env.file.meta['episode'],
+            'source' : os.path.basename(path),
+            'agents' : agents,
+            'name'   : self.name,
+        }, arrays={ 'obs': obs, 'action': action, 'reward': reward, 'done': done })
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def arrays(self, episode: int, agent: str) -> dict[str, np.ndarray]:
+        """第episode个文件中某个agent的obs/action/reward/done（内存映射上的视图）"""
+        file = self.files[episode]
+        k = file.meta['agents'].index(agent)
+        return { name: file[name][k] for name in ['obs', 'action', 'reward', 'done'] }
+
+    def sample(self, batch_size: int) -> dict[str, np.ndarray]:
+        """
+        随机抽取batch_size个转移
+        :return: { obs, action, reward, next_obs, done }
+        """
+        assert len(self) > 0, 'empty dataset'
+        index = self.rng.integers(0, len(self), size=batch_size)
+        return self.gather(index)
+
+    def gather(self, index: np.ndarray) -> dict[str, np.ndarray]:
+        """按照全局序号取出转移（序号先按文件、再按agent、最后按步数排列）"""
+        index = np.asarray(index, dtype=np.int64)
+        file_ids = np.searchsorted(self.offsets, index, side='right') - 1
+        local = index - self.offsets[file_ids]
+        first = self.files[int(file_ids[0])]  # 只有一步的文件没有转移，不会被抽到
+        batch = {
+            'obs'     : np.zeros((len(index), *first['obs'].shape[2:]), dtype=np.float32),
+            'action'  : np.zeros((len(index), *first['action'].shape[2:]), dtype=np.float32),
+            'reward'  : np.zeros(len(index), dtype=np.float32),
+            'next_obs': np.zeros((len(index), *first['obs'].shape[2:]), dtype=np.float32),
+            'done'    : np.zeros(len(index), dtype=np.bool_),
+        }
+        for file_id in np.unique(file_ids).tolist():
+            mask = file_ids == file_id
+            file = self.files[file_id]
+            k, t = np.divmod(local[mask], file['reward'].shape[1])
+            batch['obs'][mask] = file['obs'][k, t]
+            batch['next_obs'][mask] = file['obs'][k, t + 1]
+            batch['action'][mask] = file['action'][k, t]
+            batch['reward'][mask] = file['reward'][k, t]
+            batch['done'][mask] = file['done'][k, t]
+        return batch
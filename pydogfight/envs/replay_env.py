@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.constants import IDX_TO_COLOR, IDX_TO_OBJECT
+from pydogfight.core.options import Options
+from pydogfight.core.world_obj import *
+from pydogfight.envs.dogfight_2d_env import Dogfight2dEnv
+from pydogfight.envs.recorder import AIRCRAFT_COLUMNS, WINNERS
+from pydogfight.utils.episode_file import EpisodeFile
+
+
+class ReplayBattleArea(BattleArea):
+    """
+    按照EpisodeRecorder记录的文件恢复战场状态，不进行仿真
+    槽位和记录时一一对应（同一步内发射又被移除的导弹也会先加入再移除），所以ObsUtils/渲染的结果和记录时一致
+    """
+
+    def __init__(self, options: Options):
+        super().__init__(options=options)
+        self.file: EpisodeFile | None = None
+        self.step_index = -1  # 当前所在的记录步，-1代表还没有加载
+        self._recorded_winner = ''
+
+    def load(self, file: EpisodeFile):
+        self.file = file
+        self.step_index = -1
+
+    @property
+    def num_steps(self) -> int:
+        return int(self.file.meta['steps'])
+
+    def episode_start(self):
+        self.seek(0)
+
+    def update(self):
+        """前进一个记录步，已经是最后一步时什么也不做"""
+        if self.step_index + 1 < self.num_steps:
+            self.seek(self.step_index + 1)
+
+    def update_stages(self):
+        """回放不需要仿真内核计算，直接前进一个记录步"""
+        self.update()
+        yield from ()
+
+    def seek(self, step: int):
+        """跳转到第step步，往回跳转时从头开始恢复（实体只能按槽位顺序追加）"""
+        step = min(max(int(step), 0), self.num_steps - 1)
+        if step < self.step_index or self.step_index < 0:
+            self.clear()
+            self.step_index = -1
+        self._add_slots(step)
+        self._load_columns(step)
+        self._load_routes(self.step_index, step)
+        self.step_index = step
+
+    def _add_slots(self, step: int):
+        file = self.file
+        store = self.store
+        names = file.meta['slot_names']
+        used = file['used'][step]
+        for slot in range(store.size, int(file['slot_count'][step])):
+            obj = self._create_obj(slot, name=names[slot])
+            self.add_obj(obj)
+            assert obj.index == slot
+        for slot in np.flatnonzero(store.used[:store.size] & ~used[:store.size]).tolist():
+            self.remove_obj(store.objs[slot])
+
+    def _create_obj(self, slot: int, name: str) -> WorldObj:
+        file = self.file
+        obj_type = IDX_TO_OBJECT[int(file['slot_type'][slot])]
+        color = IDX_TO_COLOR[int(file['slot_color'][slot])]
+        waypoint = Waypoint.build(x=0, y=0, psi=0)
+        if obj_type == 'aircraft':
+            return Aircraft(name=name, options=self.options, color=color, waypoint=waypoint)
+        if obj_type == 'home':
+            return Home(name=name, options=self.options, color=color, waypoint=waypoint)
+        if obj_type == 'bullseye':
+            return Bullseye(options=self.options)
+        if obj_type == 'missile':
+            source = self._slot_obj(int(file['slot_source'][slot]))
+            target = self._slot_obj(int(file['slot_target'][slot]))
+            if source is None or target is None:
+                # 记录中没有发射者/目标（-1），用不加入战场的飞机占位，颜色和记录一致
+                placeholder = Aircraft(name=f'{name}_placeholder', options=self.options, color=color,
+                                       waypoint=waypoint)
+                source = placeholder if source is None else source
+                target = placeholder if target is None else target
+            return Missile(name=name, source=source, target=target, time=float(file['fire_time'][slot]))
+        raise ValueError(f'Unknown object type in episode file: {obj_type}')
+
+    def _slot_obj(self, slot: int) -> WorldObj | None:
+        """槽位上的实体，-1或者还没有加入的槽位为None"""
+        if 0 <= slot < self.store.size:
+            return self.store.objs[slot]
+        return None
+
+    def _load_columns(self, step: int):
+        file = self.file
+        store = self.store
+        size = store.size
+        for name in ['x', 'y', 'psi', 'speed', 'turn_radius', 'fuel', 'destroyed']:
+            getattr(store, name)[:size] = file[name][step, :size]
+        for slot in store.indices(type='aircraft').tolist():
+            obj: Aircraft = store.objs[slot]
+            for name in AIRCRAFT_COLUMNS:
+                setattr(obj, name, file[name][step, slot].item())
+        store.version += 1
+
+        # 剩余数量按照记录的状态重新统计
+        remain_count = self.empty_remain_count()
+        alive = store.used[:size] & ~store.destroyed[:size]
+        for slot in np.flatnonzero(alive).tolist():
+            obj = store.objs[slot]
+            count = remain_count.setdefault(obj.type, { 'red': 0, 'blue': 0 })
+            count[obj.color] = count.get(obj.color, 0) + 1
+        self._remain_count = remain_count
+        self._count_version += 1
+
+        self.time = file['time'][step].item()
+        self._recorded_winner = WINNERS[int(file['winner'][step])]
+
+    def _load_routes(self, from_step: int, to_step: int):
+        """应用(from_step, to_step]之间记录的航迹变化"""
+        file = self.file
+        store = self.store
+        route_step = file['route_step']
+        start, end = np.searchsorted(route_step, [from_step, to_step], side='right')
+        changed = { }
+        for i in range(start, end):
+            changed[int(file['route_slot'][i])] = i  # 同一个槽位只需要最后一次变化
+        for slot, i in changed.items():
+            obj = store.objs[slot]
+            if obj is None:
+                continue
+            store.has_route[slot] = file['route_has'][i]
+            store.route[slot] = file['route'][i]
+            store.route_version[slot] += 1
+            store.version += 1
+            obj.on_route_changed()
+
+    @property
+    def winner(self) -> str:
+        return self._recorded_winner
+
+
+class ReplayEnv(Dogfight2dEnv):
+    """
+    回放EpisodeRecorder记录的一轮对战：可以跳转到任意时刻，重新渲染（render/render_rgb）或者重新生成观测（gen_obs）
+    step会忽略传入的动作，前进一个记录步，记录时做出的动作可以用actions_at获取
+    """
+
+    def __init__(self, path: str, options: Options | None = None, **kwargs):
+        self.file = EpisodeFile(path)
+        if options is None:
+            options = Options()
+            options.load_dict(self.file.meta['options'])
+            options.render = False
+            options.render_mode = ''
+            options.render_process = False
+        super().__init__(options=options, battle_area_class=ReplayBattleArea, **kwargs)
+        self.battle_area: ReplayBattleArea
+        self.battle_area.load(self.file)
+
+    @property
+    def num_steps(self) -> int:
+        return self.battle_area.num_steps
+
+    @property
+    def step_index(self) -> int:
+        return self.battle_area.step_index
+
+    def seek(self, time: float | None = None, step: int | None = None):
+        """
+        跳转到某个时刻（第一个不早于time的记录步）或者第step步，往回跳转时观测的记忆会被清空
+        """
+        if step is None:
+            step = int(np.searchsorted(self.file['time'], time - 1e-6))
+        if step < self.battle_area.step_index:
+            for obs_utils in self.obs_utils_dict.values():
+                obs_utils.reset()
+        self.battle_area.seek(step)
+        self.update_game_info()
+
+    def reset(self, *, seed: int | None = None, options: dict[str, Any] | None = None):
+        self.battle_area.step_index = -1
+        return super().reset(seed=seed, options=options)
+
+    def step(self, action=None):
+        old_info = self.gen_info()
+        self.update()
+        info = self.gen_info()
+        reward = self.gen_reward(color=self.options.self_side, previous=old_info)
+        return self.gen_obs(), reward, info['terminated'], info['truncated'], info
+
+    def update(self):
+        for handler in self.before_update_handlers:
+            handler(self)
+        self.battle_area.update()
+        self.update_game_info()
+        for handler in self.after_update_handlers:
+            handler(self)
+
+    def actions_at(self, step: int | None = None) -> list[tuple[str, np.ndarray]]:
+        """第step步（默认当前步）之后做出的动作：[(agent_name, (action_type, x, y))]"""
+        if step is None:
+            step = self.step_index
+        file = self.file
+        start, end = np.searchsorted(file['action_step'], [step, step + 1])
+        agents = file.meta['agents']
+        return [(agents[int(file['action_agent'][i])], file['action'][i]) for i in range(start, end)]
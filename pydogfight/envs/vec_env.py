@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import copy
+import typing
+from typing import Any
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.vector import VectorEnv
+from stable_baselines3.common.vec_env import VecEnv
+
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.kernel import SimulationKernel
+from pydogfight.core.options import Options
+from pydogfight.envs.dogfight_2d_env import Dogfight2dEnv
+
+
+class Dogfight2dVecEnv(VectorEnv):
+    """
+    同时运行K场相互独立的对战（不渲染），一起step
+    每一步各场对战的移动、导弹重新规划航迹由同一个仿真内核合并成一次批量计算（SimulationKernel.run_batched），
+    WorldObj的动作和事件回调仍然在各自的对战里按照实体顺序执行
+    obs: (K, agents, N, W)，agents的顺序和options.agents()一致
+    action: (K, agents, 3)，和Dogfight2dEnv.action_space一致，动作类型为0的不会放进去
+    reward: (K,)，options.self_side这一方的奖励
+    结束的对战会自动reset，结束时的obs和info放在infos['final_observation']、infos['final_info']里（gymnasium的约定）
+    """
+
+    metadata = { 'autoreset': True }
+
+    def __init__(self, num_envs: int, options: Options = Options(),
+                 battle_area_class: BattleArea.__class__ = BattleArea, copy_obs: bool = True):
+        """
+        :param num_envs: 对战数量K
+        :param options: 每场对战会复制一份，互不影响
+        :param copy_obs: 是否返回obs的拷贝，设为False时返回内部的缓冲区，下一次step会被覆盖
+        """
+        assert num_envs > 0
+        options = copy.deepcopy(options)
+        options.render = False
+        options.render_mode = ''
+        self.options = options
+        self.envs = [Dogfight2dEnv(options=copy.deepcopy(options), battle_area_class=battle_area_class)
+                     for _ in range(num_envs)]
+        self.agents = options.agents()
+        self.copy_obs = copy_obs
+        self.kernel = SimulationKernel(backend=options.kernel_backend)  # 合并各场对战计算的仿真内核
+
+        agent_obs_space = self.envs[0].agent_observation_space
+        super().__init__(
+                num_envs=num_envs,
+                observation_space=gym.spaces.Box(
+                        low=agent_obs_space.low.min(), high=agent_obs_space.high.max(),
+                        shape=(len(self.agents), *agent_obs_space.shape), dtype=np.float32),
+                action_space=self.envs[0].action_space)
+        self.single_agent_observation_space = agent_obs_space
+        self.single_agent_action_space = gym.spaces.Box(
+                low=self.envs[0].action_space.low[0], high=self.envs[0].action_space.high[0],
+                dtype=self.envs[0].action_space.dtype)
+
+        self.obs = np.zeros(self.observation_space.shape, dtype=np.float32)
+        self.rewards = np.zeros(num_envs, dtype=np.float64)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+        self.infos: list[dict] = [{ } for _ in range(num_envs)]  # 每场对战最近一次的info（结束的对战是结束时的info）
+        self._actions = None
+
+    def _write_obs(self, k: int):
+        self.envs[k].gen_all_obs(out=self.obs[k])
+
+    def _result_obs(self):
+        return self.obs.copy() if self.copy_obs else self.obs
+
+    def reset_wait(
+            self,
+            seed: int | list[int] | None = None,
+            options: dict | None = None,
+    ) -> tuple[np.ndarray, dict[str, Any]]:
+        if seed is None or isinstance(seed, int):
+            seed = [None if seed is None else seed + k for k in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+
+        infos = { }
+        for k, env in enumerate(self.envs):
+            _, info = env.reset(seed=seed[k], options=options)
+            self._write_obs(k)
+            self.infos[k] = info
+            infos = self._add_info(infos, info, k)
+        self.rewards[:] = 0
+        self.terminated[:] = False
+        self.truncated[:] = False
+        return self._result_obs(), infos
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions)
+
+    def step_wait(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict[str, Any]]:
+        assert self._actions is not None, 'step_async must be called before step_wait'
+        infos = { }
+        old_infos = []
+        for k, env in enumerate(self.envs):
+            env.put_action(self._actions[k])
+            old_infos.append(env.gen_info())
+        self.kernel.run_batched([env.update_stages() for env in self.envs])
+        for k, env in enumerate(self.envs):
+            info = env.gen_info()
+            self.rewards[k] = env.gen_reward(color=self.options.self_side, previous=old_infos[k])
+            self.terminated[k] = info['terminated']
+            self.truncated[k] = info['truncated']
+            self._write_obs(k)
+            self.infos[k] = info
+
+            if self.terminated[k] or self.truncated[k]:
+                final_obs = self.obs[k].copy()
+                _, info = env.reset()
+                self._write_obs(k)
+                info['final_observation'] = final_obs
+                info['final_info'] = self.infos[k]
+            infos = self._add_info(infos, info, k)
+        self._actions = None
+        return self._result_obs(), self.rewards.copy(), self.terminated.copy(), self.truncated.copy(), infos
+
+    def call(self, name: str, *args, **kwargs) -> tuple:
+        results = []
+        for env in self.envs:
+            function = getattr(env, name)
+            results.append(function(*args, **kwargs) if callable(function) else function)
+        return tuple(results)
+
+    def get_attr(self, name: str) -> tuple:
+        return tuple(getattr(env, name) for env in self.envs)
+
+    def set_attr(self, name: str, values: list | tuple | object):
+        if not isinstance(values, (list, tuple)):
+            values = [values for _ in range(self.num_envs)]
+        assert len(values) == self.num_envs
+        for env, value in zip(self.envs, values):
+            setattr(env, name, value)
+
+    def close_extras(self, **kwargs):
+        for env in self.envs:
+            env.close()
+
+
+class Dogfight2dSB3VecEnv(VecEnv):
+    """
+    stable-baselines3的VecEnv，把Dogfight2dVecEnv里每场对战的每个受控飞机当成一个环境：
+    num_envs = K * len(agents)，第k场对战第i个飞机对应第k * len(agents) + i个环境
+    这样RL模型的一次前向计算就可以得到所有对战、所有受控飞机的动作
+    没有受控的飞机不会收到动作，可以通过vec_env.envs[k]的before_update_handlers来驱动
+    """
+
+    def __init__(self, vec_env: Dogfight2dVecEnv, agents: list[str] | None = None):
+        """
+        :param agents: 受控的飞机，默认是options.self_side这一方的所有飞机，奖励是这一方的奖励
+        """
+        options = vec_env.options
+        if agents is None:
+            agents = options.red_agents if options.self_side == 'red' else options.blue_agents
+        side_agents = options.red_agents if options.self_side == 'red' else options.blue_agents
+        assert all(name in side_agents for name in agents), 'agents must belong to options.self_side'
+        self.vec_env = vec_env
+        self.agents = list(agents)
+        self.agent_indices = [vec_env.agents.index(name) for name in self.agents]
+        super().__init__(
+                num_envs=vec_env.num_envs * len(self.agents),
+                observation_space=vec_env.single_agent_observation_space,
+                action_space=vec_env.single_agent_action_space)
+        self._actions = None
+        # 对战没有窗口（render_mode为空），由get_images画到离屏Surface上，render拼成一张图
+        self.render_mode = 'rgb_array'
+        self.metadata = { 'render_modes': ['human', 'rgb_array'] }
+
+    def _slot_obs(self, obs: np.ndarray) -> np.ndarray:
+        return obs[:, self.agent_indices].reshape(self.num_envs, *self.observation_space.shape)
+
+    def reset(self) -> np.ndarray:
+        seed = self._seeds[0] if len(self._seeds) > 0 else None
+        obs, _ = self.vec_env.reset(seed=seed, options=self._options[0] if len(self._options) > 0 else None)
+        self._reset_seeds()
+        self._reset_options()
+        return self._slot_obs(obs)
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = actions
+
+    def step_wait(self):
+        vec_env = self.vec_env
+        actions = np.zeros(vec_env.action_space.shape)
+        actions[:, self.agent_indices] = np.asarray(self._actions).reshape(vec_env.num_envs, len(self.agents), -1)
+        obs, rewards, terminated, truncated, vec_infos = vec_env.step(actions)
+        dones = terminated | truncated
+
+        infos = []
+        for k in range(vec_env.num_envs):
+            for i in self.agent_indices:
+                info = dict(vec_env.infos[k])
+                if dones[k]:
+                    info['terminal_observation'] = vec_infos['final_observation'][k][i]
+                    info['TimeLimit.truncated'] = bool(truncated[k] and not terminated[k])
+                infos.append(info)
+        size = len(self.agents)
+        return self._slot_obs(obs), np.repeat(rewards, size), np.repeat(dones, size), infos
+
+    def close(self) -> None:
+        self.vec_env.close()
+
+    def _env_indices(self, indices) -> list[int]:
+        # 同一场对战的多个飞机只算一次
+        return sorted({ index // len(self.agents) for index in self._get_indices(indices) })
+
+    def get_attr(self, attr_name: str, indices=None) -> list[typing.Any]:
+        return [getattr(self.vec_env.envs[index // len(self.agents)], attr_name) for index in
+                self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: typing.Any, indices=None) -> None:
+        for k in self._env_indices(indices):
+            setattr(self.vec_env.envs[k], attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> list[typing.Any]:
+        # 每场对战只调用一次，结果分给这场对战的每个环境
+        results = { k: getattr(self.vec_env.envs[k], method_name)(*method_args, **method_kwargs) for k in
+                    self._env_indices(indices) }
+        return [results[index // len(self.agents)] for index in self._get_indices(indices)]
+
+    def get_images(self) -> list[np.ndarray]:
+        # 每场对战只画一次，这场对战的每个环境都是同一帧
+        frames = [env.render_rgb() for env in self.vec_env.envs]
+        return [frames[index // len(self.agents)] for index in range(self.num_envs)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> list[bool]:
+        return [False for _ in self._get_indices(indices)]
@@ -50,6 +50,48 @@ class BTPolicyNode(pybts.Action, ABC):
         }
 
 
+class _SinkQueue(queue.Queue):
+    """行为节点的动作队列，放入动作时把节点登记到ActionSink里"""
+
+    def __init__(self, sink: ActionSink, node: pybts.Action):
+        super().__init__()
+        self.sink = sink
+        self.node = node
+
+    def _put(self, item):
+        super()._put(item)
+        self.sink.pending[id(self.node)] = self.node
+
+
+class ActionSink:
+    """
+    行为树的动作汇总：行为节点放入动作时登记自己，收集动作时只需要处理登记过的节点，
+    不需要每次tick之后遍历整棵树
+    """
+
+    def __init__(self, root: pybts.Node):
+        self.order: dict[int, int] = { }  # 节点id -> 在树的先序遍历中的位置
+        self.pending: dict[int, pybts.Action] = { }  # 有动作待取出的节点
+        for i, node in enumerate(root.iterate()):
+            if not isinstance(node, pybts.Action):
+                continue
+            self.order[id(node)] = i
+            old = node.actions
+            node.actions = _SinkQueue(sink=self, node=node)
+            while not old.empty():
+                node.actions.put_nowait(old.get_nowait())
+
+    def drain(self) -> typing.Iterator:
+        """按照树的先序遍历顺序（和遍历整棵树收集的顺序一致）取出所有节点的动作"""
+        if len(self.pending) == 0:
+            return
+        nodes = sorted(self.pending.values(), key=lambda node: self.order[id(node)])
+        self.pending.clear()
+        for node in nodes:
+            while not node.actions.empty():
+                yield node.actions.get_nowait()
+
+
 class BTPolicy(AgentPolicy):
     def __init__(self,
                  tree: pybts.Tree,
@@ -58,17 +100,20 @@ class BTPolicy(AgentPolicy):
                  ):
         super().__init__(env=env, agent_name=agent_name)
         self.tree = tree
+        self.action_sink: ActionSink | None = None  # 第一次执行时创建，树的结构变化之后需要调用refresh_action_sink
+
+    def refresh_action_sink(self):
+        self.action_sink = ActionSink(self.tree.root)
 
     def reset(self):
         super().reset()
         self.tree.reset()
 
     def execute(self, observation, delta_time: float):
+        if self.action_sink is None:
+            self.refresh_action_sink()
         # 更新时间
         self.tree.tick()
-        # 收集所有节点的行为，并放到自己的行为库里
-        for node in self.tree.root.iterate():
-            if isinstance(node, pybts.Action):
-                while not node.actions.empty():
-                    action = node.actions.get_nowait()
-                    self.actions.put_nowait(action)
+        # 收集这次放入了动作的节点的行为，并放到自己的行为库里
+        for action in self.action_sink.drain():
+            self.actions.put_nowait(action)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from pydogfight.utils.traj import calc_optimal_path
+from pydogfight.utils.traj import calc_optimal_path, calc_optimal_paths
 from pydogfight.policy.bt.common import *
 
 
@@ -26,10 +26,16 @@ class EvadeMissile(BTPolicyNode):
                 in_safe_area=True,
                 angle_sep=self.converter.int(self.test_move_angle_sep))
 
+        # 自己飞到每个测试点的最短航迹
+        optimal_paths = calc_optimal_paths(
+                starts=[self.agent.waypoint.data],
+                targets=[waypoint.location for waypoint in test_waypoints],
+                turn_radius=self.agent.turn_radius)
+
         # 从周围N个点中寻找一个能够让导弹飞行时间最长且自己飞行时间最短的点来飞 （导弹飞行时间 - 自己飞行时间）最大
         max_diff_time = -float('inf')
         go_to_location = None
-        for waypoint in test_waypoints:
+        for i, waypoint in enumerate(test_waypoints):
             diff_time = 0
             for mis in missiles[:1]:  # 只规避最近的导弹
                 under_hit_point = mis.predict_intercept_point(target_wpt=waypoint, target_speed=self.agent.speed)
@@ -38,15 +44,11 @@ class EvadeMissile(BTPolicyNode):
                 if under_hit_point.time == float('inf'):
                     under_hit_point.time = 10000
 
-                optimal_path = calc_optimal_path(
-                        start=self.agent.waypoint,
-                        target=waypoint.location,
-                        turn_radius=self.agent.turn_radius,
-                )
-                if optimal_path.length == float('inf'):
+                optimal_length = optimal_paths.length[0, i]
+                if optimal_length == float('inf'):
                     continue
 
-                diff_time += under_hit_point.time - optimal_path.length / self.agent.speed
+                diff_time += under_hit_point.time - optimal_length / self.agent.speed
 
             if diff_time > max_diff_time:
                 max_diff_time = diff_time
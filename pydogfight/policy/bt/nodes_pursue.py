@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from pydogfight.utils.intercept import *
 from pydogfight.utils.traj import calc_optimal_path
+from pydogfight.utils.path_lut import OptimalPathLengthLUT
 from pydogfight.policy.bt.common import *
 
 
@@ -90,32 +91,36 @@ class PursueNearestEnemy(BTPolicyNode):
             )
 
             enemy_waypoint = enemy.waypoint.move(d=enemy.speed * test_move_time)
-            for waypoint in test_waypoints:
-                hit_point = optimal_predict_intercept_point(
-                        self_speed=self.env.options.missile_speed,
-                        self_wpt=waypoint,
-                        self_turn_radius=self.env.options.missile_min_turn_radius,
-                        target_wpt=enemy_waypoint,
-                        target_speed=enemy.speed,
-                )  # 我方的导弹命中敌机
-
-                under_hit_point = optimal_predict_intercept_point(
-                        self_wpt=enemy_waypoint,
-                        self_speed=self.env.options.missile_speed,
-                        self_turn_radius=self.env.options.missile_min_turn_radius,
-                        target_wpt=waypoint,
-                        target_speed=self.agent.speed,
-                )  # 敌机的导弹命中我方
-
-                # 我方导弹尽可能要命中敌机
-                # 敌方导弹要尽可能不命中我
-
-                if hit_point.time == float('inf'):
-                    hit_point.time = self.env.options.missile_flight_duration()
-                if under_hit_point.time == float('inf'):
-                    under_hit_point.time = self.env.options.missile_flight_duration()
-
-                time_tmp = hit_point.time * attack_ratio - under_hit_point.time * evade_ratio  # 让我方命中敌机的时间尽可能小，敌方命中我方的时间尽可能大
+            self_wpts = np.array([waypoint.data for waypoint in test_waypoints]).reshape(-1, 3)
+            enemy_wpts = np.broadcast_to(enemy_waypoint.data, self_wpts.shape)
+            # 所有测试点一起计算拦截点
+            missile_path_lut = OptimalPathLengthLUT.for_options(self.env.options)
+            hit_points = optimal_predict_intercept_points(
+                    self_speed=self.env.options.missile_speed,
+                    self_wpts=self_wpts,
+                    self_turn_radius=self.env.options.missile_min_turn_radius,
+                    lut=missile_path_lut,
+                    target_wpts=enemy_wpts,
+                    target_speed=enemy.speed,
+            )  # 我方的导弹命中敌机
+
+            under_hit_points = optimal_predict_intercept_points(
+                    self_wpts=enemy_wpts,
+                    self_speed=self.env.options.missile_speed,
+                    self_turn_radius=self.env.options.missile_min_turn_radius,
+                    lut=missile_path_lut,
+                    target_wpts=self_wpts,
+                    target_speed=self.agent.speed,
+            )  # 敌机的导弹命中我方
+
+            # 我方导弹尽可能要命中敌机
+            # 敌方导弹要尽可能不命中我
+            flight_duration = self.env.options.missile_flight_duration()
+            hit_times = np.where(np.isinf(hit_points.time), flight_duration, hit_points.time)
+            under_hit_times = np.where(np.isinf(under_hit_points.time), flight_duration, under_hit_points.time)
+
+            for i, waypoint in enumerate(test_waypoints):
+                time_tmp = hit_times[i] * attack_ratio - under_hit_times[i] * evade_ratio  # 让我方命中敌机的时间尽可能小，敌方命中我方的时间尽可能大
                 if time_tmp < min_time:
                     min_time = time_tmp
                     go_to_location = waypoint.location
@@ -185,34 +190,40 @@ class PursueEnemyAndEvadeMissile(BTPolicyNode):
         enemy_waypoints = [enemy.waypoint.move(d=enemy.speed * test_move_time) for enemy in enemies]
         # if not self.agent.can_fire_missile():
         #     attack_ratio = 0
-        for waypoint in test_waypoints:
+        # 所有（测试点，敌方）组合一起计算拦截点，形状为(测试点数量, 敌方数量)
+        missile_path_lut = OptimalPathLengthLUT.for_options(self.env.options)
+        shape = (len(test_waypoints), len(enemy_waypoints))
+        self_wpts = np.repeat(np.array([waypoint.data for waypoint in test_waypoints]).reshape(-1, 3), shape[1], axis=0)
+        enemy_wpts = np.tile(np.array([waypoint.data for waypoint in enemy_waypoints]).reshape(-1, 3), (shape[0], 1))
+        hit_points = optimal_predict_intercept_points(
+                self_wpts=self_wpts,
+                self_speed=self.env.options.missile_speed,
+                self_turn_radius=self.env.options.missile_min_turn_radius,
+                lut=missile_path_lut,
+                target_wpts=enemy_wpts,
+                target_speed=self.env.options.aircraft_speed,
+        )  # 我方的导弹命中敌机
+
+        under_hit_points = optimal_predict_intercept_points(
+                self_wpts=enemy_wpts,
+                self_speed=self.env.options.missile_speed,
+                self_turn_radius=self.env.options.missile_min_turn_radius,
+                lut=missile_path_lut,
+                target_wpts=self_wpts,
+                target_speed=self.env.options.aircraft_speed,
+        )  # 敌机的导弹命中我方
+
+        # 我方导弹尽可能要命中敌机
+        # 敌方导弹要尽可能不命中我
+        flight_duration = self.env.options.missile_flight_duration()
+        hit_times = np.where(np.isinf(hit_points.time), flight_duration, hit_points.time).reshape(shape)
+        under_hit_times = np.where(
+                np.isinf(under_hit_points.time), flight_duration, under_hit_points.time).reshape(shape)
+
+        for i, waypoint in enumerate(test_waypoints):
             time_tmp = 0
-            for enemy_waypoint in enemy_waypoints:
-                hit_point = optimal_predict_intercept_point(
-                        self_wpt=waypoint,
-                        self_speed=self.env.options.missile_speed,
-                        self_turn_radius=self.env.options.missile_min_turn_radius,
-                        target_wpt=enemy_waypoint,
-                        target_speed=self.env.options.aircraft_speed,
-                )  # 我方的导弹命中敌机
-
-                under_hit_point = optimal_predict_intercept_point(
-                        self_wpt=enemy_waypoint,
-                        self_speed=self.env.options.missile_speed,
-                        self_turn_radius=self.env.options.missile_min_turn_radius,
-                        target_wpt=waypoint,
-                        target_speed=self.env.options.aircraft_speed,
-                )  # 敌机的导弹命中我方
-
-                # 我方导弹尽可能要命中敌机
-                # 敌方导弹要尽可能不命中我
-
-                if hit_point.time == float('inf'):
-                    hit_point.time = self.env.options.missile_flight_duration()
-                if under_hit_point.time == float('inf'):
-                    under_hit_point.time = self.env.options.missile_flight_duration()
-
-                time_tmp += hit_point.time * attack_ratio - under_hit_point.time * evade_ratio  # 让我方命中敌机的时间尽可能小，敌方命中我方的时间尽可能大
+            for j in range(shape[1]):
+                time_tmp += hit_times[i, j] * attack_ratio - under_hit_times[i, j] * evade_ratio  # 让我方命中敌机的时间尽可能小，敌方命中我方的时间尽可能大
 
             if time_tmp < min_time:
                 min_time = time_tmp
@@ -306,7 +317,7 @@ class FPolePursueNearestEnemy(BTPolicyNode):
 
     @classmethod
     def calculate_location(cls, agent: Aircraft, enemy: Aircraft, angle: float = 30) -> tuple[float, float]:
-        rel_wpt = agent.waypoint.relative_polar_waypoint(enemy.waypoint)
+        rel_wpt = agent.relative_polar_waypoint(enemy)
         if rel_wpt.theta > 0:
             intercept_heading = rel_wpt.theta - angle
         else:
@@ -5,11 +5,17 @@ import typing
 from pybts.rl import RLTree
 from pydogfight.envs.dogfight_2d_env import Dogfight2dEnv
 from pybts import Node
+from pydogfight.core.world_obj import ObjDictView
 
 
 class DogfightTree(RLTree):
 
-    def __init__(self, env: Dogfight2dEnv, root: Node, name: str, agent_name: str, context: dict = None) -> None:
+    def __init__(self, env: Dogfight2dEnv, root: Node, name: str, agent_name: str, context: dict = None,
+                 eager_agent_context: bool = False) -> None:
+        """
+        :param eager_agent_context: 每次tick时是否把agent.to_dict()的完整快照放到context['agent']里，
+            默认放的是惰性视图（只有模版/节点读取到的字段才会计算）
+        """
         if agent_name in env.options.red_agents:
             agent_color = 'red'
         else:
@@ -22,12 +28,26 @@ class DogfightTree(RLTree):
             'agent_color': agent_color,
             'time'       : env.time,
             'env'        : env,
-            'agent'      : env.get_agent(agent_name).to_dict(),
             'options'    : env.options.to_dict()
         })
-        super().__init__(root=root, name=name, context=context)
         self.env = env
         self.agent_name = agent_name
+        self.eager_agent_context = eager_agent_context
+        context['agent'] = self.agent_context()
+        super().__init__(root=root, name=name, context=context)
+
+    def agent_context(self) -> dict | ObjDictView:
+        agent = self.env.get_agent(self.agent_name)
+        if self.eager_agent_context:
+            return agent.to_dict()
+        return agent.dict_view()
+
+    def context_snapshot(self) -> dict:
+        """context的快照，agent的惰性视图会展开成dict（用于track保存）"""
+        agent = self.context.get('agent')
+        if isinstance(agent, ObjDictView):
+            return { **self.context, 'agent': agent.to_dict() }
+        return dict(self.context)
 
     def tick(
             self,
@@ -41,6 +61,6 @@ class DogfightTree(RLTree):
         # 在tick之前更新时间、agent信息，方便后面使用
         self.context['time'] = self.env.time
         self.context['episode'] = self.env.game_info['episode']
-        self.context['agent'] = self.env.get_agent(self.agent_name).to_dict()
+        self.context['agent'] = self.agent_context()
         super().tick(pre_tick_handler=pre_tick_handler, post_tick_handler=post_tick_handler)
 
@@ -40,6 +40,14 @@ def wrap_angle_to_180(angle):
     return angle
 
 
+def wrap_angles_to_180(angle: np.ndarray) -> np.ndarray:
+    """wrap_angle_to_180的向量化版本，将角度放缩到[-180, 180]之内"""
+    shifted = angle + 180
+    wrapped = shifted % 360
+    wrapped = np.where((wrapped == 0) & (shifted > 0), 360, wrapped) - 180
+    return np.where((angle < -180) | (180 < angle), wrapped, angle).astype(angle.dtype, copy=False)
+
+
 def heading_to_standard(psi):
     """
     航向角是指无人机当前运动方向与地面参考方向之间的夹角，通常用正北方向为参考方向。
@@ -146,6 +154,62 @@ def will_collide(a1: np.ndarray, a2: np.ndarray, ra: float, b1: np.ndarray, b2:
     return min_distance_squared <= collision_distance ** 2
 
 
+def will_collide_pairs(a1: np.ndarray, a2: np.ndarray, ra: np.ndarray,
+                       b1: np.ndarray, b2: np.ndarray, rb: np.ndarray) -> np.ndarray:
+    """
+    will_collide的向量化版本，一次计算多对物体在时间段内是否碰撞
+
+    参数:
+    a1, a2 : (N, 2) 物体A在时间段开始和结束时的位置
+    ra : (N,) 物体A的碰撞半径
+    b1, b2 : (N, 2) 物体B在时间段开始和结束时的位置
+    rb : (N,) 物体B的碰撞半径
+
+    返回:
+    (N,) bool数组，第k对物体在时间段内碰撞则为True
+    """
+    a1 = np.asarray(a1, dtype=np.float64)
+    b1 = np.asarray(b1, dtype=np.float64)
+    v_rel = (np.asarray(a2, dtype=np.float64) - a1) - (np.asarray(b2, dtype=np.float64) - b1)
+    initial_offset = a1 - b1
+
+    v_rel_squared = np.einsum('ij,ij->i', v_rel, v_rel)
+    # 相对速度为零的时候t取0，只比较初始距离
+    t = np.divide(-np.einsum('ij,ij->i', initial_offset, v_rel), v_rel_squared,
+                  out=np.zeros_like(v_rel_squared), where=v_rel_squared != 0)
+    t = np.clip(t, 0, 1)
+    closest_point = initial_offset + t[:, None] * v_rel
+    min_distance_squared = np.einsum('ij,ij->i', closest_point, closest_point)
+    collision_distance = np.asarray(ra, dtype=np.float64) + np.asarray(rb, dtype=np.float64)
+    return min_distance_squared <= collision_distance ** 2
+
+
+def sweep_and_prune(lo: np.ndarray, hi: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    排序扫描（sort and sweep）粗筛，找出一维区间[lo, hi]互相重叠的所有组合
+    Args:
+        lo: (N,) 区间下界
+        hi: (N,) 区间上界
+
+    Returns: (i, j) 两个下标数组，满足i < j且第i个区间和第j个区间重叠
+    """
+    n = len(lo)
+    order = np.argsort(lo, kind='stable')
+    sorted_lo = lo[order]
+    # 排序后第k个区间和它后面的[k+1, end_k)个区间重叠
+    end = np.searchsorted(sorted_lo, hi[order], side='right')
+    counts = np.maximum(end - np.arange(n) - 1, 0)
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    k = np.repeat(np.arange(n), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    a = order[k]
+    b = order[k + 1 + offsets]
+    return np.minimum(a, b), np.maximum(a, b)
+
+
 def get_torch_device(device: str = 'auto') -> str:
     if device == 'cpu':
         return device
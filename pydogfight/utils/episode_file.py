@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'DFEP'
+VERSION = 1
+ALIGN = 64  # 每个数组的起始位置按64字节对齐
+
+
+def write_episode_file(path: str, meta: dict, arrays: dict[str, np.ndarray]):
+    """
+    把一组数组写成一个二进制文件，可以用EpisodeFile以内存映射的方式读取
+    文件格式：MAGIC(4字节) + 头部长度(uint32，小端) + JSON头部 + 按ALIGN对齐的数组数据
+    JSON头部：{ 'version', 'meta', 'arrays': { 数组名: { 'dtype', 'shape', 'offset'（相对数据区的起始位置） } } }
+    先写到临时文件再重命名，读取方不会看到写了一半的文件
+    """
+    layout = { }
+    offset = 0
+    contiguous = { }
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        contiguous[name] = array
+        layout[name] = { 'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset }
+        offset += _aligned(array.nbytes)
+    header = json.dumps({ 'version': VERSION, 'meta': meta, 'arrays': layout }, ensure_ascii=False).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for name, array in contiguous.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def _aligned(size: int) -> int:
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+class EpisodeFile:
+    """
+    读取write_episode_file写入的文件，整个文件只映射一次（只读），数组是映射上的视图，访问时才会从磁盘读入
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f'{path} is not an episode file')
+            header_size, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_size).decode('utf-8'))
+        if header['version'] > VERSION:
+            raise ValueError(f'{path}: unsupported episode file version {header["version"]}')
+        self.meta: dict = header['meta']
+        self.layout: dict[str, dict] = header['arrays']
+        self._data_start = _aligned(len(MAGIC) + 4 + header_size)
+        self._mmap = np.memmap(path, dtype=np.uint8, mode='r')
+        self._arrays: dict[str, np.ndarray] = { }
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            item = self.layout[name]
+            dtype = np.dtype(item['dtype'])
+            shape = tuple(item['shape'])
+            start = self._data_start + item['offset']
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            self._arrays[name] = self._mmap[start:start + nbytes].view(dtype).reshape(shape)
+        return self._arrays[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.layout
+
+    def keys(self) -> list[str]:
+        return list(self.layout.keys())
+
+    def load(self, name: str) -> np.ndarray:
+        """读入内存中的拷贝"""
+        return np.array(self[name])
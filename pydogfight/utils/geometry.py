@@ -151,6 +151,9 @@ def rad_between_vectors(v1, v2):
     return angle_rad
 
 
+ROTATION_EPS = 1e-9  # 小于这个弧度的旋转视为没有旋转
+
+
 def clockwise_rotation_rad(clockwise_type, v1, v2):
     """
     # 计算两个向量之间的夹角
@@ -161,8 +164,8 @@ def clockwise_rotation_rad(clockwise_type, v1, v2):
     """
     rad = rad_between_vectors(v1, v2)
     assert math.pi >= rad >= 0, f"error {rad}"
-    # 计算旋转的方向
-    if sign(cross(v1, v2)) != clockwise_type:
+    # 计算旋转的方向（夹角接近0时叉乘的符号只是舍入误差，不能当成绕一整圈）
+    if rad > ROTATION_EPS and sign(cross(v1, v2)) != clockwise_type:
         rad = math.pi * 2 - rad
 
     if clockwise_type == 1:
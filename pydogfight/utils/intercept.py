@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 from pydogfight.utils.models import Waypoint
-from typing import List, Callable, Tuple
+from pydogfight.utils.common import wrap_angles_to_180
+from typing import List, Callable, Tuple, TYPE_CHECKING
 import numpy as np
 import json
 
+if TYPE_CHECKING:
+    from pydogfight.utils.path_lut import OptimalPathLengthLUT
+
 
 class InterceptPointResult:
     point: tuple[float, float] = (0, 0)
@@ -84,7 +88,8 @@ def optimal_predict_intercept_point(
         self_turn_radius: float,
         target_wpt: Waypoint | tuple[float, float, float] | np.ndarray,
         target_speed: float,
-        precision: float = 1
+        precision: float = 1,
+        lut: OptimalPathLengthLUT | None = None
 ):
     """
     Calculate the optimal 交点
@@ -95,20 +100,166 @@ def optimal_predict_intercept_point(
         target_wpt: 目标当前的航迹点
         target_speed: 目标当前的速度
         precision: 计算精度，精确到1m
+        lut: 最短航迹长度查找表，转弯半径一致时用来代替精确解
 
     Returns:
 
     """
 
     from pydogfight.utils.traj import calc_optimal_path
+    if lut is not None and lut.matches(self_turn_radius):
+        self_data = self_wpt.data if isinstance(self_wpt, Waypoint) else self_wpt
+        target_data = target_wpt.data if isinstance(target_wpt, Waypoint) else target_wpt
+        optimal_dis = lut.lengths(starts=[self_data], targets=[target_data[:2]])[0]
+        calc_optimal_dis = lambda p: optimal_dis
+    else:
+        calc_optimal_dis = lambda p: calc_optimal_path(
+                start=self_wpt,
+                target=target_wpt,
+                turn_radius=self_turn_radius
+        ).length
     return predict_intercept_point(
             target=target_wpt, target_speed=target_speed,
             self_speed=self_speed,
-            calc_optimal_dis=lambda p: calc_optimal_path(
-                    start=self_wpt,
-                    target=target_wpt,
-                    turn_radius=self_turn_radius
-            ).length,
+            calc_optimal_dis=calc_optimal_dis,
+            precision=precision)
+
+
+class InterceptPointBatch:
+    """
+    批量预测的拦截点，每一项的长度都是K，没有找到拦截点的位置found为False、time为inf
+    """
+
+    def __init__(self, size: int):
+        self.found = np.zeros(size, dtype=bool)  # 是否找到拦截点
+        self.point = np.zeros((size, 2))  # 拦截点
+        self.time = np.full(size, float('inf'))  # 花费时间
+        self.self_distance = np.full(size, float('inf'))  # 我方距离
+        self.target_distance = np.full(size, float('inf'))  # 敌方距离
+
+    def __len__(self):
+        return len(self.time)
+
+    def result(self, k: int) -> InterceptPointResult | None:
+        """第k个拦截点，和predict_intercept_point的返回值一致"""
+        if not self.found[k]:
+            return None
+        return InterceptPointResult(
+                point=(self.point[k, 0], self.point[k, 1]),
+                time=self.time[k],
+                self_distance=self.self_distance[k],
+                target_distance=self.target_distance[k])
+
+
+def predict_intercept_points(
+        targets: np.ndarray | list,
+        target_speed: float | np.ndarray,
+        self_speed: float | np.ndarray,
+        calc_optimal_dis: Callable[[np.ndarray, np.ndarray], np.ndarray],
+        precision: float = 1,
+        max_iterations: int = 100
+) -> InterceptPointBatch:
+    """
+    批量预测拦截目标点（predict_intercept_point的向量化版本），所有目标一起迭代，已经收敛的目标不再参与计算
+    :param targets: (K, 3) 目标现在的航迹点
+    :param target_speed: 敌方的速度 m/s，标量或者(K,)
+    :param self_speed: 我方的速度 m/s，标量或者(K,)
+    :param calc_optimal_dis: 计算我方飞到目标点的距离函数，参数是(K', 2)的目标点和这些目标点对应的下标(K',)，返回(K',)的距离
+    :param precision: 计算精度，拦截误差小于precision即可认为拦截成功，单位m
+    :param max_iterations: 最多迭代次数
+    :return: InterceptPointBatch
+    """
+    targets = np.round(np.asarray(targets, dtype=np.float64).reshape(-1, 3), 3)  # 和Waypoint.build保持一样的格式
+    targets[:, 2] = wrap_angles_to_180(targets[:, 2])
+    size = len(targets)
+    target_speed = np.broadcast_to(np.asarray(target_speed, dtype=np.float64), (size,))
+    self_speed = np.broadcast_to(np.asarray(self_speed, dtype=np.float64), (size,))
+    batch = InterceptPointBatch(size)
+
+    standard_rad = np.radians((90 - targets[:, 2]) % 360)
+    cos_rad, sin_rad = np.cos(standard_rad), np.sin(standard_rad)
+    tx, ty = targets[:, 0], targets[:, 1]
+
+    d = np.zeros(size)  # 预测敌机飞行距离
+    active = np.arange(size)
+    for _ in range(max_iterations):
+        if len(active) == 0:
+            break
+        hit_point = np.stack([tx[active] + d[active] * cos_rad[active], ty[active] + d[active] * sin_rad[active]],
+                             axis=-1)
+        vs, vt = self_speed[active], target_speed[active]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mt = np.asarray(calc_optimal_dis(hit_point, active), dtype=np.float64) / vs  # 导弹飞到目标点需要多久
+            et = d[active] / vt  # 敌人飞到目标点需要多久
+            diff_t = np.abs(mt - et)
+
+        diverged = np.isinf(mt) | np.isinf(et)
+        converged = ~diverged & (diff_t * (vt + vs) < precision)
+
+        hit = active[converged]
+        batch.found[hit] = True
+        batch.point[hit] = hit_point[converged]
+        batch.time[hit] = mt[converged]
+        batch.self_distance[hit] = vs[converged] * mt[converged]
+        batch.target_distance[hit] = vt[converged] * et[converged]
+
+        # mt > et: 敌人先到目标点，d需要增大；mt < et: 敌人后到目标点，d需要减小
+        with np.errstate(invalid='ignore'):
+            d[active] += np.sign(mt - et) * diff_t * vt
+        active = active[~diverged & ~converged]
+
+    return batch
+
+
+def optimal_predict_intercept_points(
+        self_wpts: np.ndarray | list,
+        self_speed: float | np.ndarray,
+        self_turn_radius: float | np.ndarray,
+        target_wpts: np.ndarray | list,
+        target_speed: float | np.ndarray,
+        precision: float = 1,
+        lead_target: bool = False,
+        lut: OptimalPathLengthLUT | None = None
+) -> InterceptPointBatch:
+    """
+    批量计算拦截点（optimal_predict_intercept_point的向量化版本），第k个我方航迹点拦截第k个目标航迹点
+    Args:
+        self_wpts: (K, 3) 我方当前的航迹点
+        self_speed: 我方当前的速度
+        self_turn_radius: 我方的转弯半径
+        target_wpts: (K, 3) 目标当前的航迹点
+        target_speed: 目标当前的速度
+        precision: 计算精度，精确到1m
+        lead_target: 是否按照预测的拦截点计算我方的航迹长度，默认和optimal_predict_intercept_point一致，按照目标当前的位置计算
+        lut: 最短航迹长度查找表，转弯半径一致时用来代替精确解
+
+    Returns: InterceptPointBatch
+    """
+    from pydogfight.utils.traj import calc_optimal_path_pairs
+    self_wpts = np.asarray(self_wpts, dtype=np.float64).reshape(-1, 3)
+    target_wpts = np.asarray(target_wpts, dtype=np.float64).reshape(-1, 3)
+    self_turn_radius = np.broadcast_to(np.asarray(self_turn_radius, dtype=np.float64), (len(self_wpts),))
+
+    if lut is not None and lut.matches(self_turn_radius):
+        calc_lengths = lambda starts, targets, turn_radius: lut.lengths(starts=starts, targets=targets)
+    else:
+        calc_lengths = lambda starts, targets, turn_radius: calc_optimal_path_pairs(
+                starts=starts, targets=targets, turn_radius=turn_radius).length
+
+    if lead_target:
+        def calc_optimal_dis(points: np.ndarray, indices: np.ndarray):
+            return calc_lengths(self_wpts[indices], points, self_turn_radius[indices])
+    else:
+        # 航迹长度和拦截点无关，只需要计算一次
+        optimal_dis = calc_lengths(self_wpts, target_wpts[:, :2], self_turn_radius)
+
+        def calc_optimal_dis(points: np.ndarray, indices: np.ndarray):
+            return optimal_dis[indices]
+
+    return predict_intercept_points(
+            targets=target_wpts, target_speed=target_speed,
+            self_speed=self_speed,
+            calc_optimal_dis=calc_optimal_dis,
             precision=precision)
 
 
@@ -10,12 +10,21 @@ POINT = Union[Tuple[float, float], List[float]]
 
 
 class Waypoint:
+    """
+    航迹点（x, y, psi）
+    使用__slots__和Python float保存坐标，避免每次3个元素的计算都创建NumPy数组
+    坐标只在从外部数据构造（Waypoint(data)、Waypoint.build）时格式化，飞行过程中产生的航迹点使用Waypoint.raw构造
+    """
+
+    __slots__ = ('x', 'y', 'psi')
 
     def __init__(self, data: np.ndarray | tuple[float, float, float] | list[float] = None):
         if data is None:
-            data = [0, 0, 0]
+            data = (0, 0, 0)
         assert len(data) == 3, "Waypoint must have 3 elements"
-        self.data: np.ndarray = np.array(data, dtype=np.float32)
+        self.x: float = float(data[0])
+        self.y: float = float(data[1])
+        self.psi: float = float(data[2])
         self.format_coordinates()
 
     @classmethod
@@ -26,38 +35,45 @@ class Waypoint:
        :param y:
        :param psi: 航向角角度，（0表示正北方向，90度航向角表示正东方向）
         """
-        return cls([x, y, psi])
-
-    @property
-    def x(self):
-        return self.data[0]
+        return cls((x, y, psi))
 
-    @property
-    def y(self):
-        return self.data[1]
+    @classmethod
+    def raw(cls, x: float, y: float, psi: float) -> Waypoint:
+        """不做小数位格式化的快速构造，psi仍然会放缩到[-180, 180]之内"""
+        wpt = cls.__new__(cls)
+        wpt.x = float(x)
+        wpt.y = float(y)
+        wpt.psi = float(wrap_angle_to_180(psi))
+        return wpt
 
     @property
-    def psi(self):
-        return self.data[2]
+    def data(self) -> np.ndarray:
+        """(x, y, psi)数组，每次访问都会新建"""
+        return np.array((self.x, self.y, self.psi))
 
     @property
-    def location(self):
-        return self.data[:2]
+    def location(self) -> np.ndarray:
+        return np.array((self.x, self.y))
 
     def __str__(self):
-        return "x: " + str(self.x) + ", y: " + str(self.y) + ", psi: " + str(self.psi)
+        return "x: " + str(round(self.x, 3)) + ", y: " + str(round(self.y, 3)) + ", psi: " + str(round(self.psi, 3))
 
     def __repr__(self):
         return self.__str__()
 
     def __eq__(self, other: 'Waypoint'):
-        return np.all(self.data == other.data)
+        # 按照格式化之后的精度（保留3位小数）比较
+        return self.to_dict() == other.to_dict()
 
     def to_dict(self):
-        return { "x": self.x, "y": self.y, "psi": self.psi }
+        return { "x": round(self.x, 3), "y": round(self.y, 3), "psi": round(self.psi, 3) }
 
     def __copy__(self):
-        return Waypoint(self.data)
+        wpt = Waypoint.__new__(Waypoint)
+        wpt.x = self.x
+        wpt.y = self.y
+        wpt.psi = self.psi
+        return wpt
 
     @property
     def standard_rad(self):
@@ -76,17 +92,14 @@ class Waypoint:
         Args:
             decimal_places: 小数点后保留的位数
         """
-        self.data = np.round(self.data, decimal_places)
-        self.data[2] = wrap_angle_to_180(self.data[2])
+        self.x = round(self.x, decimal_places)
+        self.y = round(self.y, decimal_places)
+        self.psi = float(wrap_angle_to_180(round(self.psi, decimal_places)))
 
     def distance(self, other: 'Waypoint' | tuple[float, float] | list[float] | np.ndarray):
-        if isinstance(other, np.ndarray):
-            return np.linalg.norm(self.data[:2] - other[:2])
-        elif isinstance(other, Waypoint):
-            return np.linalg.norm(self.data[:2] - other.data[:2])
-        else:
-            other_data = np.array(other)
-            return np.linalg.norm(self.data[:2] - other_data[:2])
+        if isinstance(other, Waypoint):
+            return math.hypot(self.x - other.x, self.y - other.y)
+        return math.hypot(self.x - other[0], self.y - other[1])
 
     def move_towards(self, target: tuple[float, float] | np.ndarray | list[float], d: float,
                      allow_over: bool = True) -> Waypoint:
@@ -110,7 +123,7 @@ class Waypoint:
         y = self.y + (target[1] - self.y) * ratio
 
         psi = standard_to_heading(math.degrees((math.atan2(y - self.y, x - self.x))))
-        return Waypoint.build(x=x, y=y, psi=psi)
+        return Waypoint.raw(x=x, y=y, psi=psi)
 
     def optimal_move_towards(self, target: tuple[float, float] | np.ndarray, d: float, turn_radius: float):
         # 按照最优轨迹朝着目标点飞行一定距离
@@ -137,19 +150,15 @@ class Waypoint:
         # 朝着psi的方向移动, psi是航向角，0度指向正北，90度指向正东
         # 将航向角从度转换为弧度
         new_psi = self.psi + angle
-        new_theta = np.radians(heading_to_standard(new_psi))
-        new_x = self.x + d * np.cos(new_theta)
-        new_y = self.y + d * np.sin(new_theta)
+        new_theta = math.radians(heading_to_standard(new_psi))
+        new_x = self.x + d * math.cos(new_theta)
+        new_y = self.y + d * math.sin(new_theta)
 
-        new_wpt = Waypoint.build(x=new_x, y=new_y, psi=new_psi)
-        return new_wpt
+        return Waypoint.raw(x=new_x, y=new_y, psi=new_psi)
 
     def relative_waypoint(self, other: 'Waypoint') -> Waypoint:
         """以自身为原点的相对航迹点"""
-        # dx = other.x - self.x
-        # dy = other.y - self.y
-        # dpsi = other.psi - self.psi
-        return Waypoint(data=other.data - self.data)
+        return Waypoint.raw(x=other.x - self.x, y=other.y - self.y, psi=other.psi - self.psi)
 
     def relative_polar_waypoint(self, other: 'Waypoint') -> PolarWaypoint:
         """
@@ -182,6 +191,8 @@ class Waypoint:
 
 
 class PolarWaypoint:
+    __slots__ = ('r', 'theta', 'phi')
+
     def __init__(self, r: float = 0, theta: float = 0, phi: float = 0):
         """
         极坐标航迹点
@@ -189,31 +200,13 @@ class PolarWaypoint:
         :param theta: 角度
         :param phi: 相对朝向 -180到180度之间
         """
-        self.data: np.ndarray = np.array([r, theta, phi], dtype=np.float32)
-
-    @property
-    def r(self) -> float:
-        return self.data[0]
-
-    @r.setter
-    def r(self, value: float) -> None:
-        self.data[0] = value
-
-    @property
-    def theta(self) -> float:
-        return self.data[1]
-
-    @theta.setter
-    def theta(self, value: float) -> None:
-        self.data[1] = value
+        self.r: float = float(r)
+        self.theta: float = float(theta)
+        self.phi: float = float(phi)
 
     @property
-    def phi(self) -> float:
-        return self.data[2]
-
-    @phi.setter
-    def phi(self, value: float) -> None:
-        self.data[2] = value
+    def data(self) -> np.ndarray:
+        return np.array((self.r, self.theta, self.phi))
 
     def __str__(self):
         return "r: " + str(self.r) + ", theta: " + str(self.theta) + ", phi: " + str(self.phi)
@@ -225,7 +218,7 @@ class PolarWaypoint:
         return self.r, self.theta, self.phi
 
     def to_list(self):
-        return self.data.tolist()
+        return [self.r, self.theta, self.phi]
 
 
 class BoundingBox(object):
@@ -354,14 +347,22 @@ class ObjPositioning:
     def __init__(self,
                  wpt1: Waypoint,
                  wpt2: Waypoint,
-                 angle_tolerance: float = 15):
+                 angle_tolerance: float = 15,
+                 rel_2_on_1: PolarWaypoint | None = None,
+                 rel_1_on_2: PolarWaypoint | None = None):
+        """
+        :param rel_2_on_1: 已经算好的2相对于1的极坐标（例如来自战场的距离矩阵），不传则根据航迹点计算
+        :param rel_1_on_2: 已经算好的1相对于2的极坐标
+        """
         self.wpt1 = wpt1
         self.wpt2 = wpt2
 
         # 2相对于1的极坐标
-        rel_2_on_1 = wpt1.relative_polar_waypoint(wpt2)  # r, theta, psi
+        if rel_2_on_1 is None:
+            rel_2_on_1 = wpt1.relative_polar_waypoint(wpt2)  # r, theta, psi
         # 1相对于2的极坐标
-        rel_1_on_2 = wpt2.relative_polar_waypoint(wpt1)  # r, theta, psi
+        if rel_1_on_2 is None:
+            rel_1_on_2 = wpt2.relative_polar_waypoint(wpt1)  # r, theta, psi
         self.head_1_to_2 = abs(rel_2_on_1.theta) <= angle_tolerance  # 1是否朝向2
 
         self.head_2_to_1 = abs(rel_1_on_2.theta) <= angle_tolerance  # 2是否朝向1
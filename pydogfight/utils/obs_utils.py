@@ -1,9 +1,77 @@
+from __future__ import annotations
+
+import math
+
 import numpy as np
 
 from pydogfight.core.world_obj import *
 from pydogfight.core.battle_area import BattleArea
 from gymnasium.spaces.space import Space
 import gymnasium as gym
+from pydogfight.core.relation_matrix import RelationMatrix
+from pydogfight.utils.common import wrap_angles_to_180
+
+
+class AircraftMemory:
+    """
+    一个agent最近一次看到的各个飞机的状态，按照EntityStore的槽位保存成数组
+    只记录生成观测需要的字段，避免每次观测都复制整个飞机对象
+    """
+
+    COLUMNS = {
+        'time'                  : np.float64,  # 最近一次看到的时间
+        'x'                     : np.float64,
+        'y'                     : np.float64,
+        'psi'                   : np.float64,
+        'speed'                 : np.float64,
+        'turn_radius'           : np.float64,
+        'destroyed'             : bool,
+        'missile_count'         : np.int64,
+        'last_fire_missile_time': np.float64,
+    }
+
+    def __init__(self, capacity: int = 16):
+        self.capacity = 0
+        self.seen = np.zeros(0, dtype=bool)  # 是否看到过
+        for name, dtype in self.COLUMNS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self._reserve(capacity)
+
+    def _reserve(self, capacity: int):
+        if capacity <= self.capacity:
+            return
+        for name in ['seen', *self.COLUMNS]:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.capacity] = old
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def clear(self):
+        self.seen[:] = False
+
+    def remember(self, slots: np.ndarray, area: BattleArea):
+        """记录槽位slots上的飞机当前的状态"""
+        if len(slots) == 0:
+            return
+        store = area.store
+        self._reserve(max(store.size, self.capacity))
+        self.seen[slots] = True
+        self.time[slots] = area.time
+        self.x[slots] = store.x[slots]
+        self.y[slots] = store.y[slots]
+        self.psi[slots] = store.psi[slots]
+        self.speed[slots] = store.speed[slots]
+        self.turn_radius[slots] = store.turn_radius[slots]
+        self.destroyed[slots] = store.destroyed[slots]
+        self.missile_count[slots] = [store.objs[j].missile_count for j in slots.tolist()]
+        self.last_fire_missile_time[slots] = [store.objs[j].last_fire_missile_time for j in slots.tolist()]
+
+    def has_seen(self, slots: np.ndarray) -> np.ndarray:
+        result = np.zeros(len(slots), dtype=bool)
+        known = slots < self.capacity
+        result[known] = self.seen[slots[known]]
+        return result
 
 
 class ObsUtils:
@@ -23,11 +91,12 @@ class ObsUtils:
         self.battle_area = battle_area
         self.N = len(battle_area.options.agents()) + self.WATCH_MISSILES  # 最多同时记录所有飞机、5个导弹的信息
         self.observation_space = gym.spaces.Box(low=-10, high=10, shape=(self.N, self.W), dtype=np.float32)
-        self.cache = { }
+        self.memory = AircraftMemory()  # 最近一次看到的飞机的状态
         self.agent_name = agent_name
+        self.buffer = self.empty_obs()  # 复用的观测缓冲区
 
     def reset(self):
-        self.cache.clear()
+        self.memory.clear()
 
     def empty_obs(self):
         return np.zeros(self.observation_space.shape, dtype=np.float32)
@@ -71,7 +140,7 @@ class ObsUtils:
         """
         if agent.name == obj.name:
             return cls.gen_self_obs(agent=agent)
-        rel_pt = agent.waypoint.relative_polar_waypoint(other=obj.waypoint)
+        rel_pt = agent.relative_polar_waypoint(obj)
         obs = cls.empty_obs_line()
         obs[0] = OBJECT_TO_IDX[obj.type]
         obs[1] = int(obj.color != agent.color)
@@ -101,7 +170,7 @@ class ObsUtils:
 
     @classmethod
     def gen_missile_obs(cls, agent: Aircraft, obj: Missile):
-        rel_pt = agent.waypoint.relative_polar_waypoint(other=obj.waypoint)
+        rel_pt = agent.relative_polar_waypoint(obj)
         obs = cls.empty_obs_line()
         obs[0] = OBJECT_TO_IDX[obj.type]
         obs[1] = int(obj.color != agent.color)
@@ -123,52 +192,169 @@ class ObsUtils:
         #         obs[8] = -1
         return obs
 
-    def gen_obs(self):
+    def gen_obs(self, out: np.ndarray | None = None, copy: bool = True) -> np.ndarray:
         """
-        获取agent视角的obs
+        获取agent视角的obs（float32，形状为observation_space.shape）
         注意这里的坐标用相对极坐标来表示
+        :param out: 直接写入调用方提供的缓冲区（例如rollout buffer或者共享内存里的一个位置），并返回out
+        :param copy: 没有提供out时，是否返回内部缓冲区的拷贝，设为False则直接返回内部缓冲区（下一次调用时会被覆盖）
         :return: np.ndarray
         """
-        agent = self.battle_area.get_agent(self.agent_name)
-        obs = np.zeros(self.observation_space.shape)
-
-        obs[0, :] = self.gen_self_obs(agent)
-        index = 1
-        # 隐藏掉雷达探测范围以外的obs，并且移除一些无法获取的信息
-        # 飞机
-        for obj in self.battle_area.agents:
-            if obj.name == agent.name:
-                continue
-            if agent.options.obs_ignore_destroyed and obj.destroyed:
-                continue
-            if not agent.options.obs_ignore_radar and agent.distance(obj) > agent.radar_radius:
-                # 在自己的雷达范围之外
-                if agent.options.obs_allow_memory:
-                    # 允许使用记忆
-                    memory_key = f'{agent.name}-{obj.name}'
-                    if memory_key in self.cache:
-                        obj = self.cache[memory_key]
-                        obs[index, :] = self.gen_aircraft_obs(agent=agent, obj=obj, is_memory=True)
-                        index += 1
-                continue
-            obs[index, :] = self.gen_aircraft_obs(agent=agent, obj=obj, is_memory=False)
-            index += 1
-            if agent.options.obs_allow_memory:
-                self.cache[f'{agent.name}-{obj.name}'] = obj.__copy__()
-
-        # 导弹
-        missiles = self.battle_area.detect_missiles(agent_name=self.agent_name, ignore_radar=False, only_enemy=True)
-        for obj in missiles:
-            if obj.destroyed:
-                continue
-            if index >= len(obs):
-                break
-            if not agent.options.obs_ignore_radar and agent.distance(obj) > agent.radar_radius:
-                # 探测范围之外的导弹
-                continue
-            obs[index, :] = self.gen_missile_obs(agent=agent, obj=obj)
-            index += 1
+        obs = self.buffer if out is None else out
+        self.fill_obs(obs)
+        if out is None and copy:
+            return obs.copy()
+        return obs
 
+    def fill_obs(self, obs: np.ndarray):
+        """将观测写入obs"""
+        self.fill_all_obs(obs_utils=[self], obs=obs[None])
+        return obs
+
+    @classmethod
+    def gen_all_obs(cls, obs_utils: list[ObsUtils], out: np.ndarray | None = None) -> np.ndarray:
+        """
+        一次生成多个agent的观测，结果和逐个调用gen_obs一致
+        :param obs_utils: 同一个战场里各个agent的ObsUtils
+        :param out: 直接写入调用方提供的缓冲区，形状为(len(obs_utils), N, W)
+        :return: (len(obs_utils), N, W)
+        """
+        if out is None:
+            out = np.zeros((len(obs_utils), *obs_utils[0].observation_space.shape), dtype=np.float32)
+        cls.fill_all_obs(obs_utils=obs_utils, obs=out)
+        return out
+
+    @classmethod
+    def fill_all_obs(cls, obs_utils: list[ObsUtils], obs: np.ndarray):
+        """
+        将obs_utils[k]对应agent的观测写入obs[k]
+        实体两两之间的关系只计算一次（使用战场缓存的关系矩阵），所有agent的雷达范围、记忆替换、特征都批量计算
+        """
+        area = obs_utils[0].battle_area
+        store = area.store
+        options = area.options
+        obs.fill(0)
+        N = obs.shape[1]
+
+        agents = [area.get_agent(u.agent_name) for u in obs_utils]
+        agent_indices = np.array([agent.index for agent in agents], dtype=np.int64)
+        radar_radius = np.array([agent.radar_radius for agent in agents], dtype=np.float64)
+        relation = area.relation
+        if relation is None:
+            # update过程中关系矩阵已经过期，这里重新计算一次
+            relation = RelationMatrix(store)
+
+        can_fire_cache = { }  # 槽位 -> 是否可以发射导弹，每架飞机只计算一次
+
+        def can_fire(j: int) -> bool:
+            if j not in can_fire_cache:
+                can_fire_cache[j] = store.objs[j].can_fire_missile()
+            return can_fire_cache[j]
+
+        has_enemy_cache = { }  # 槽位 -> 雷达范围内是否有敌机
+
+        def has_enemy(j: int) -> bool:
+            if j not in has_enemy_cache:
+                has_enemy_cache[j] = area.find_nearest_enemy(agent_name=store.objs[j].name, ignore_radar=False) is not None
+            return has_enemy_cache[j]
+
+        # 自己：航迹终点相对自己的位置
+        for k, agent in enumerate(agents):
+            i = agent.index
+            obs[k, 0, 0] = OBJECT_TO_IDX[agent.type]
+            if store.has_route[i]:
+                rel_pt = agent.waypoint.relative_polar_waypoint(other=Waypoint.raw(*store.route[i, 3:6].tolist()))
+                obs[k, 0, 2] = rel_pt.r / radar_radius[k]
+                obs[k, 0, 3] = math.radians(rel_pt.theta)
+                obs[k, 0, 4] = math.radians(rel_pt.phi)
+            obs[k, 0, 5] = can_fire(i)
+            obs[k, 0, 6] = store.speed[i] / radar_radius[k]
+            obs[k, 0, 7] = store.turn_radius[i] / radar_radius[k]
+            obs[k, 0, 8] = store.destroyed[i]
+
+        # 飞机：按照加入战场的顺序，隐藏掉雷达探测范围以外的，允许记忆时用最近一次看到的状态代替
+        aircraft = store.indices(type='aircraft')
+        candidate = agent_indices[:, None] != aircraft[None, :]
+        if options.obs_ignore_destroyed:
+            candidate &= ~store.destroyed[aircraft][None, :]
+        if options.obs_ignore_radar:
+            visible = candidate
+        else:
+            visible = candidate & (relation.distance[np.ix_(agent_indices, aircraft)] <= radar_radius[:, None])
+        memory = np.zeros_like(visible)
+        if options.obs_allow_memory:
+            for k, u in enumerate(obs_utils):
+                u.memory.remember(aircraft[visible[k]], area)
+                memory[k] = candidate[k] & ~visible[k] & u.memory.has_seen(aircraft)
+        # 每一行在obs中的位置（第0行是自己）
+        row = np.cumsum(visible | memory, axis=1)
+        aircraft_count = row[:, -1] if len(aircraft) > 0 else np.zeros(len(agents), dtype=np.int64)
+
+        # 记忆中的飞机：用最近一次看到的状态，距离固定为1
+        k_memory, m_memory = np.nonzero(memory)
+        if len(k_memory) > 0:
+            memory_rows = row[k_memory, m_memory]
+            memory_slots = aircraft[m_memory]
+            i_memory = agent_indices[k_memory]
+            radius = radar_radius[k_memory]
+            pairs = list(zip(k_memory.tolist(), memory_slots.tolist()))
+
+            def remembered(name: str) -> np.ndarray:
+                return np.array([getattr(obs_utils[k].memory, name)[j] for k, j in pairs])
+
+            x, y, psi = remembered('x'), remembered('y'), remembered('psi')
+            dx = x - store.x[i_memory]
+            dy = y - store.y[i_memory]
+            theta = wrap_angles_to_180(np.degrees(np.arctan2(dy, dx) - np.radians(store.psi[i_memory])))
+            phi = wrap_angles_to_180(psi - store.psi[i_memory])
+            obs[k_memory, memory_rows, 0] = store.type[memory_slots]
+            obs[k_memory, memory_rows, 1] = store.color[memory_slots] != store.color[i_memory]
+            obs[k_memory, memory_rows, 2] = 1
+            obs[k_memory, memory_rows, 3] = np.deg2rad(theta)
+            obs[k_memory, memory_rows, 4] = np.deg2rad(phi)
+            # 和Aircraft.can_fire_missile的规则一致，导弹数和上次发射时间使用记忆中的值
+            obs[k_memory, memory_rows, 5] = (
+                    (remembered('missile_count') > 0) &
+                    (area.time - remembered('last_fire_missile_time') >= options.aircraft_fire_missile_interval) &
+                    np.array([has_enemy(j) for j in memory_slots.tolist()], dtype=bool))
+            obs[k_memory, memory_rows, 6] = remembered('speed') / radius
+            obs[k_memory, memory_rows, 7] = remembered('turn_radius') / radius
+            obs[k_memory, memory_rows, 8] = remembered('destroyed')
+
+        k_aircraft, m_aircraft = np.nonzero(visible)
+        aircraft_rows = row[k_aircraft, m_aircraft]
+        aircraft_slots = aircraft[m_aircraft]
+
+        # 导弹：雷达范围内的敌方导弹，按照距离从小到大排列（距离相同时按照加入战场的顺序），放满为止
+        missiles = store.indices(type='missile', alive=True)
+        missile_distance = relation.distance[np.ix_(agent_indices, missiles)]
+        detected = ((store.color[missiles][None, :] != store.color[agent_indices][:, None]) &
+                    (missile_distance <= radar_radius[:, None]))
+        order = np.argsort(np.where(detected, missile_distance, np.inf), axis=1, kind='stable')
+        take_count = np.minimum(detected.sum(axis=1), np.maximum(N - 1 - aircraft_count, 0))
+        k_missile, rank = np.nonzero(np.arange(len(missiles))[None, :] < take_count[:, None])
+        missile_rows = 1 + aircraft_count[k_missile] + rank
+        missile_slots = missiles[order[k_missile, rank]]
+
+        # 其他实体的特征
+        k_all = np.concatenate([k_aircraft, k_missile])
+        rows = np.concatenate([aircraft_rows, missile_rows])
+        slots = np.concatenate([aircraft_slots, missile_slots])
+        if len(slots) == 0:
+            return obs
+        i_all = agent_indices[k_all]
+        radius = radar_radius[k_all]
+        obs[k_all, rows, 0] = store.type[slots]
+        obs[k_all, rows, 1] = store.color[slots] != store.color[i_all]
+        obs[k_all, rows, 2] = relation.distance[i_all, slots] / radius
+        obs[k_all, rows, 3] = np.deg2rad(relation.theta[i_all, slots])
+        obs[k_all, rows, 4] = np.deg2rad(relation.phi[i_all, slots])
+        obs[k_all, rows, 6] = store.speed[slots] / radius
+        obs[k_all, rows, 7] = store.turn_radius[slots] / radius
+        obs[k_all, rows, 8] = store.destroyed[slots]
+        # 第5列：飞机是否可以发射导弹，导弹的剩余油量
+        obs[k_aircraft, aircraft_rows, 5] = [can_fire(j) for j in aircraft_slots.tolist()]
+        obs[k_missile, missile_rows, 5] = store.fuel[missile_slots] / options.missile_fuel_capacity
         return obs
 
     # # 基地默认是知道的（不考虑雷达）
@@ -181,7 +367,7 @@ class ObsUtils:
     # index += 1
 
     def gen_bullseye_obs(self, agent: Aircraft, obj: Bullseye):
-        rel_pt = agent.waypoint.relative_polar_waypoint(other=obj.waypoint)
+        rel_pt = agent.relative_polar_waypoint(obj)
         obs = self.empty_obs_line()
         obs[0] = OBJECT_TO_IDX[obj.type]
         obs[2] = int(obj.destroyed)
@@ -191,7 +377,7 @@ class ObsUtils:
 
     @classmethod
     def gen_home_obs(cls, agent: Aircraft, obj: Home):
-        rel_pt = agent.waypoint.relative_polar_waypoint(other=obj.waypoint)
+        rel_pt = agent.relative_polar_waypoint(obj)
         obs = cls.empty_obs_line()
         obs[0] = OBJECT_TO_IDX[obj.type]
         obs[1] = int(obj.color != agent.color)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import math
+import os
+import typing
+
+import numpy as np
+
+from pydogfight.utils.traj import calc_optimal_path_pairs
+
+if typing.TYPE_CHECKING:
+    from pydogfight.core.options import Options
+
+
+class OptimalPathLengthLUT:
+    """
+    最短航迹长度查找表
+    转弯半径固定时，从起点飞到目标点的最短航迹长度只和目标点相对起点的距离、方位角有关，并且和转弯半径成正比：
+        length = turn_radius * f(range / turn_radius, |bearing|)
+    这里预先在(range / turn_radius, |bearing|)网格上用精确解计算f，查询时做双线性插值。
+    网格单元的四个角如果有不可达的点、转弯方向不一致（跨过了不连续的边界）或者超出了表的范围，就回退到精确解。
+    """
+
+    VERSION = 1  # 查找表格式的版本，修改构建方式之后需要递增，避免读取到旧的磁盘缓存
+
+    MAX_CELL_SPREAD = 1  # 网格单元四个角的归一化航迹长度最多相差多少，超过则认为不连续
+
+    _instances: dict[tuple, OptimalPathLengthLUT] = { }  # 进程内缓存，同样的参数只构建一次
+    _checked_keys: set[tuple] = set()  # 已经做过精度检查的查找表
+
+    def __init__(self, turn_radius: float, max_range: float, range_steps: int = 512, bearing_steps: int = 361):
+        """
+        :param turn_radius: 转弯半径
+        :param max_range: 表覆盖的最远距离，超出的部分使用精确解
+        :param range_steps: 距离方向的网格点数
+        :param bearing_steps: 方位角方向（0到180度）的网格点数
+        """
+        self.turn_radius = float(turn_radius)
+        self.max_range = float(max_range)
+        self.range_steps = range_steps
+        self.bearing_steps = bearing_steps
+        self.max_rho = self.max_range / self.turn_radius
+        self.rho_step = self.max_rho / (range_steps - 1)
+        self.bearing_step = 180 / (bearing_steps - 1)
+
+        self.table: np.ndarray | None = None  # (range_steps, bearing_steps) 归一化的航迹长度，不可达为inf
+        self.cell_valid: np.ndarray | None = None  # (range_steps - 1, bearing_steps - 1) 网格单元是否可以插值
+
+    @property
+    def key(self) -> tuple:
+        return self.VERSION, round(self.turn_radius, 3), round(self.max_range, 3), self.range_steps, self.bearing_steps
+
+    def build(self):
+        """用精确解计算网格上的航迹长度"""
+        rho = np.arange(self.range_steps) * self.rho_step
+        bearing = np.radians(np.arange(self.bearing_steps) * self.bearing_step)
+        rho, bearing = np.meshgrid(rho, bearing, indexing='ij')
+        distance = (rho * self.turn_radius).ravel()
+        # 起点位于原点、航向正北，方位角顺时针为正
+        targets = np.stack([distance * np.sin(bearing.ravel()), distance * np.cos(bearing.ravel())], axis=-1)
+        paths = calc_optimal_path_pairs(
+                starts=np.zeros((len(targets), 3)),
+                targets=targets,
+                turn_radius=self.turn_radius)
+        self.table = (paths.length / self.turn_radius).reshape(rho.shape)
+        turn_sign = np.sign(paths.turn_angle).reshape(rho.shape)
+
+        corners = [self.table[:-1, :-1], self.table[1:, :-1], self.table[:-1, 1:], self.table[1:, 1:]]
+        signs = [turn_sign[:-1, :-1], turn_sign[1:, :-1], turn_sign[:-1, 1:], turn_sign[1:, 1:]]
+        self.cell_valid = np.all([np.isfinite(c) for c in corners], axis=0)
+        for s in signs[1:]:
+            # 直飞（turn_sign为0）的点和两边都是连续的
+            self.cell_valid &= (s == signs[0]) | (s == 0) | (signs[0] == 0)
+        with np.errstate(invalid='ignore'):
+            # 角点之间相差太大说明跨过了不连续的边界（例如距离为0的点和它附近需要绕一圈的点）
+            self.cell_valid &= np.max(corners, axis=0) - np.min(corners, axis=0) <= self.MAX_CELL_SPREAD
+        return self
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez_compressed(path, key=np.array(self.key, dtype=np.float64), table=self.table,
+                            cell_valid=self.cell_valid)
+
+    def load(self, path: str) -> bool:
+        """从磁盘读取，参数不一致时返回False"""
+        try:
+            with np.load(path) as data:
+                if tuple(data['key'].tolist()) != tuple(float(v) for v in self.key):
+                    return False
+                self.table = data['table']
+                self.cell_valid = data['cell_valid']
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+    def cache_path(self, cache_dir: str) -> str:
+        return os.path.join(
+                cache_dir,
+                f'optimal_path_lut_r{self.turn_radius:.3f}_{self.max_range:.0f}_'
+                f'{self.range_steps}x{self.bearing_steps}_v{self.VERSION}.npz')
+
+    @classmethod
+    def get(cls, turn_radius: float, max_range: float, cache_dir: str = '', **kwargs) -> OptimalPathLengthLUT:
+        """
+        获取查找表，优先使用进程内缓存，然后是磁盘缓存，都没有的话重新构建
+        :param cache_dir: 磁盘缓存的目录，为空则不使用磁盘缓存
+        """
+        lut = cls(turn_radius=turn_radius, max_range=max_range, **kwargs)
+        if lut.key in cls._instances:
+            return cls._instances[lut.key]
+        path = lut.cache_path(cache_dir) if cache_dir != '' else ''
+        if path == '' or not lut.load(path):
+            lut.build()
+            if path != '':
+                lut.save(path)
+        cls._instances[lut.key] = lut
+        return lut
+
+    @classmethod
+    def for_options(cls, options: Options) -> OptimalPathLengthLUT | None:
+        """导弹航迹长度的查找表，没有开启options.missile_path_lut时返回None"""
+        if not options.missile_path_lut:
+            return None
+        lut = cls.get(
+                turn_radius=options.missile_min_turn_radius,
+                max_range=math.hypot(*options.game_size),
+                cache_dir=options.missile_path_lut_cache_dir)
+        if options.missile_path_lut_check and lut.key not in cls._checked_keys:
+            cls._checked_keys.add(lut.key)
+            print('missile path lut accuracy', lut.check_accuracy(max_range=math.hypot(*options.game_size)))
+        return lut
+
+    def matches(self, turn_radius: float | np.ndarray) -> bool:
+        """转弯半径是否和查找表一致"""
+        return bool(np.all(np.abs(np.asarray(turn_radius) - self.turn_radius) < 1e-6))
+
+    def lookup(self, distance: np.ndarray, bearing: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        查表
+        :param distance: 目标点距离
+        :param bearing: 目标点相对航向的方位角（角度）
+        :return: (航迹长度, 是否查表成功)，查表失败的位置需要使用精确解
+        """
+        rho = np.asarray(distance, dtype=np.float64) / self.turn_radius / self.rho_step
+        beta = np.abs(np.asarray(bearing, dtype=np.float64)) / self.bearing_step
+        i = np.clip(np.floor(rho).astype(np.int64), 0, self.range_steps - 2)
+        j = np.clip(np.floor(beta).astype(np.int64), 0, self.bearing_steps - 2)
+        ok = (rho <= self.range_steps - 1) & (beta <= self.bearing_steps - 1) & self.cell_valid[i, j]
+        u = rho - i
+        v = beta - j
+        table = self.table
+        with np.errstate(invalid='ignore'):
+            value = ((1 - u) * (1 - v) * table[i, j] + u * (1 - v) * table[i + 1, j] +
+                     (1 - u) * v * table[i, j + 1] + u * v * table[i + 1, j + 1])
+        return np.where(ok, value * self.turn_radius, float('inf')), ok
+
+    def lengths(self, starts: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """
+        第k个起点到第k个目标点的最短航迹长度（和calc_optimal_path_pairs(...).length近似）
+        :param starts: (K, 3) 起点 x, y, psi
+        :param targets: (K, 2) 目标点 x, y
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        targets = np.asarray(targets, dtype=np.float64).reshape(len(starts), -1)[:, :2]
+        dx = targets[:, 0] - starts[:, 0]
+        dy = targets[:, 1] - starts[:, 1]
+        bearing = np.degrees(np.arctan2(dy, dx) - np.radians(90 - starts[:, 2]))
+        bearing = (bearing + 180) % 360 - 180
+        length, ok = self.lookup(distance=np.hypot(dx, dy), bearing=bearing)
+        if not np.all(ok):
+            fallback = ~ok
+            length[fallback] = calc_optimal_path_pairs(
+                    starts=starts[fallback], targets=targets[fallback], turn_radius=self.turn_radius).length
+        return length
+
+    def check_accuracy(self, samples: int = 10000, max_range: float | None = None, seed: int = 0) -> dict:
+        """
+        精度检查：随机采样，对比查表结果和精确解
+        :return: 最大/平均绝对误差（m）、最大相对误差、回退到精确解的比例
+        """
+        if max_range is None:
+            max_range = self.max_range
+        rng = np.random.default_rng(seed)
+        distance = rng.uniform(0, max_range, size=samples)
+        bearing = rng.uniform(-180, 180, size=samples)
+        starts = np.zeros((samples, 3))
+        targets = np.stack([distance * np.sin(np.radians(bearing)), distance * np.cos(np.radians(bearing))], axis=-1)
+
+        exact = calc_optimal_path_pairs(starts=starts, targets=targets, turn_radius=self.turn_radius).length
+        approx, ok = self.lookup(distance=distance, bearing=bearing)
+        ok &= np.isfinite(exact)
+        error = np.abs(approx[ok] - exact[ok])
+        return {
+            'samples'       : samples,
+            'max_abs_error' : float(error.max()) if len(error) > 0 else 0.0,
+            'mean_abs_error': float(error.mean()) if len(error) > 0 else 0.0,
+            'max_rel_error' : float((error / np.maximum(exact[ok], 1)).max()) if len(error) > 0 else 0.0,
+            'fallback_rate' : float(1 - ok.mean()),
+        }
+
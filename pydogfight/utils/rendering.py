@@ -9,6 +9,7 @@ import math
 from pydogfight.core.constants import *
 import os
 import numpy as np
+from collections import OrderedDict
 
 
 def pygame_load_img(path):
@@ -18,6 +19,119 @@ def pygame_load_img(path):
     return image
 
 
+class LRUCache:
+    """容量有限的字典，超出容量时淘汰最久没用过的"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        """取出key对应的值，不存在时调用factory()生成"""
+        if key in self.data:
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+        self.misses += 1
+        value = factory()
+        self.data[key] = value
+        if len(self.data) > self.capacity:
+            self.data.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class RenderCache:
+    """
+    渲染资源缓存，避免每帧都从磁盘加载图片、创建字体
+    - images: 从磁盘加载的原图（按路径）
+    - surfaces: 旋转/缩放后的图片（按路径、量化后的角度、缩放尺寸），LRU淘汰
+    - fonts: 字体对象（按字号）
+    - texts: 渲染好的文字（按文字、字号、颜色），LRU淘汰
+    pygame退出后（字体失效）需要调用clear
+    """
+
+    def __init__(self, capacity: int = 1024, text_capacity: int = 256):
+        self.images = { }
+        self.surfaces = LRUCache(capacity)
+        self.fonts = { }
+        self.texts = LRUCache(text_capacity)
+
+    @staticmethod
+    def quantize_angle(angle: float, step: float) -> float:
+        """把角度量化到step度的格子里，范围[0, 360)"""
+        if step > 0:
+            angle = round(angle / step) * step
+        return angle % 360
+
+    def image(self, path: str):
+        """原图，有显示窗口时转换成和屏幕一致的像素格式（blit更快）"""
+        if path not in self.images:
+            import pygame
+            img = pygame_load_img(path)
+            if pygame.display.get_surface() is not None:
+                img = img.convert_alpha()
+            self.images[path] = img
+        return self.images[path]
+
+    def surface(self, path: str, rotate: float = None, scale: Optional[tuple[float, float]] = None,
+                rotate_step: float = 0):
+        """旋转（rotate_step度量化）、缩放后的图片"""
+        if rotate is None and scale is None:
+            return self.image(path)
+        if rotate is not None:
+            rotate = self.quantize_angle(rotate, rotate_step)
+        if scale is not None:
+            scale = (int(scale[0]), int(scale[1]))
+
+        def factory():
+            import pygame
+            img = self.image(path)
+            if rotate is not None:
+                img = pygame.transform.rotate(img, rotate)  # 顺时针旋转
+            if scale is not None:
+                img = pygame.transform.smoothscale(img, scale)
+            return img
+
+        return self.surfaces.get((path, rotate, scale), factory)
+
+    def font(self, size: int):
+        import pygame
+        if not pygame.font.get_init():
+            self.clear_fonts()
+            pygame.font.init()
+        if size not in self.fonts:
+            if len(self.fonts) == 0:
+                # pygame退出后字体对象都失效了（register_quit注册的回调只会被调用一次）
+                pygame.register_quit(self.clear_fonts)
+            self.fonts[size] = pygame.font.Font(None, size)  # 使用默认字体
+        return self.fonts[size]
+
+    def clear_fonts(self):
+        self.fonts.clear()
+        self.texts.clear()
+
+    def text(self, text: str, size: int, color: str = 'black'):
+        """渲染好的文字Surface"""
+        font = self.font(size)
+        return self.texts.get((text, size, color), lambda: font.render(text, True, COLORS[color]))
+
+    def clear(self):
+        self.images.clear()
+        self.surfaces.clear()
+        self.clear_fonts()
+
+
+render_cache = RenderCache()
+
+
 def game_point_to_screen_point(
         game_point: Tuple[float, float] | np.ndarray,
         game_size: Tuple[float, float] | np.ndarray,
@@ -66,13 +180,8 @@ def render_img(
         label: str = '',
         rotate: float = None,
         scale: Optional[tuple[float, float]] = None) -> np:
-    # 加载图像（确保路径正确）
-    import pygame
-    img = pygame_load_img(img_path).convert_alpha()
-    if rotate is not None:
-        img = pygame.transform.rotate(img, rotate)  # 顺时针旋转
-    if scale is not None:
-        img = pygame.transform.smoothscale(img, scale)
+    # 从缓存中取出旋转、缩放后的图像
+    img = render_cache.surface(img_path, rotate=rotate, scale=scale, rotate_step=options.render_rotate_step)
 
     # 获取图像的矩形区域
     img_rect = img.get_rect()
@@ -88,11 +197,8 @@ def render_img(
     screen.blit(img, img_rect)
 
     if label != '':
-        # 创建字体对象
-        font = pygame.font.Font(None, 16)  # 使用默认字体，大小为36
-
         # 渲染文本到 Surface 对象
-        text_surface = font.render(label, True, (0, 0, 0))
+        text_surface = render_cache.text(label, size=16)
 
         # 获取文本区域的矩形
         text_rect = text_surface.get_rect()
@@ -146,10 +252,8 @@ def render_rect(options: Options, screen, rect: BoundingBox, color: str, width:
 
 
 def render_text(screen, text: str, topleft: tuple[float, float], text_size: int = 18, color='black'):
-    import pygame
-    info_font = pygame.font.Font(None, text_size)
     # 渲染文本到 Surface 对象
-    text_surface = info_font.render(text, True, COLORS[color])
+    text_surface = render_cache.text(text, size=text_size, color=color)
     # 获取文本区域的矩形
     text_rect = text_surface.get_rect()
     text_rect.topleft = topleft
@@ -6,6 +6,7 @@ from pydogfight.utils.models import Waypoint
 import math
 import numpy as np
 from pydogfight.utils.geometry import *
+from pydogfight.utils.common import wrap_angles_to_180
 from enum import Enum
 
 
@@ -53,22 +54,22 @@ class OptimalPathParam:
         if length < self.turn_length:
             # 拐弯
             init_theta = math.atan2(self.start.y - self.turn_center[1], self.start.x - self.turn_center[0])
-            curr_turn_rad = np.deg2rad(self.turn_angle) * length / self.turn_length
-            x = self.turn_center[0] + (self.turn_radius * np.cos(init_theta + curr_turn_rad))
-            y = self.turn_center[1] + (self.turn_radius * np.sin(init_theta + curr_turn_rad))
-            psi = self.start.psi - np.rad2deg(curr_turn_rad)
-            return Waypoint.build(x=x, y=y, psi=psi)
+            curr_turn_rad = math.radians(self.turn_angle) * length / self.turn_length
+            x = self.turn_center[0] + (self.turn_radius * math.cos(init_theta + curr_turn_rad))
+            y = self.turn_center[1] + (self.turn_radius * math.sin(init_theta + curr_turn_rad))
+            psi = self.start.psi - math.degrees(curr_turn_rad)
+            return Waypoint.raw(x=x, y=y, psi=psi)
 
         length -= self.turn_length
 
         # 生成直线点
         if self.direct_length > 0:
             curr_direct_length = self.direct_length * length / self.direct_length
-            target_rad = np.deg2rad(90 - self.target.psi)
-            x = self.turn_point[0] + curr_direct_length * np.cos(target_rad)
-            y = self.turn_point[1] + curr_direct_length * np.sin(target_rad)
+            target_rad = math.radians(90 - self.target.psi)
+            x = self.turn_point[0] + curr_direct_length * math.cos(target_rad)
+            y = self.turn_point[1] + curr_direct_length * math.sin(target_rad)
             psi = self.target.psi
-            return Waypoint.build(x=x, y=y, psi=psi)
+            return Waypoint.raw(x=x, y=y, psi=psi)
 
         return None
 
@@ -139,12 +140,12 @@ def calc_optimal_path(
     param = OptimalPathParam(start=start, target=target, turn_radius=turn_radius)
     param.turn_radius = turn_radius
 
-    start_target_distance = np.sqrt((target.x - start.x) ** 2 + (target.y - start.y) ** 2)
+    start_target_distance = math.hypot(target.x - start.x, target.y - start.y)
 
     if start_target_distance == 0:
         param.length = 0
         param.direct_length = 0
-        param.target = Waypoint.build(x=param.target.x, y=param.target.y, psi=param.start.psi)
+        param.target = Waypoint.raw(x=param.target.x, y=param.target.y, psi=param.start.psi)
         param.turn_point = (param.start.x, param.start.y)
         return param
 
@@ -154,7 +155,7 @@ def calc_optimal_path(
         # 直接沿着直线飞行
         param.length = start_target_distance
         param.direct_length = start_target_distance
-        param.target = Waypoint.build(x=param.target.x, y=param.target.y, psi=param.start.psi)
+        param.target = Waypoint.raw(x=param.target.x, y=param.target.y, psi=param.start.psi)
         param.turn_point = (param.start.x, param.start.y)
         return param
 
@@ -199,13 +200,200 @@ def calc_optimal_path(
                 param.turn_length = turn_length
                 param.turn_point = point
                 param.turn_center = circle_center
-                param.target = Waypoint.build(
+                param.target = Waypoint.raw(
                         x=param.target.x, y=param.target.y,
                         psi=90 - math.degrees(point_to_target_theta))
 
     return param
 
 
+class OptimalPathBatch:
+    """
+    批量计算的最短航迹，每一项的形状都是shape（calc_optimal_paths为(N, M)，calc_optimal_path_pairs为(K,)），
+    每个位置的结果和calc_optimal_path一致
+    """
+
+    def __init__(self, starts: np.ndarray, targets: np.ndarray, turn_radius: np.ndarray):
+        self.starts = starts  # shape + (3,) 起点 x, y, psi
+        self.targets = targets  # shape + (2,) 目标点 x, y
+        self.turn_radius = turn_radius  # shape 转弯半径
+
+        shape = turn_radius.shape
+        self.shape = shape
+        self.length = np.full(shape, float('inf'))  # 航迹长度
+        self.turn_angle = np.zeros(shape)  # 转弯角度
+        self.turn_length = np.zeros(shape)  # 转弯长度
+        self.direct_length = np.zeros(shape)  # 直线长度
+        self.turn_point = np.zeros(shape + (2,))  # 拐点
+        self.turn_center = np.full(shape + (2,), np.nan)  # 拐弯的圆心，没有转弯时为nan
+        self.target_psi = np.zeros(shape)  # 到达目标点时的航向角
+
+    def param(self, *index: int) -> OptimalPathParam:
+        """某一个位置的OptimalPathParam，例如calc_optimal_paths结果中第i个起点到第j个目标点: param(i, j)"""
+        target = self.targets[index]
+        param = OptimalPathParam(
+                start=Waypoint(data=self.starts[index]),
+                target=Waypoint.build(x=target[0], y=target[1], psi=self.target_psi[index]),
+                turn_radius=float(self.turn_radius[index]))
+        param.length = float(self.length[index])
+        param.turn_angle = float(self.turn_angle[index])
+        param.turn_length = float(self.turn_length[index])
+        param.direct_length = float(self.direct_length[index])
+        param.turn_point = tuple(self.turn_point[index])
+        if not np.isnan(self.turn_center[index][0]):
+            param.turn_center = tuple(self.turn_center[index])
+        return param
+
+
+def _sign(v: np.ndarray) -> np.ndarray:
+    return np.where(v >= 0, 1.0, -1.0)
+
+
+def _cross(ax, ay, bx, by):
+    return ax * by - ay * bx
+
+
+def _format_starts(starts: np.ndarray | list) -> np.ndarray:
+    # 和Waypoint.build保持一样的格式（保留3位小数）
+    starts = np.round(np.asarray(starts, dtype=np.float64).reshape(-1, 3), 3)
+    starts[:, 2] = wrap_angles_to_180(starts[:, 2])
+    return starts
+
+
+def _format_targets(targets: np.ndarray | list) -> np.ndarray:
+    targets = np.asarray(targets, dtype=np.float64)
+    return np.round(targets.reshape(-1, targets.shape[-1] if targets.ndim > 1 else 2)[:, :2], 3)
+
+
+def calc_optimal_paths(
+        starts: np.ndarray | list,
+        targets: np.ndarray | list,
+        turn_radius: float | np.ndarray) -> OptimalPathBatch:
+    """
+    批量计算最短航迹（calc_optimal_path的向量化版本），一次计算N个起点到M个目标点的所有组合
+    :param starts: (N, 3) 起点 x, y, psi
+    :param targets: (M, 2) 目标点 x, y
+    :param turn_radius: 转弯半径，标量或者(N,)（每个起点一个）
+    :return: OptimalPathBatch，形状为(N, M)
+    """
+    starts = _format_starts(starts)
+    targets = _format_targets(targets)
+    shape = (len(starts), len(targets))
+    turn_radius = np.broadcast_to(np.asarray(turn_radius, dtype=np.float64), (len(starts),))
+    batch = OptimalPathBatch(
+            starts=np.broadcast_to(starts[:, None, :], shape + (3,)),
+            targets=np.broadcast_to(targets[None, :, :], shape + (2,)),
+            turn_radius=np.broadcast_to(turn_radius[:, None], shape))
+    _solve_optimal_paths(batch)
+    return batch
+
+
+def calc_optimal_path_pairs(
+        starts: np.ndarray | list,
+        targets: np.ndarray | list,
+        turn_radius: float | np.ndarray,
+        format_starts: bool = True) -> OptimalPathBatch:
+    """
+    批量计算最短航迹，第k个起点只计算到第k个目标点的航迹
+    :param starts: (K, 3) 起点 x, y, psi
+    :param targets: (K, 2) 目标点 x, y
+    :param turn_radius: 转弯半径，标量或者(K,)
+    :param format_starts: 是否像Waypoint.build一样将起点保留3位小数，起点来自实体当前的航迹点时不需要
+    :return: OptimalPathBatch，形状为(K,)
+    """
+    if format_starts:
+        starts = _format_starts(starts)
+    else:
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    targets = _format_targets(targets)
+    assert len(starts) == len(targets)
+    turn_radius = np.broadcast_to(np.asarray(turn_radius, dtype=np.float64), (len(starts),))
+    batch = OptimalPathBatch(starts=starts, targets=targets, turn_radius=turn_radius)
+    _solve_optimal_paths(batch)
+    return batch
+
+
+def _solve_optimal_paths(batch: OptimalPathBatch):
+    """逐项计算最短航迹，计算流程和calc_optimal_path保持一致"""
+    shape = batch.shape
+    x0, y0, psi = batch.starts[..., 0], batch.starts[..., 1], batch.starts[..., 2]
+    tx, ty = batch.targets[..., 0], batch.targets[..., 1]
+    r = batch.turn_radius
+
+    dx, dy = tx - x0, ty - y0
+    start_target_distance = np.hypot(dx, dy)
+    start_to_target_theta = np.arctan2(dy, dx)
+    start_rad = np.radians((90 - psi) % 360)
+
+    # 起点和目标点重合，或者直接沿着直线飞行
+    same = start_target_distance == 0
+    straight = ~same & (start_to_target_theta == start_rad)
+    direct = same | straight
+    batch.length[direct] = start_target_distance[direct]
+    batch.direct_length[direct] = batch.length[direct]
+    batch.target_psi[direct] = psi[direct]
+    batch.turn_point[:] = np.stack([x0, y0], axis=-1)
+
+    # 先拐弯，再直线飞行
+    start_vx, start_vy = np.cos(start_rad), np.sin(start_rad)
+    line_rad = np.radians(90 - psi)
+    best_length = np.full(shape, float('inf'))
+    best = { }
+    for normal in [line_rad + math.pi / 2, line_rad - math.pi / 2]:
+        cx = x0 + r * np.cos(normal)
+        cy = y0 + r * np.sin(normal)
+        cts_x, cts_y = x0 - cx, y0 - cy  # 圆心到初始点的向量
+        start_sign = _sign(_cross(cts_x, cts_y, start_vx, start_vy))  # 初始向量旋转方向
+
+        # 目标点到圆的切点
+        d = np.sqrt((tx - cx) ** 2 + (ty - cy) ** 2)
+        alpha = np.arctan2(ty - cy, tx - cx)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            theta = np.arcsin(r / d)
+        angle1 = math.pi / 2 - theta + alpha
+        angle2 = math.pi / 2 - theta - alpha
+        on_circle = d == r
+        candidates = [
+            (np.where(on_circle, tx, cx + r * np.cos(angle1)), np.where(on_circle, ty, cy + r * np.sin(angle1)),
+             d >= r),
+            (cx + r * np.cos(angle2), cy - r * np.sin(angle2), d > r),
+        ]
+        for px, py, exists in candidates:
+            ctp_x, ctp_y = px - cx, py - cy  # 圆心到拐点的向量
+            ptt_x, ptt_y = tx - px, ty - py  # 拐点到目标点向量
+            valid = exists & ~direct & (start_sign == _sign(_cross(ctp_x, ctp_y, ptt_x, ptt_y)))
+
+            direct_length = np.sqrt(ptt_x ** 2 + ptt_y ** 2)
+            # 从圆心到初始点的向量旋转到圆心到拐点的向量
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cos_angle = (cts_x * ctp_x + cts_y * ctp_y) / (np.hypot(cts_x, cts_y) * np.hypot(ctp_x, ctp_y))
+            turn_rad = np.arccos(np.clip(cos_angle, -1.0, 1.0))
+            reverse = (turn_rad > ROTATION_EPS) & (_sign(_cross(cts_x, cts_y, ctp_x, ctp_y)) != start_sign)
+            turn_rad = np.where(reverse, math.pi * 2 - turn_rad, turn_rad) * start_sign
+            turn_length = np.abs(math.pi * turn_rad * r)
+            total_length = direct_length + turn_length
+
+            better = valid & (total_length < best_length)
+            best_length = np.where(better, total_length, best_length)
+            for key, value in [
+                ('direct_length', direct_length),
+                ('turn_angle', np.degrees(turn_rad)),
+                ('turn_length', turn_length),
+                ('turn_point', np.stack([px, py], axis=-1)),
+                ('turn_center', np.stack([cx, cy], axis=-1)),
+                ('target_psi', 90 - np.degrees(np.arctan2(ptt_y, ptt_x))),
+            ]:
+                mask = better if value.ndim == len(shape) else better[..., None]
+                best[key] = np.where(mask, value, best.get(key, getattr(batch, key)))
+
+    turned = np.isfinite(best_length)
+    batch.length[turned] = best_length[turned]
+    for key, value in best.items():
+        getattr(batch, key)[turned] = value[turned]
+    # 和Waypoint一样处理目标点的航向角
+    batch.target_psi = wrap_angles_to_180(batch.target_psi)
+
+
 def test_bench():
     N = 10
     start_time = time.time()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import typing
+
+import numpy as np
+
+if typing.TYPE_CHECKING:
+    from pydogfight.envs import Dogfight2dEnv
+
+
+class FrameWriter:
+    """
+    在后台线程里把帧编码写到磁盘，主线程只需要把帧放进队列，队列满了（编码跟不上）时丢帧
+    - png: 图片序列，path是文件夹，每一帧保存为{序号}.png
+    - gif: 动图（需要Pillow），帧在后台线程里转换成调色板图像，关闭时一次性写入
+    - mp4: 视频（需要安装imageio[ffmpeg]）
+    """
+
+    FORMATS = ('png', 'gif', 'mp4')
+
+    def __init__(self, path: str, format: str = 'png', fps: float = 10, queue_size: int = 64):
+        assert format in self.FORMATS, f'Unknown video format: {format}'
+        self.path = path
+        self.format = format
+        self.fps = fps
+        self.frames: queue.Queue[np.ndarray | None] = queue.Queue(maxsize=queue_size)
+        self.written_count = 0  # 已经写入的帧数
+        self.dropped_count = 0  # 队列满了丢掉的帧数
+        self.error: Exception | None = None
+
+        self._encoder = self._open_encoder()
+        self._thread = threading.Thread(target=self._run, name=f'FrameWriter({path})', daemon=True)
+        self._thread.start()
+
+    def _open_encoder(self):
+        if self.format == 'png':
+            os.makedirs(self.path, exist_ok=True)
+            return None
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if self.format == 'mp4':
+            try:
+                import imageio
+            except ImportError as e:
+                raise ImportError('video format mp4 requires imageio[ffmpeg] to be installed') from e
+            return imageio.get_writer(self.path, fps=self.fps)
+        return []  # gif的帧
+
+    def write(self, frame: np.ndarray) -> bool:
+        """
+        放入一帧(高, 宽, 3)的RGB数组（写入前不能再修改它），不会阻塞
+        :return: 是否放入了队列
+        """
+        if self.error is not None:
+            return False
+        try:
+            self.frames.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.dropped_count += 1
+            return False
+
+    def _run(self):
+        from PIL import Image
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                if self.format == 'png':
+                    # 压缩等级1：编码快几倍，文件稍大
+                    Image.fromarray(frame).save(os.path.join(self.path, f'{self.written_count}.png'),
+                                                compress_level=1)
+                elif self.format == 'gif':
+                    self._encoder.append(Image.fromarray(frame).quantize())
+                else:
+                    self._encoder.append_data(frame)
+                self.written_count += 1
+            except Exception as e:
+                self.error = e
+        try:
+            if self.format == 'gif':
+                if len(self._encoder) > 0:
+                    self._encoder[0].save(self.path, save_all=True, append_images=self._encoder[1:],
+                                          duration=int(1000 / self.fps), loop=0)
+                self._encoder.clear()
+            elif self.format == 'mp4':
+                self._encoder.close()
+        except Exception as e:
+            self.error = e
+
+    def close(self, wait: bool = True):
+        """不再接收新的帧，已经放入队列的帧会写完，wait为True时等待写完"""
+        if self._thread.is_alive():
+            self.frames.put(None)
+        if wait:
+            self.join()
+
+    @property
+    def done(self) -> bool:
+        """后台线程是否已经写完退出"""
+        return not self._thread.is_alive()
+
+    def join(self):
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+class VideoRecorder:
+    """
+    在没有显示窗口的情况下录制对战画面（Dogfight2dEnv.render_rgb），每隔stride次update录一帧，每隔episode_stride轮录一轮
+    每一轮保存为folder/{episode}.{format}（png格式是一个文件夹），编码在FrameWriter的后台线程中进行
+    第一次update之后才开始写入，没有进行过的一轮（例如最后一次reset）不会产生文件
+    """
+
+    def __init__(self, env: Dogfight2dEnv, folder: str,
+                 stride: int = 10, episode_stride: int = 1,
+                 format: str = 'png', fps: float = 10, queue_size: int = 64):
+        assert format in FrameWriter.FORMATS, f'Unknown video format: {format}'
+        self.env = env
+        self.folder = folder
+        self.stride = max(1, stride)
+        self.episode_stride = max(1, episode_stride)
+        self.format = format
+        self.fps = fps
+        self.queue_size = queue_size
+
+        self.recording = False  # 这一轮是否需要录制
+        self.writer: FrameWriter | None = None  # 当前这一轮的写入器
+        self.closing_writers: list[FrameWriter] = []  # 已经结束但是可能还在后台写入的
+        self.update_count = 0
+
+        env.add_episode_start_handler(lambda _: self.on_episode_start())
+        env.add_after_update_handler(lambda _: self.after_update())
+        env.add_episode_end_handler(lambda _: self.on_episode_end())
+
+    def episode_path(self, episode: int) -> str:
+        if self.format == 'png':
+            return os.path.join(self.folder, str(episode))
+        return os.path.join(self.folder, f'{episode}.{self.format}')
+
+    def capture(self):
+        if not self.recording:
+            return
+        if self.writer is None:
+            self.writer = FrameWriter(path=self.episode_path(self.env.episode), format=self.format, fps=self.fps,
+                                      queue_size=self.queue_size)
+        self.writer.write(self.env.render_rgb())
+
+    def on_episode_start(self):
+        self.update_count = 0
+        self.recording = self.env.episode % self.episode_stride == 0
+
+    def after_update(self):
+        self.update_count += 1
+        if self.update_count == 1 or self.update_count % self.stride == 0:
+            self.capture()
+
+    def on_episode_end(self):
+        if self.writer is not None and self.update_count > 1 and self.update_count % self.stride != 0:
+            self.capture()  # 最后一帧
+        self.recording = False
+        if self.writer is None:
+            return
+        self.writer.close(wait=False)
+        closing_writers = [self.writer]
+        for writer in self.closing_writers:
+            if writer.done:
+                writer.join()  # 写入出错时在这里抛出异常
+            else:
+                closing_writers.append(writer)
+        self.closing_writers = closing_writers
+        self.writer = None
+
+    def close(self):
+        """结束当前这一轮的录制，等待所有帧写完"""
+        self.recording = False
+        if self.writer is not None:
+            self.writer.close(wait=False)
+            self.closing_writers.append(self.writer)
+            self.writer = None
+        for writer in self.closing_writers:
+            writer.join()
+        self.closing_writers.clear()
@@ -0,0 +1,79 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from benchmarks.common import drive_agents
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.options import Options
+from pydogfight.core.world_obj import *
+
+
+class TestEpisodeStats(unittest.TestCase):
+
+    def test_merge_episode_stats(self):
+        """子进程里的对战统计数据合并到另一个BattleArea，和本地运行episode_end的结果一致"""
+        options = Options()
+        options.red_agents = ['red_1', 'red_2']
+        options.blue_agents = ['blue_1']
+        area = BattleArea(options=options)
+        other = BattleArea(options=options)
+        np.random.seed(0)
+        for _ in range(3):
+            area.episode_start()
+            for agent in area.agents:
+                agent.put_action((Actions.fire_missile, 0, 0))
+            for _ in range(50):
+                area.update()
+            episode_stats = pickle.loads(pickle.dumps(area.episode_stats()))
+            area.episode_end()
+            other.merge_episode_stats(episode_stats)
+        self.assertEqual(other.stats, area.stats)
+        self.assertEqual(other.accum_time, area.accum_time)
+        self.assertEqual(area.episode, 3)
+
+
+def scan_remain_count(area: BattleArea) -> dict:
+    """遍历所有实体统计剩余数量（增量维护之前的实现）"""
+    count = BattleArea.empty_remain_count()
+    for obj in area.objs.values():
+        if obj.destroyed:
+            continue
+        count.setdefault(obj.type, { 'red': 0, 'blue': 0 })
+        count[obj.type][obj.color] = count[obj.type].get(obj.color, 0) + 1
+    return count
+
+
+class TestRemainCount(unittest.TestCase):
+
+    def run_episode(self, indestructible: bool):
+        options = Options()
+        options.red_agents = ['red_1', 'red_2']
+        options.blue_agents = ['blue_1', 'blue_2']
+        options.indestructible = indestructible
+        options.max_duration = 60
+        area = BattleArea(options=options)
+        np.random.seed(0)
+        for _ in range(2):
+            area.episode_start()
+            destroyed = False
+            while True:
+                if int(area.time / options.delta_time) % 20 == 0:
+                    drive_agents(area, fire=True)
+                area.update()
+                destroyed |= any(agent.destroyed_count > 0 for agent in area.agents)
+                self.assertEqual(area.remain_count, scan_remain_count(area))
+                destroyed_count = { 'red': 0, 'blue': 0 }
+                for agent in area.agents:
+                    destroyed_count[agent.color] += agent.destroyed_count
+                self.assertEqual(area._destroyed_count, destroyed_count)
+                if area.winner != '':
+                    break
+            self.assertTrue(destroyed)
+            area.episode_end()
+
+    def test_remain_count(self):
+        self.run_episode(indestructible=False)
+
+    def test_indestructible(self):
+        self.run_episode(indestructible=True)
@@ -0,0 +1,23 @@
+import unittest
+
+from benchmarks import load_benchmarks, run_benchmark
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_run_all(self):
+        """每个基准测试都能跑一次（不计时）"""
+        benchmarks = load_benchmarks()
+        names = [bench.name for bench in benchmarks]
+        self.assertEqual(len(names), len(set(names)))
+        for bench in benchmarks:
+            with self.subTest(bench.name):
+                result = run_benchmark(bench, min_time=0, repeat=1, warmup=0)
+                self.assertEqual(result.calls, 1)
+                self.assertGreater(result.best, 0)
+                if bench.sim_time > 0:
+                    self.assertGreater(result.sim_speed, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,3 +20,66 @@ class TestGridExplore(unittest.TestCase):
             (250, 250)
         ])
 
+
+
+class TestDogfightTree(unittest.TestCase):
+
+    def setUp(self):
+        import pybts
+        from pydogfight.core.options import Options
+        from pydogfight.envs import Dogfight2dEnv
+        self.env = Dogfight2dEnv(options=Options())
+        self.env.reset()
+        self.agent_name = self.env.options.red_agents[0]
+        self.root_class = lambda: pybts.IsMatchRule(rule='{{agent.fuel}} > 0 and "{{agent.name}}" == "red_1"')
+
+    def test_lazy_agent_context(self):
+        from pydogfight.core.world_obj import ObjDictView
+        from py_trees.common import Status
+        tree = DogfightTree(env=self.env, root=self.root_class(), name='lazy', agent_name=self.agent_name).setup()
+        tree.tick()
+        agent = tree.context['agent']
+        self.assertIsInstance(agent, ObjDictView)
+        self.assertEqual(tree.root.status, Status.SUCCESS)
+        # 只计算了模版读取的字段
+        self.assertEqual(set(agent._values), { 'fuel', 'name' })
+
+        expected = self.env.get_agent(self.agent_name).to_dict()
+        self.assertEqual(dict(agent), expected)
+        self.assertEqual(tree.context_snapshot()['agent'], expected)
+
+    def test_eager_agent_context(self):
+        tree = DogfightTree(env=self.env, root=self.root_class(), name='eager', agent_name=self.agent_name,
+                            eager_agent_context=True).setup()
+        tree.tick()
+        self.assertEqual(tree.context['agent'], self.env.get_agent(self.agent_name).to_dict())
+
+
+class TestActionSink(unittest.TestCase):
+
+    def test_drain_in_tree_order(self):
+        import pybts
+        from pybts.composites import Parallel
+        from pydogfight.policy.bt.base_class import ActionSink
+
+        class PutAction(pybts.Action):
+            def __init__(self, values: list, **kwargs):
+                super().__init__(**kwargs)
+                self.values = values
+
+            def update(self):
+                for value in self.values:
+                    self.actions.put_nowait(value)
+                return pybts.Status.SUCCESS
+
+        nodes = [PutAction(name=str(i), values=[(i, k) for k in range(i % 3)]) for i in range(6)]
+        root = Parallel(name='root', children=[Parallel(name='a', children=nodes[:3]),
+                                               Parallel(name='b', children=nodes[3:])])
+        nodes[4].actions.put_nowait('before')  # 创建ActionSink之前放入的动作不会丢
+        sink = ActionSink(root)
+        # 逆序放入，取出时仍然按照树的顺序
+        for node in reversed(nodes):
+            node.update()
+        self.assertEqual(list(sink.drain()), [(1, 0), (2, 0), (2, 1), 'before', (4, 0), (5, 0), (5, 1)])
+        self.assertEqual(list(sink.drain()), [])
+        self.assertTrue(all(node.actions.empty() for node in nodes))
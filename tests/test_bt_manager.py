@@ -0,0 +1,100 @@
+import json
+import os
+import queue
+import tempfile
+import unittest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GREEDY = os.path.join(ROOT, 'scripts', 'float_array', 'policy', 'greedy.xml')
+
+
+def manager_config(output: str, **kwargs) -> dict:
+    """1v1贪心对战的配置"""
+    return {
+        'output' : output,
+        'track'  : 0,
+        'policy' : { 'red': GREEDY, 'blue': GREEDY },
+        'options': {
+            'red_agents'  : ['red_1'],
+            'blue_agents' : ['blue_1'],
+            'max_duration': 120,
+            'device'      : 'cpu',
+        },
+        **kwargs
+    }
+
+
+class TestBTManager(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import utils
+        except ImportError as e:
+            self.skipTest(f'utils dependencies are not installed: {e}')
+        self.utils = utils
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(ROOT)  # 行为树从scripts文件夹中查找
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def create_manager(self, **kwargs):
+        manager = self.utils.BTManager(config=manager_config(self.tmp.name, **kwargs), train=False)
+        manager.show_pbar = False
+        return manager
+
+    def test_video(self):
+        try:
+            import pygame
+        except ImportError:
+            self.skipTest('pygame is not installed')
+        manager = self.create_manager(video=True)
+        env = manager.env
+        self.assertEqual(env.render_mode, 'rgb_array')
+        self.assertTrue(env.options.render_enabled())
+        route_rendered = []
+        env.add_after_update_handler(
+                lambda _: route_rendered.append(any(a.render_route is not None for a in env.battle_area.agents)))
+        manager.run(episodes=1)
+        env.close()
+        self.assertTrue(any(route_rendered))  # 视频里能画出航迹
+        self.assertGreater(len(os.listdir(os.path.join(manager.output_run_id, 'video', '0'))), 0)
+
+    def test_run_parallel(self):
+        """2个子进程跑的结果和按同样的种子依次运行每个子进程的对战一致"""
+        # 150秒内双方会交战，不同种子的对战过程不同
+        manager = self.create_manager(options={ **manager_config('')['options'], 'max_duration': 150 })
+        results = []
+        merge_episode_result = manager.merge_episode_result
+        manager.merge_episode_result = lambda result: (results.append(result), merge_episode_result(result))
+        manager.run_parallel(episodes=3, workers=2, seed=7)
+        self.assertEqual(manager.env.battle_area.stats['episode'], 3)
+
+        # 在本进程中依次运行每个子进程（第i个用seed+i）
+        config = self.utils.merge_config(manager.config, { 'options': { 'render': False } })
+        expected = []
+        for shard, episodes in enumerate([2, 1]):
+            result_queue = queue.Queue()
+            self.utils._run_eval_shard(shard, config, episodes, 7 + shard, manager.run_context(), result_queue)
+            while not result_queue.empty():
+                kind, _, data = result_queue.get()
+                self.assertNotEqual(kind, 'error', data)
+                if kind == 'episode':
+                    expected.append(data)
+        self.assertGreater(len({ result['time'] for result in expected }), 1)
+        self.assertEqual(sorted(map(json.dumps, results)), sorted(map(json.dumps, expected)))
+
+        # 合并后的统计数据一致（最后一轮的胜者取决于子进程发回结果的顺序）
+        env = self.utils.create_env(config)
+        for result in expected:
+            env.battle_area.merge_episode_stats(result)
+        stats = { k: v for k, v in manager.env.battle_area.stats.items() if k != 'winner' }
+        self.assertEqual(stats, { k: v for k, v in env.battle_area.stats.items() if k != 'winner' })
+        self.assertAlmostEqual(manager.env.battle_area.accum_time, env.battle_area.accum_time)
+
+
+if __name__ == '__main__':
+    unittest.main()
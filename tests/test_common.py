@@ -65,6 +65,27 @@ class TestCollisionDetection(unittest.TestCase):
         self.assertTrue(will_collide(np.array([0, 0]), np.array([0, 0]), 1, np.array([0.5, 0]), np.array([0.5, 0]), 1))
 
 
+class TestVectorizedCollision(unittest.TestCase):
+    def test_will_collide_pairs(self):
+        rng = np.random.default_rng(0)
+        n = 500
+        a1, a2, b1, b2 = [rng.uniform(-10, 10, size=(n, 2)) for _ in range(4)]
+        b2[:50] = b1[:50] + a2[:50] - a1[:50]  # 相对静止
+        ra, rb = rng.uniform(0.1, 2, size=n), rng.uniform(0.1, 2, size=n)
+        result = will_collide_pairs(a1, a2, ra, b1, b2, rb)
+        for k in range(n):
+            self.assertEqual(will_collide(a1[k], a2[k], ra[k], b1[k], b2[k], rb[k]), result[k])
+
+    def test_sweep_and_prune(self):
+        rng = np.random.default_rng(1)
+        lo = rng.uniform(0, 100, size=60)
+        hi = lo + rng.uniform(0, 10, size=60)
+        i, j = sweep_and_prune(lo, hi)
+        expected = { (a, b) for a in range(60) for b in range(a + 1, 60) if lo[a] <= hi[b] and lo[b] <= hi[a] }
+        self.assertEqual(expected, set(zip(i.tolist(), j.tolist())))
+        self.assertEqual(len(expected), len(i))
+
+
 class TestMergeToDicts(unittest.TestCase):
 
     def test_merge_to_dicts(self):
@@ -0,0 +1,49 @@
+import unittest
+
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.options import Options
+from pydogfight.core.world_obj import *
+
+
+class TestEntityStore(unittest.TestCase):
+
+    def setUp(self):
+        self.options = Options()
+        self.area = BattleArea(options=self.options)
+        self.area.episode_start()
+
+    def test_columns_follow_objs(self):
+        store = self.area.store
+        for obj in self.area.objs.values():
+            self.assertIs(store.objs[obj.index], obj)
+            self.assertAlmostEqual(store.x[obj.index], obj.waypoint.x)
+            self.assertAlmostEqual(store.y[obj.index], obj.waypoint.y)
+            self.assertEqual(store.speed[obj.index], obj.speed)
+        agent = self.area.get_agent(self.options.red_agents[0])
+        agent.fuel -= 10
+        self.assertEqual(store.fuel[agent.index], agent.fuel)
+        agent.do_move(agent.waypoint.move(d=100))
+        self.assertAlmostEqual(store.x[agent.index], agent.waypoint.x)
+        self.assertAlmostEqual(store.last_y[agent.index], agent.last_waypoint.y)
+
+    def test_indices(self):
+        store = self.area.store
+        self.assertEqual(len(store.indices(type='aircraft')), len(self.options.agents()))
+        self.assertEqual(len(store.indices(type='home', color='red')), 1)
+
+    def test_remove_detach(self):
+        agent = self.area.get_agent(self.options.red_agents[0])
+        agent.fuel = 5
+        self.area.remove_obj(agent)
+        self.assertEqual(agent.index, -1)
+        self.assertEqual(agent.fuel, 5)
+        agent.destroyed = True
+        self.assertTrue(agent.destroyed)
+        self.assertEqual(len(self.area.store.indices(type='aircraft')), len(self.options.agents()) - 1)
+
+    def test_copy_is_not_attached(self):
+        agent = self.area.get_agent(self.options.red_agents[0])
+        agent_copy = agent.__copy__()
+        agent_copy.fuel = 1
+        self.assertEqual(agent_copy.index, -1)
+        self.assertNotEqual(agent.fuel, 1)
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from benchmarks.common import drive_agents
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.events import EventType, Event, DESTROY_REASONS
+from pydogfight.core.options import Options
+from pydogfight.core.world_obj import *
+
+
+class TestEvents(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        options = Options()
+        options.red_agents = ['red_1', 'red_2']
+        options.blue_agents = ['blue_1', 'blue_2']
+        self.area = BattleArea(options=options)
+        self.received: list[Event] = []
+        self.area.events.subscribe(self.received.append, types=[EventType.MISSILE_FIRED, EventType.DESTROYED])
+        self.area.episode_start()
+
+    def run_steps(self, steps: int):
+        area = self.area
+        for i in range(steps):
+            if i % 20 == 0:
+                drive_agents(area, fire=True)
+            area.update()
+            if area.winner != '':
+                break
+
+    def test_same_as_counters(self):
+        """事件日志的统计和飞机上的计数一致"""
+        self.run_steps(2000)
+        log = self.area.events.log
+        counters = {
+            EventType.DESTROYED        : 'destroyed_count',
+            EventType.MISSILE_FIRED    : 'missile_fired_count',
+            EventType.MISSILE_FIRE_FAIL: 'missile_fire_fail_count',
+            EventType.MISSILE_HIT      : 'missile_hit_enemy_count',
+            EventType.MISSILE_MISS     : 'missile_miss_count',
+            EventType.MISSILE_EVADE    : 'missile_evade_success_count',
+            EventType.HOME_RETURN      : 'home_returned_count',
+            EventType.FUEL_DEPLETED    : 'fuel_depletion_count',
+        }
+        self.assertGreater(log.count(EventType.MISSILE_FIRED), 0)
+        self.assertGreater(log.count(EventType.DESTROYED), 0)
+        for agent in self.area.agents:
+            for event_type, key in counters.items():
+                self.assertEqual(log.count(event_type, obj=agent.index), getattr(agent, key), (agent.name, key))
+            destroyed = log.mask(EventType.DESTROYED, obj=agent.index)
+            reasons = [DESTROY_REASONS[int(v)] for v in log.value[destroyed]]
+            self.assertEqual(reasons, [reason for reason, _ in agent.destroyed_reason])
+
+        self.assertTrue(np.all(np.diff(log.time) >= 0))
+        self.assertTrue(all(log.names[slot] == name for slot, name in
+                            [(agent.index, agent.name) for agent in self.area.agents]))
+
+        # 订阅者只收到订阅的事件类型
+        self.assertEqual(len(self.received), log.count(EventType.MISSILE_FIRED) + log.count(EventType.DESTROYED))
+        fired = [event for event in self.received if event.type == EventType.MISSILE_FIRED]
+        self.assertTrue(all(isinstance(event.missile, Missile) for event in fired))
+
+    def test_since(self):
+        self.run_steps(100)
+        log = self.area.events.log
+        start = len(log)
+        self.run_steps(100)
+        delta = log.since(start)
+        self.assertEqual(len(delta['type']), len(log) - start)
+        self.assertTrue(np.array_equal(delta['obj'], log.obj[start:]))
+
+        # 新的一局清空日志，订阅者保留
+        self.area.episode_start()
+        self.assertEqual(len(log), 0)
+        self.assertEqual(len(self.area.events.handlers[EventType.DESTROYED]), 1)
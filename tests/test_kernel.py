@@ -0,0 +1,126 @@
+import importlib.util
+import sys
+import types
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from benchmarks.common import drive_agents
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.entity_store import EntityStore
+from pydogfight.core.kernel import SimulationKernel, advance, advance_loop
+from pydogfight.core.options import Options
+from pydogfight.core.world_obj import *
+from pydogfight.utils.traj import calc_optimal_path
+
+
+class TestKernel(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.size = 64
+        self.store = EntityStore()
+        self.params = []
+        for k in range(self.size):
+            wpt = Waypoint.raw(x=rng.uniform(-20000, 20000), y=rng.uniform(-20000, 20000), psi=rng.uniform(-180, 180))
+            obj = WorldObj(name=str(k), options=Options(), type='missile', waypoint=wpt, speed=1000)
+            param = None
+            if k % 4 != 0:
+                # 每4个实体中有一个没有航迹
+                param = calc_optimal_path(start=wpt, target=rng.uniform(-20000, 20000, size=2), turn_radius=4000)
+            obj.route_param = param
+            self.store.add(obj)
+            self.params.append(param)
+        self.time = rng.uniform(0, 40, size=self.size)
+
+    def args(self):
+        store = self.store
+        return (store.x[:self.size], store.y[:self.size], store.psi[:self.size], store.speed[:self.size],
+                store.has_route[:self.size], store.route_time[:self.size] - self.time, store.route[:self.size],
+                0.0, 0.1)
+
+    def test_same_as_waypoint(self):
+        """和逐个实体调用next_waypoint/move的结果一致"""
+        x, y, psi, done = advance_loop(*self.args())
+        for k, param in enumerate(self.params):
+            wpt = None
+            if param is not None and 1000 * self.time[k] <= param.length:
+                wpt = param.next_waypoint(length=1000 * self.time[k])
+            self.assertEqual(done[k], param is not None and wpt is None)
+            if wpt is None:
+                wpt = self.store.waypoint(k).move(d=100)
+            self.assertEqual((x[k], y[k], psi[k]), (wpt.x, wpt.y, wpt.psi))
+
+    def test_vectorized_same_as_loop(self):
+        expected = advance_loop(*self.args())
+        result = advance(*self.args())
+        for a, b in zip(result, expected):
+            self.assertTrue(np.allclose(a, b, rtol=0, atol=1e-6))
+
+    @unittest.skipUnless(importlib.util.find_spec('numba') is not None, 'numba is not installed')
+    def test_numba_backend(self):
+        kernel = SimulationKernel(backend='numba')
+        expected = advance_loop(*self.args())
+        result = kernel.advance(*self.args())
+        for a, b in zip(result, expected):
+            self.assertTrue(np.allclose(a, b, rtol=0, atol=1e-6))
+
+    def test_numba_dispatch(self):
+        """没有安装numba时用一个和Dispatcher一样会绑定self的替身检查numba后端的调用方式"""
+
+        class FakeDispatcher:
+            def __init__(self, func):
+                self.func = func
+                self.calls = 0
+
+            def __call__(self, *args, **kwargs):
+                self.calls += 1
+                return self.func(*args, **kwargs)
+
+            def __get__(self, obj, objtype=None):
+                return self if obj is None else types.MethodType(self, obj)
+
+        dispatchers = []
+
+        def njit(**kwargs):
+            def wrap(func):
+                dispatchers.append(FakeDispatcher(func))
+                return dispatchers[-1]
+
+            return wrap
+
+        fake_numba = types.ModuleType('numba')
+        fake_numba.njit = njit
+        with mock.patch.dict(sys.modules, { 'numba': fake_numba }), \
+                mock.patch.object(SimulationKernel, '_numba_advance', None):
+            kernel = SimulationKernel(backend='numba')
+            expected = advance_loop(*self.args())
+            result = kernel.advance(*self.args())
+        self.assertEqual(dispatchers[0].calls, 1)
+        for a, b in zip(result, expected):
+            self.assertTrue(np.array_equal(a, b))
+
+    def test_battle_area_vectorized(self):
+        """批量计算和逐个计算得到的对战过程一致"""
+        areas = []
+        for vectorize_min in [1, 10 ** 6]:
+            np.random.seed(0)
+            options = Options()
+            options.red_agents = ['red_1', 'red_2']
+            options.blue_agents = ['blue_1', 'blue_2']
+            area = BattleArea(options=options)
+            area.kernel.VECTORIZE_MIN = vectorize_min
+            area.episode_start()
+            for i in range(300):
+                if i % 50 == 0:
+                    drive_agents(area, fire=True)
+                area.update()
+            areas.append(area)
+        self.assertEqual(list(areas[0].objs.keys()), list(areas[1].objs.keys()))
+        self.assertGreater(len(areas[0].missiles), 0)
+        for name, obj in areas[0].objs.items():
+            other = areas[1].objs[name]
+            self.assertAlmostEqual(obj.waypoint.x, other.waypoint.x, places=3)
+            self.assertAlmostEqual(obj.waypoint.y, other.waypoint.y, places=3)
+            self.assertEqual(obj.destroyed, other.destroyed)
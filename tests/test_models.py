@@ -50,3 +50,15 @@ class TestWaypoint(unittest.TestCase):
         self.assertEqual(Waypoint.build(10, 0, 90),
                          Waypoint.build(0, 0, 0).move_towards((10, 0), 100, allow_over=False))
         self.assertEqual(Waypoint.build(0, 0, 0), Waypoint.build(0, 0, 0).move_towards((0, 0), 9))
+
+    def test_format(self):
+        """从外部数据构造时格式化坐标，飞行过程中的航迹点保留完整精度"""
+        wpt = Waypoint.build(x=1.23456, y=-2.00049, psi=270)
+        self.assertEqual((wpt.x, wpt.y, wpt.psi), (1.235, -2.0, -90))
+        self.assertEqual(wpt.data.tolist(), [1.235, -2.0, -90])
+
+        raw = Waypoint.raw(x=1.23456, y=2, psi=190)
+        self.assertEqual((raw.x, raw.psi), (1.23456, -170))
+        self.assertEqual(raw, Waypoint.build(x=1.235, y=2, psi=-170))
+        copied = raw.__copy__()
+        self.assertEqual((copied.x, copied.y, copied.psi), (raw.x, raw.y, raw.psi))
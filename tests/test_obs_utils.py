@@ -0,0 +1,124 @@
+import unittest
+
+import numpy as np
+
+from benchmarks.common import drive_agents
+from pydogfight.core.options import Options
+from pydogfight.envs import Dogfight2dEnv
+from pydogfight.core.world_obj import *
+from pydogfight.utils.obs_utils import ObsUtils
+
+
+def scalar_obs(obs_utils: ObsUtils, cache: dict | None = None) -> np.ndarray:
+    """逐个实体生成观测（批量计算之前的实现），cache不为None时用复制的飞机对象作为记忆"""
+    area = obs_utils.battle_area
+    agent = area.get_agent(obs_utils.agent_name)
+    obs = obs_utils.empty_obs()
+    obs[0, :] = obs_utils.gen_self_obs(agent)
+    index = 1
+    for obj in area.agents:
+        if obj.name == agent.name or obj.destroyed:
+            continue
+        if agent.distance(obj) > agent.radar_radius:
+            if cache is not None and obj.name in cache:
+                obs[index, :] = obs_utils.gen_aircraft_obs(agent=agent, obj=cache[obj.name], is_memory=True)
+                index += 1
+            continue
+        if cache is not None:
+            cache[obj.name] = obj.__copy__()
+        obs[index, :] = obs_utils.gen_aircraft_obs(agent=agent, obj=obj, is_memory=False)
+        index += 1
+    for obj in area.detect_missiles(agent_name=agent.name, ignore_radar=False, only_enemy=True):
+        if obj.destroyed:
+            continue
+        if index >= len(obs):
+            break
+        obs[index, :] = obs_utils.gen_missile_obs(agent=agent, obj=obj)
+        index += 1
+    return obs
+
+
+def random_near(agent: Aircraft, enemy: Aircraft) -> tuple[float, float]:
+    x, y = np.random.uniform(-20000, 20000, size=2)
+    return enemy.waypoint.x + x, enemy.waypoint.y + y
+
+
+class TestObsUtils(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        options = Options()
+        options.red_agents = ['red_1', 'red_2', 'red_3']
+        options.blue_agents = ['blue_1', 'blue_2', 'blue_3']
+        options.aircraft_radar_radius = 15000
+        options.obs_allow_memory = False
+        self.env = Dogfight2dEnv(options=options)
+        self.env.reset()
+
+    def test_same_as_scalar(self):
+        area = self.env.battle_area
+        missile_seen = False
+        for step in range(300):
+            if step % 20 == 0:
+                drive_agents(area, fire=True)
+            self.env.update()
+            for name in self.env.options.agents():
+                obs = self.env.gen_agent_obs(name)
+                self.assertEqual(obs.dtype, np.float32)
+                self.assertTrue(np.array_equal(obs, scalar_obs(self.env.obs_utils_dict[name])))
+                missile_seen |= bool(np.any(obs[:, 0] == OBJECT_TO_IDX['missile']))
+        self.assertTrue(missile_seen)
+
+    def test_out(self):
+        obs_utils = self.env.obs_utils_dict['red_1']
+        expected = obs_utils.gen_obs()
+        buffer = np.full((2, *obs_utils.observation_space.shape), -1, dtype=np.float32)
+        result = obs_utils.gen_obs(out=buffer[1])
+        self.assertTrue(np.shares_memory(result, buffer))
+        self.assertTrue(np.array_equal(buffer[1], expected))
+        self.assertTrue(np.all(buffer[0] == -1))
+
+        # 不拷贝时返回内部缓冲区
+        self.assertIs(obs_utils.gen_obs(copy=False), obs_utils.buffer)
+        self.assertIsNot(obs_utils.gen_obs(), obs_utils.buffer)
+
+    def test_memory(self):
+        area = self.env.battle_area
+        area.options.obs_allow_memory = True
+        caches = { name: { } for name in self.env.options.agents() }
+        memory_seen = False
+        for step in range(300):
+            if step % 20 == 0:
+                # 飞向敌机附近的随机位置，敌机会进出雷达范围
+                drive_agents(area, fire=True, target=random_near)
+            self.env.update()
+            for name in self.env.options.agents():
+                obs = self.env.gen_agent_obs(name)
+                expected = scalar_obs(self.env.obs_utils_dict[name], cache=caches[name])
+                self.assertTrue(np.array_equal(obs, expected))
+                memory_seen |= bool(np.any((obs[1:, 0] == OBJECT_TO_IDX['aircraft']) & (obs[1:, 2] == 1)))
+        self.assertTrue(memory_seen)
+
+        # 新的一局清空记忆（reset生成的观测只会记住开局时看到的飞机）
+        self.env.reset()
+        memory = self.env.obs_utils_dict['red_1'].memory
+        self.assertTrue(np.all(memory.time[memory.seen] == 0))
+
+    def test_all_obs(self):
+        area = self.env.battle_area
+        area.options.obs_allow_memory = True
+        agents = self.env.options.agents()
+        for step in range(200):
+            if step % 20 == 0:
+                drive_agents(area, fire=True, target=lambda agent, enemy: (-enemy.waypoint.x, enemy.waypoint.y))
+            self.env.update()
+            all_obs = self.env.gen_all_obs()
+            self.assertEqual(all_obs.shape, (len(agents), *self.env.agent_observation_space.shape))
+            for k, name in enumerate(agents):
+                self.assertTrue(np.array_equal(all_obs[k], self.env.gen_agent_obs(name)))
+
+        buffer = np.zeros((2, *all_obs.shape), dtype=np.float32)
+        result = self.env.gen_all_obs(out=buffer[1])
+        self.assertTrue(np.shares_memory(result, buffer))
+        self.assertTrue(np.array_equal(buffer[1], all_obs))
+        self.assertTrue(np.all(buffer[0] == 0))
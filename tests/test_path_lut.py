@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pydogfight.utils.path_lut import OptimalPathLengthLUT
+from pydogfight.utils.traj import calc_optimal_path_pairs
+
+
+class TestOptimalPathLengthLUT(unittest.TestCase):
+
+    def test_accuracy(self):
+        lut = OptimalPathLengthLUT(turn_radius=4000, max_range=70000).build()
+        result = lut.check_accuracy(samples=5000)
+        self.assertLess(result['mean_abs_error'], 5)
+        self.assertLess(result['fallback_rate'], 0.05)
+
+    def test_lengths_fallback(self):
+        """超出查找表范围的点使用精确解"""
+        lut = OptimalPathLengthLUT(turn_radius=1000, max_range=10000, range_steps=128, bearing_steps=91).build()
+        starts = np.array([[0, 0, 0], [100, 100, 45], [0, 0, 90]])
+        targets = np.array([[0, 5000], [5000, -3000], [50000, 0]])
+        lengths = lut.lengths(starts=starts, targets=targets)
+        exact = calc_optimal_path_pairs(starts=starts, targets=targets, turn_radius=1000).length
+        self.assertTrue(np.allclose(lengths, exact, rtol=0.01))
+        self.assertEqual(lengths[2], exact[2])
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            kwargs = dict(turn_radius=1234, max_range=8000, range_steps=64, bearing_steps=37)
+            lut = OptimalPathLengthLUT(**kwargs).build()
+            lut.save(lut.cache_path(cache_dir))
+            self.assertTrue(os.path.exists(lut.cache_path(cache_dir)))
+
+            loaded = OptimalPathLengthLUT(**kwargs)
+            self.assertTrue(loaded.load(loaded.cache_path(cache_dir)))
+            self.assertTrue(np.array_equal(loaded.table, lut.table))
+            # 参数不一致时不能读取
+            other = OptimalPathLengthLUT(**{ **kwargs, 'max_range': 9000 })
+            self.assertFalse(other.load(lut.cache_path(cache_dir)))
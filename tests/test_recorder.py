@@ -0,0 +1,199 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.common import drive_agents
+from pydogfight.core.actions import Actions
+from pydogfight.core.constants import OBJECT_TO_IDX
+from pydogfight.core.options import Options
+from pydogfight.envs import Dogfight2dEnv, EpisodeRecorder, ReplayEnv
+from pydogfight.utils.episode_file import EpisodeFile, write_episode_file
+
+
+class TestEpisodeFile(unittest.TestCase):
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'a.dfep')
+            arrays = {
+                'a'    : np.arange(12, dtype=np.float32).reshape(3, 4),
+                'b'    : np.array([True, False, True]),
+                'empty': np.zeros((0, 3), dtype=np.float64),
+            }
+            write_episode_file(path, meta={ 'name': '测试' }, arrays=arrays)
+            file = EpisodeFile(path)
+            self.assertEqual(file.meta, { 'name': '测试' })
+            self.assertEqual(sorted(file.keys()), ['a', 'b', 'empty'])
+            for name, array in arrays.items():
+                self.assertEqual(file[name].dtype, array.dtype)
+                np.testing.assert_array_equal(file[name], array)
+            self.assertIsInstance(file['a'].base, np.ndarray)  # 映射上的视图
+            self.assertEqual(file['a'].ctypes.data % 64, 0)
+            self.assertFalse(file['a'].flags.writeable)
+
+
+class TestEpisodeRecorder(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.tmp = tempfile.TemporaryDirectory()
+        options = Options()
+        options.red_agents = ['red_1', 'red_2']
+        options.blue_agents = ['blue_1', 'blue_2']
+        self.env = Dogfight2dEnv(options=options)
+        self.recorder = EpisodeRecorder(env=self.env, folder=self.tmp.name)
+
+    def tearDown(self):
+        self.env.close()
+        self.tmp.cleanup()
+
+    def play(self, steps: int):
+        """双方互相追击并发射导弹，返回每一步之后的位置和所有agent的观测"""
+        env = self.env
+        area = env.battle_area
+        env.reset()
+        positions = [area.store.positions()[:, :2].copy()]
+        all_obs = [env.gen_all_obs().copy()]
+        for step in range(steps):
+            if step % 20 == 0:
+                drive_agents(area, fire=True)
+            env.update()
+            positions.append(area.store.positions()[:, :2].copy())
+            all_obs.append(env.gen_all_obs().copy())
+        env.reset()  # 结束这一轮，写入文件
+        return positions, all_obs
+
+    def test_replay(self):
+        positions, all_obs = self.play(steps=200)
+        path = self.recorder.episode_path(0)
+        self.assertEqual(self.recorder.written_paths, [path])
+        file = EpisodeFile(path)
+        self.assertEqual(file.meta['steps'], 201)
+        self.assertGreater(len(file['action']), 0)
+        self.assertTrue((file['slot_type'] == OBJECT_TO_IDX['missile']).any())  # 发射过导弹
+
+        replay = ReplayEnv(path)
+        replay.reset()
+        self.assertEqual(replay.num_steps, 201)
+        for step in range(replay.num_steps):
+            if step > 0:
+                replay.step(None)
+            self.assertEqual(replay.step_index, step)
+            store = replay.battle_area.store
+            live = positions[step]
+            used = store.used[:store.size]
+            np.testing.assert_allclose(store.positions()[:len(live), :2][used[:len(live)]],
+                                       live[used[:len(live)]])
+            np.testing.assert_allclose(replay.gen_all_obs(), all_obs[step], atol=1e-5)
+        self.assertAlmostEqual(replay.time, file['time'][-1])
+
+        # 记录时的动作
+        actions = replay.actions_at(0)
+        self.assertEqual(len(actions), 8)  # 每个agent都是飞向敌机并发射导弹
+        self.assertEqual({ name for name, _ in actions }, set(replay.options.agents()))
+        self.assertEqual([int(action[0]) for _, action in actions[:2]], [Actions.go_to_location, Actions.fire_missile])
+        self.assertEqual(replay.actions_at(1), [])
+
+    def test_seek(self):
+        positions, _ = self.play(steps=120)
+        replay = ReplayEnv(self.recorder.episode_path(0))
+        replay.reset()
+        for step in [100, 30, 119, 0, 60]:
+            replay.seek(step=step)
+            store = replay.battle_area.store
+            live = positions[step]
+            self.assertEqual(replay.step_index, step)
+            used = store.used[:len(live)]
+            np.testing.assert_allclose(store.positions()[:len(live), :2][used], live[used])
+        replay.seek(time=replay.file['time'][40])
+        self.assertEqual(replay.step_index, 40)
+        info = replay.gen_info()
+        self.assertEqual(info['winner'], '')
+        self.assertEqual(info['remain_count']['aircraft'], { 'red': 2, 'blue': 2 })
+
+    def test_episode_stride(self):
+        self.recorder.episode_stride = 2
+        for _ in range(3):
+            self.env.reset()
+            for _ in range(5):
+                self.env.update()
+        self.env.reset()
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['0.dfep', '2.dfep'])
+
+    def test_missile_removed_in_update(self):
+        """同一次update内发射又被移除的导弹：记录发射者/目标，回放时颜色一致"""
+        env = self.env
+        area = env.battle_area
+
+        def fire_and_remove(_):
+            red = area.objs['red_1']
+            if red.missile_fired_count > 0:
+                return
+            red.radar_radius = red.distance(area.objs['blue_1']) + 1  # 保证敌机在雷达范围内
+            red.last_fire_missile_time = -red.options.aircraft_fire_missile_interval
+            red.fire_missile(target=area.objs['blue_1'].waypoint.location)
+            area.remove_obj(area.objs[red.missile_fired[-1]])
+
+        env.add_before_update_handler(fire_and_remove)
+        env.reset()
+        for _ in range(3):
+            env.update()
+        env.reset()
+
+        path = self.recorder.episode_path(0)
+        file = EpisodeFile(path)
+        slot = int(np.flatnonzero(file['slot_type'] == OBJECT_TO_IDX['missile'])[0])
+        names = file.meta['slot_names']
+        self.assertEqual(names[slot], 'red_1_missile_0')
+        self.assertFalse(file['used'][1, slot])
+        self.assertEqual(names[file['slot_source'][slot]], 'red_1')
+        self.assertEqual(names[file['slot_target'][slot]], 'blue_1')
+        self.assertEqual(file['fire_time'][slot], file['time'][0])
+
+        replay = ReplayEnv(path)
+        replay.reset()
+        replay.seek(step=1)
+        missile = replay.battle_area.store.objs[slot]
+        self.assertIsNone(missile)  # 已经移除
+        self.assertEqual(replay.battle_area.store.color[slot], file['slot_color'][slot])
+
+        # 旧的记录中没有发射者/目标（-1）时用占位的飞机
+        arrays = { name: np.array(file[name]) for name in file.keys() }
+        arrays['slot_source'][slot] = -1
+        arrays['slot_target'][slot] = -1
+        old_path = os.path.join(self.tmp.name, 'old.dfep')
+        write_episode_file(old_path, meta=file.meta, arrays=arrays)
+        replay = ReplayEnv(old_path)
+        replay.reset()
+        replay.seek(step=1)
+        area = replay.battle_area
+        self.assertFalse(area.store.used[slot])
+        self.assertEqual(len(area.agents), 4)
+        missile = area._create_obj(slot, name=names[slot])
+        self.assertEqual(missile.color, 'red')
+        self.assertNotIn(missile.source.name, area.objs)  # 占位的飞机不在战场上
+
+    def test_render_rgb(self):
+        try:
+            import pygame
+        except ImportError:
+            self.skipTest('pygame is not installed')
+        self.play(steps=30)
+        options = Options()
+        options.load_dict(EpisodeFile(self.recorder.episode_path(0)).meta['options'])
+        options.render_mode = 'rgb_array'
+        options.screen_size = (200, 160)
+        replay = ReplayEnv(self.recorder.episode_path(0), options=options)
+        replay.reset()
+        replay.seek(step=20)
+        frame = replay.render()
+        self.assertEqual(frame.shape, (160, 200, 3))
+        self.assertTrue((frame != 255).any())
+        self.assertIsNotNone(replay.get_agent('red_1').render_route)
+        replay.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
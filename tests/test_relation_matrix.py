@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.options import Options
+from pydogfight.utils.common import wrap_angles_to_180
+from pydogfight.core.world_obj import *
+
+
+class TestRelationMatrix(unittest.TestCase):
+
+    def test_wrap_angles(self):
+        angles = np.array([-540, -360, -181, -180, 0, 179.5, 180, 181, 360, 540, 725.25])
+        expected = [wrap_angle_to_180(a) for a in angles]
+        self.assertTrue(np.allclose(wrap_angles_to_180(angles), expected))
+
+    def test_same_as_waypoint(self):
+        options = Options()
+        options.red_agents = ['red_1', 'red_2', 'red_3']
+        options.blue_agents = ['blue_1', 'blue_2', 'blue_3']
+        area = BattleArea(options=options)
+        area.episode_start()
+        relation = area.relation
+        objs = list(area.objs.values())
+        for obj1 in objs:
+            for obj2 in objs:
+                rel = obj1.waypoint.relative_polar_waypoint(obj2.waypoint)
+                self.assertAlmostEqual(relation.distance[obj1.index, obj2.index], rel.r, places=2)
+                self.assertAlmostEqual(relation.theta[obj1.index, obj2.index], rel.theta, places=3)
+                self.assertAlmostEqual(relation.phi[obj1.index, obj2.index], rel.phi, places=3)
+
+    def test_invalidate(self):
+        area = BattleArea(options=Options())
+        area.episode_start()
+        agent = area.get_agent(area.options.red_agents[0])
+        enemy = area.get_agent(area.options.blue_agents[0])
+        relation = area.relation
+        self.assertIs(area.relation, relation)
+        enemy.waypoint = agent.waypoint.move(d=1000)
+        self.assertIsNot(area.relation, relation)
+        self.assertAlmostEqual(agent.distance(enemy), 1000, places=1)
+        # 记忆中的实体副本不在矩阵中
+        self.assertAlmostEqual(agent.distance(enemy.__copy__()), 1000, places=1)
@@ -0,0 +1,110 @@
+import os
+import pickle
+import time
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+from pydogfight.core.options import Options
+from pydogfight.envs import Dogfight2dEnv
+from pydogfight.envs.render_process import SnapshotRingBuffer, draw_snapshot
+
+
+class TestSnapshotRingBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.buffer = SnapshotRingBuffer(slots=2, slot_size=16)
+
+    def tearDown(self):
+        self.buffer.close()
+
+    def test_read_latest(self):
+        buffer = self.buffer
+        self.assertIsNone(buffer.read_latest())
+        for i in range(3):
+            self.assertTrue(buffer.write(bytes([i]) * (i + 1)))
+        # 在另一个进程里通过名字打开
+        reader = SnapshotRingBuffer(slots=2, slot_size=16, name=buffer.name)
+        try:
+            self.assertEqual(reader.read_latest(0), (3, b'\x02\x02\x02'))
+            self.assertIsNone(reader.read_latest(3))
+        finally:
+            reader.close()
+
+    def test_oversize(self):
+        self.assertFalse(self.buffer.write(b'x' * 17))
+        self.assertEqual(self.buffer.header[SnapshotRingBuffer.OVERSIZE], 1)
+        self.assertIsNone(self.buffer.read_latest())
+
+
+class TestRenderSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import pygame
+        except ImportError:
+            self.skipTest('pygame is not installed')
+        np.random.seed(0)
+        options = Options()
+        options.red_agents = ['red_1', 'red_2']
+        options.blue_agents = ['blue_1', 'blue_2']
+        options.render = True
+        self.env = Dogfight2dEnv(options=options)
+        self.env.reset()
+        for _ in range(50):
+            self.env.update()
+
+    def tearDown(self):
+        self.env.close()
+
+    def test_draw_snapshot(self):
+        """序列化后的快照画出来和直接渲染一致"""
+        import pygame
+        env = self.env
+        env.render_info = ['time: 1']
+        env.render()
+        expected = pygame.surfarray.array3d(env.screen)
+        snapshot = pickle.loads(pickle.dumps(env.render_snapshot()))
+        screen = pygame.Surface(env.options.screen_size)
+        draw_snapshot(screen=screen, options=env.options, snapshot=snapshot)
+        np.testing.assert_array_equal(pygame.surfarray.array3d(screen), expected)
+
+
+class TestRenderProcess(unittest.TestCase):
+
+    def test_submit(self):
+        try:
+            import pygame
+        except ImportError:
+            self.skipTest('pygame is not installed')
+        options = Options()
+        options.render = True
+        options.render_process = True
+        env = Dogfight2dEnv(options=options)
+        try:
+            env.reset()
+            process = env.render_process
+            self.assertIsNotNone(process)
+            self.assertIsNone(env.screen)
+            # 仿真不受simulation_rate限制
+            env.update()
+            self.assertTrue(env.should_update())
+            deadline = time.time() + 30
+            # 提交帧的速度比render_fps快，渲染进程跑起来之后就会开始丢帧
+            while process.dropped_frames == 0 and time.time() < deadline:
+                env.update()
+                env.render()
+                time.sleep(0.005)
+            self.assertGreater(process.dropped_frames, 0)
+            self.assertTrue(process.alive)
+            self.assertFalse(env.paused)
+        finally:
+            env.close()
+        self.assertIsNone(env.render_process)
+        self.assertFalse(process.process.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
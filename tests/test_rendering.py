@@ -0,0 +1,110 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from benchmarks.common import drive_agents
+from pydogfight.core.options import Options
+from pydogfight.envs import Dogfight2dEnv
+from pydogfight.utils.models import Waypoint
+from pydogfight.utils.rendering import LRUCache, RenderCache, pygame_load_img, render_cache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evict(self):
+        cache = LRUCache(capacity=2)
+        cache.get('a', lambda: 1)
+        cache.get('b', lambda: 2)
+        self.assertEqual(cache.get('a', lambda: -1), 1)  # a变成最近使用的
+        cache.get('c', lambda: 3)  # 淘汰b
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('b', lambda: -2), -2)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 4)
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import pygame
+        except ImportError:
+            self.skipTest('pygame is not installed')
+        pygame.init()
+        self.cache = RenderCache(capacity=8)
+
+    def tearDown(self):
+        import pygame
+        pygame.quit()
+
+    def test_quantize_angle(self):
+        self.assertEqual(RenderCache.quantize_angle(361.2, 2), 2)
+        self.assertEqual(RenderCache.quantize_angle(-1.2, 2), 358)
+        self.assertAlmostEqual(RenderCache.quantize_angle(45.3, 0), 45.3)
+
+    def test_surface(self):
+        cache = self.cache
+        img = cache.surface('aircraft_red.svg')
+        self.assertIs(img, cache.image('aircraft_red.svg'))
+        rotated = cache.surface('aircraft_red.svg', rotate=90.4, rotate_step=2)
+        # 同一个角度格子里的旋转共用一个Surface
+        self.assertIs(rotated, cache.surface('aircraft_red.svg', rotate=89.6, rotate_step=2))
+        self.assertIsNot(rotated, cache.surface('aircraft_red.svg', rotate=92.1, rotate_step=2))
+        scaled = cache.surface('aircraft_red.svg', scale=(10, 12))
+        self.assertEqual(scaled.get_size(), (10, 12))
+        for angle in range(0, 360, 10):
+            cache.surface('aircraft_red.svg', rotate=angle, rotate_step=2)
+        self.assertEqual(len(cache.surfaces), 8)
+
+    def test_text(self):
+        import pygame
+        cache = self.cache
+        text = cache.text('red_1', size=16)
+        self.assertIs(text, cache.text('red_1', size=16))
+        self.assertIs(cache.font(16), cache.font(16))
+        # pygame重新初始化后字体会重新创建
+        pygame.quit()
+        pygame.init()
+        self.assertIsNot(text, cache.text('red_1', size=16))
+
+    def test_render_rgb_unquantized(self):
+        """默认不量化旋转角度，缓存后画出来的和每次重新加载、旋转的完全一致"""
+        import pygame
+        options = Options()
+        options.red_agents = ['red_1', 'red_2']
+        options.blue_agents = ['blue_1', 'blue_2']
+        options.render_mode = 'rgb_array'
+        options.screen_size = (200, 160)
+        np.random.seed(0)
+        env = Dogfight2dEnv(options=options)
+        env.reset()
+        for step in range(60):
+            if step % 20 == 0:
+                drive_agents(env.battle_area, fire=True)
+            env.update()
+        for k, agent in enumerate(env.battle_area.agents):
+            # 不在量化格子上的航向
+            agent.waypoint = Waypoint.build(x=agent.waypoint.x, y=agent.waypoint.y, psi=37.3 + 61 * k)
+        frame = env.render_rgb()
+        frame = env.render_rgb()  # 第二次从缓存中取
+
+        def uncached(path, rotate=None, scale=None, rotate_step=0):
+            img = pygame_load_img(path)
+            if rotate is not None:
+                img = pygame.transform.rotate(img, rotate)
+            if scale is not None:
+                img = pygame.transform.smoothscale(img, (int(scale[0]), int(scale[1])))
+            return img
+
+        with mock.patch.object(render_cache, 'surface', uncached):
+            expected = env.render_rgb()
+        env.close()
+        np.testing.assert_array_equal(frame, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.common import drive_agents
+from pydogfight.core.actions import Actions
+from pydogfight.core.options import Options
+from pydogfight.envs import (Dogfight2dEnv, EpisodeRecorder, ReplayDataset, ReplayEnv, fire_and_go_to_location_action,
+                             go_to_location_action)
+from pydogfight.utils.episode_file import EpisodeFile
+
+
+class TestReplayDataset(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.tmp = tempfile.TemporaryDirectory()
+        options = Options()
+        options.red_agents = ['red_1']
+        options.blue_agents = ['blue_1']
+        self.env = Dogfight2dEnv(options=options)
+        self.recorder = EpisodeRecorder(env=self.env, folder=self.tmp.name)
+        self.live_obs = []  # 每一轮每一步red_1的观测
+        for steps in [60, 40]:
+            self.play(steps)
+        self.env.reset()
+
+    def tearDown(self):
+        self.env.close()
+        self.tmp.cleanup()
+
+    def play(self, steps: int):
+        env = self.env
+        area = env.battle_area
+        env.reset()
+        obs = [env.gen_agent_obs('red_1').copy()]
+        for step in range(steps):
+            if step % 10 == 0:
+                drive_agents(area, fire=True)
+            env.update()
+            obs.append(env.gen_agent_obs('red_1').copy())
+        self.live_obs.append(np.array(obs))
+
+    def test_dataset(self):
+        dataset = ReplayDataset(self.tmp.name, seed=0)
+        self.assertEqual(len(dataset.files), 2)
+        self.assertEqual(len(dataset), 2 * 60 + 2 * 40)
+
+        arrays = dataset.arrays(0, 'red_1')
+        self.assertIsInstance(arrays['obs'], np.ndarray)
+        self.assertFalse(arrays['obs'].flags.writeable)  # 内存映射
+        np.testing.assert_allclose(arrays['obs'], self.live_obs[0], atol=1e-5)
+        self.assertEqual(arrays['action'].shape, (60, 3))
+        self.assertEqual(int(arrays['action'][0, 0]), Actions.fire_missile)  # 最后一个动作
+        self.assertEqual(int(arrays['action'][1, 0]), Actions.keep)
+        # 和记录时的结束标记、累积奖励一致
+        file = EpisodeFile(self.recorder.episode_path(0))
+        ended = file['terminated'] | file['truncated']
+        np.testing.assert_array_equal(arrays['done'][:-1], ended[1:-1])
+        self.assertTrue(arrays['done'][-1])
+        np.testing.assert_allclose(np.cumsum(arrays['reward']), file['red_reward'][1:] - file['red_reward'][0],
+                                   rtol=1e-4)
+
+        batch = dataset.sample(32)
+        self.assertEqual(batch['obs'].shape, (32, *self.env.agent_observation_space.shape))
+        self.assertEqual(batch['action'].shape, (32, 3))
+        self.assertEqual(batch['reward'].shape, (32,))
+
+        # 全局序号：文件、agent、步数
+        batch = dataset.gather(np.array([0, 59, 120 + 40 + 5]))
+        np.testing.assert_allclose(batch['obs'][0], self.live_obs[0][0], atol=1e-5)
+        np.testing.assert_allclose(batch['next_obs'][1], self.live_obs[0][60], atol=1e-5)
+        self.assertTrue(batch['done'][1])
+        np.testing.assert_array_equal(batch['obs'][2], dataset.arrays(1, 'red_1')['obs'][5])
+
+        # 已经生成的特征文件直接读取
+        feature_path = dataset.feature_path(self.recorder.episode_path(0))
+        mtime = os.path.getmtime(feature_path)
+        ReplayDataset(self.tmp.name)
+        self.assertEqual(os.path.getmtime(feature_path), mtime)
+
+    def test_rl_actions(self):
+        dataset = ReplayDataset([self.recorder.episode_path(0)], action_fn=fire_and_go_to_location_action,
+                                name='fire', agents=['red_1'])
+        action = dataset.arrays(0, 'red_1')['action']
+        self.assertEqual(action.shape, (60, 2))
+        self.assertTrue(np.all(np.abs(action) <= 1))
+        np.testing.assert_array_equal(action[:, 0] > 0, np.arange(60) % 10 == 0)
+
+        # go_to_location_action是RLGoToLocation中waypoint.move的逆运算
+        env = ReplayEnv(self.recorder.episode_path(0))
+        env.reset()
+        agent = env.get_agent('red_1')
+        _, target = env.actions_at(0)[0]
+        angle = go_to_location_action(env, 'red_1', [target])[0]
+        moved = agent.waypoint.move(d=agent.waypoint.distance((target[1], target[2])), angle=angle * 180)
+        self.assertAlmostEqual(moved.x, target[1], delta=1e-2)
+        self.assertAlmostEqual(moved.y, target[2], delta=1e-2)
+
+
+if __name__ == '__main__':
+    unittest.main()
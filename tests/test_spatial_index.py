@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from pydogfight.core.battle_area import BattleArea
+from pydogfight.core.options import Options
+from pydogfight.core.spatial_index import UniformGridIndex
+from pydogfight.core.world_obj import *
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def test_query_contains_all_in_range(self):
+        rng = np.random.default_rng(0)
+        x = rng.uniform(-50000, 50000, size=200)
+        y = rng.uniform(-50000, 50000, size=200)
+        index = UniformGridIndex(cell_size=30000)
+        index.build(x=x, y=y, indices=np.arange(200))
+        for radius in [10000, 30000, 45000]:
+            candidates = set(index.query(x=x[0], y=y[0], radius=radius).tolist())
+            expected = np.flatnonzero(np.hypot(x - x[0], y - y[0]) <= radius)
+            self.assertTrue(set(expected.tolist()).issubset(candidates))
+
+    def test_radar_detect(self):
+        options = Options()
+        options.red_agents = ['red_1', 'red_2']
+        options.blue_agents = ['blue_1', 'blue_2']
+        area = BattleArea(options=options)
+        area.episode_start()
+        agent = area.get_agent('red_1')
+        area.get_agent('blue_1').waypoint = agent.waypoint.move(d=agent.radar_radius + 1000)
+        area.get_agent('blue_2').waypoint = agent.waypoint.move(d=1000)
+
+        self.assertEqual([obj.name for obj in area.detect_aircraft('red_1')], ['blue_2'])
+        self.assertEqual(
+                [obj.name for obj in area.detect_aircraft('red_1', ignore_radar=True)], ['blue_2', 'blue_1'])
+        self.assertIs(area.find_nearest_enemy('red_1'), area.get_agent('blue_2'))
+
+        # 实体状态变化之后缓存失效
+        area.get_agent('blue_2').destroyed = True
+        self.assertIsNone(area.find_nearest_enemy('red_1'))
+        self.assertIs(area.find_nearest_enemy('red_1', ignore_radar=True), area.get_agent('blue_1'))
@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+
+from pydogfight.utils.models import Waypoint
+from pydogfight.utils.intercept import *
+from pydogfight.utils.traj import calc_optimal_path, calc_optimal_paths
+
+
+class TestOptimalPaths(unittest.TestCase):
+
+    def test_same_as_scalar(self):
+        """批量计算的结果和逐个计算一致"""
+        rng = np.random.default_rng(0)
+        starts = np.stack([
+            rng.uniform(-30000, 30000, size=10),
+            rng.uniform(-30000, 30000, size=10),
+            rng.uniform(-180, 180, size=10)], axis=-1)
+        starts[0] = [0, 0, 90]
+        targets = np.stack([rng.uniform(-30000, 30000, size=12), rng.uniform(-30000, 30000, size=12)], axis=-1)
+        targets[0] = [0, 0]  # 和起点重合
+        targets[1] = [1000, 0]  # 在起点正前方
+        targets[2] = [0, 100]  # 在转弯半径内，无法到达
+        radius = rng.uniform(500, 8000, size=10)
+
+        batch = calc_optimal_paths(starts=starts, targets=targets, turn_radius=radius)
+        self.assertEqual(batch.length.shape, (10, 12))
+        for i in range(len(starts)):
+            for j in range(len(targets)):
+                param = calc_optimal_path(
+                        start=Waypoint.build(x=starts[i, 0], y=starts[i, 1], psi=starts[i, 2]),
+                        target=targets[j],
+                        turn_radius=radius[i])
+                if param.length == float('inf'):
+                    self.assertEqual(batch.length[i, j], float('inf'))
+                    continue
+                self.assertAlmostEqual(batch.length[i, j], param.length, places=5)
+                self.assertAlmostEqual(batch.turn_angle[i, j], param.turn_angle, places=5)
+                self.assertAlmostEqual(batch.turn_point[i, j, 0], param.turn_point[0], places=5)
+                self.assertAlmostEqual(batch.turn_point[i, j, 1], param.turn_point[1], places=5)
+
+                batch_param = batch.param(i, j)
+                self.assertEqual(batch_param.turn_center is None, param.turn_center is None)
+                self.assertAlmostEqual(batch_param.target.psi, param.target.psi, places=3)
+
+
+class TestInterceptPoints(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.self_wpts = np.stack([
+            rng.uniform(-30000, 30000, size=50),
+            rng.uniform(-30000, 30000, size=50),
+            rng.uniform(-180, 180, size=50)], axis=-1)
+        self.target_wpts = np.stack([
+            rng.uniform(-30000, 30000, size=50),
+            rng.uniform(-30000, 30000, size=50),
+            rng.uniform(-180, 180, size=50)], axis=-1)
+
+    def assert_same_result(self, result, expected):
+        self.assertEqual(result is None, expected is None)
+        if expected is None:
+            return
+        self.assertAlmostEqual(result.time, expected.time, places=6)
+        self.assertAlmostEqual(result.point[0], expected.point[0], places=4)
+        self.assertAlmostEqual(result.point[1], expected.point[1], places=4)
+
+    def test_same_as_scalar(self):
+        batch = optimal_predict_intercept_points(
+                self_wpts=self.self_wpts, self_speed=1000, self_turn_radius=1000,
+                target_wpts=self.target_wpts, target_speed=300)
+        for k in range(len(batch)):
+            expected = optimal_predict_intercept_point(
+                    self_wpt=self.self_wpts[k], self_speed=1000, self_turn_radius=1000,
+                    target_wpt=self.target_wpts[k], target_speed=300)
+            self.assert_same_result(batch.result(k), expected)
+
+    def test_lead_target(self):
+        """按照预测的拦截点计算航迹长度"""
+        batch = optimal_predict_intercept_points(
+                self_wpts=self.self_wpts, self_speed=1000, self_turn_radius=1000,
+                target_wpts=self.target_wpts, target_speed=300, lead_target=True)
+        for k in range(len(batch)):
+            self_wpt = Waypoint(data=self.self_wpts[k])
+            expected = predict_intercept_point(
+                    target=self.target_wpts[k], target_speed=300, self_speed=1000,
+                    calc_optimal_dis=lambda p: calc_optimal_path(start=self_wpt, target=p, turn_radius=1000).length)
+            self.assert_same_result(batch.result(k), expected)
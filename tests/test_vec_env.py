@@ -0,0 +1,118 @@
+import unittest
+
+import numpy as np
+from stable_baselines3 import PPO
+
+from benchmarks.common import drive_agents
+from pydogfight.core.options import Options
+from pydogfight.envs import Dogfight2dEnv, Dogfight2dVecEnv, Dogfight2dSB3VecEnv
+from pydogfight.utils.models import Waypoint
+
+
+def spread(env: Dogfight2dEnv, k: int):
+    """开局位置是固定的，把第k场对战的飞机上下错开，让每场对战的过程不同"""
+    for i, agent in enumerate(env.battle_area.agents):
+        wpt = agent.waypoint
+        agent.waypoint = Waypoint.build(x=wpt.x, y=wpt.y + 2000 * (k + 1) * (i - 1.5), psi=wpt.psi)
+
+
+def drive(env: Dogfight2dEnv):
+    if int(env.battle_area.time) % 20 == 0:
+        drive_agents(env.battle_area, fire=True)
+
+
+class TestDogfight2dVecEnv(unittest.TestCase):
+
+    def setUp(self):
+        self.options = Options()
+        self.options.red_agents = ['red_1', 'red_2']
+        self.options.blue_agents = ['blue_1', 'blue_2']
+        self.options.max_duration = 20
+
+    def test_step(self):
+        env = Dogfight2dVecEnv(num_envs=3, options=self.options)
+        obs, info = env.reset(seed=0)
+        self.assertEqual(obs.shape, (3, 4, *env.single_agent_observation_space.shape))
+        self.assertEqual(obs.dtype, np.float32)
+        self.assertTrue(env.observation_space.contains(obs))
+
+        done_count = 0
+        for _ in range(30):
+            obs, rewards, terminated, truncated, infos = env.step(np.zeros(env.action_space.shape))
+            self.assertEqual(rewards.shape, (3,))
+            for k in np.flatnonzero(terminated | truncated):
+                done_count += 1
+                self.assertEqual(infos['final_observation'][k].shape, obs[k].shape)
+                self.assertTrue(infos['final_info'][k]['truncated'])
+                # 结束的对战已经自动重置了
+                self.assertEqual(env.envs[k].time, 0)
+        self.assertGreater(done_count, 0)
+        env.close()
+
+    def test_batched_same_as_sequential(self):
+        """各场对战合并计算的过程和每场对战单独update一致"""
+        self.options.max_duration = 120
+        vec_env = Dogfight2dVecEnv(num_envs=3, options=self.options)
+        envs = [Dogfight2dEnv(options=self.options) for _ in range(3)]
+        # 都用批量计算，合并计算和单独计算的差别只有是否合并
+        vec_env.kernel.VECTORIZE_MIN = 1
+        for env in envs:
+            env.battle_area.kernel.VECTORIZE_MIN = 1
+        for env in vec_env.envs + envs:
+            env.add_before_update_handler(drive)
+        vec_env.reset()
+        for k, env in enumerate(envs):
+            env.reset()
+            spread(env, k)
+            spread(vec_env.envs[k], k)
+
+        missile_seen = False
+        for _ in range(50):
+            _, _, terminated, truncated, _ = vec_env.step(np.zeros(vec_env.action_space.shape))
+            self.assertFalse((terminated | truncated).any())  # 结束的对战会自动重置，不再可比
+            for env, expected in zip(vec_env.envs, envs):
+                expected.update()
+                self.assertEqual(list(env.battle_area.objs.keys()), list(expected.battle_area.objs.keys()))
+                for name, obj in env.battle_area.objs.items():
+                    other = expected.battle_area.objs[name]
+                    self.assertEqual(obj.waypoint.x, other.waypoint.x)
+                    self.assertEqual(obj.waypoint.y, other.waypoint.y)
+                    self.assertEqual(obj.destroyed, other.destroyed)
+                missile_seen |= len(env.battle_area.missiles) > 0
+        self.assertTrue(missile_seen)
+        positions = [[agent.waypoint.x for agent in env.battle_area.agents] for env in envs]
+        self.assertNotEqual(positions[0], positions[1])
+        vec_env.close()
+
+    def test_sb3(self):
+        vec_env = Dogfight2dVecEnv(num_envs=2, options=self.options)
+        env = Dogfight2dSB3VecEnv(vec_env)
+        self.assertEqual(env.num_envs, 4)
+        obs = env.reset()
+        self.assertEqual(obs.shape, (4, *env.observation_space.shape))
+
+        # 每个环境一个结果，同一场对战只调用一次
+        infos = env.env_method('gen_info')
+        self.assertEqual(len(infos), 4)
+        self.assertIs(infos[0], infos[1])
+        self.assertIsNot(infos[1], infos[2])
+        self.assertEqual(len(env.env_method('gen_info', indices=[0, 3])), 2)
+        self.assertEqual(len(env.env_method('gen_info', indices=1)), 1)
+
+        try:
+            import pygame
+        except ImportError:
+            pygame = None
+        if pygame is not None:
+            images = env.get_images()
+            self.assertEqual(len(images), 4)
+            height, width = int(self.options.screen_size[1]), int(self.options.screen_size[0])
+            self.assertEqual(images[0].shape, (height, width, 3))
+            self.assertIs(images[0], images[1])
+            self.assertEqual(env.render().shape, (2 * height, 2 * width, 3))
+
+        model = PPO('MlpPolicy', env, n_steps=8, batch_size=16, n_epochs=1, device='cpu')
+        actions, _ = model.predict(obs)
+        self.assertEqual(actions.shape, (4, 3))
+        model.learn(total_timesteps=32)
+        env.close()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pydogfight.core.options import Options
+from pydogfight.envs import Dogfight2dEnv
+from pydogfight.utils.video import FrameWriter, VideoRecorder
+
+
+class TestFrameWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frames = [np.full((8, 6, 3), i * 20, dtype=np.uint8) for i in range(5)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_png(self):
+        from PIL import Image
+        path = os.path.join(self.tmp.name, 'png')
+        writer = FrameWriter(path=path, format='png')
+        for frame in self.frames:
+            self.assertTrue(writer.write(frame))
+        writer.close()
+        self.assertEqual(writer.written_count, 5)
+        self.assertEqual(sorted(os.listdir(path)), [f'{i}.png' for i in range(5)])
+        np.testing.assert_array_equal(np.asarray(Image.open(os.path.join(path, '3.png'))), self.frames[3])
+
+    def test_gif(self):
+        from PIL import Image
+        path = os.path.join(self.tmp.name, 'a.gif')
+        writer = FrameWriter(path=path, format='gif', fps=5)
+        for frame in self.frames:
+            writer.write(frame)
+        writer.close()
+        self.assertEqual(Image.open(path).n_frames, 5)
+
+    def test_drop(self):
+        writer = FrameWriter(path=os.path.join(self.tmp.name, 'drop'), format='png', queue_size=1)
+        results = [writer.write(frame) for frame in self.frames]
+        writer.close()
+        self.assertEqual(writer.written_count, sum(results))
+        self.assertEqual(writer.dropped_count, len(results) - sum(results))
+
+
+class TestVideoRecorder(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import pygame
+        except ImportError:
+            self.skipTest('pygame is not installed')
+        self.tmp = tempfile.TemporaryDirectory()
+        np.random.seed(0)
+        options = Options()
+        options.render_mode = 'rgb_array'
+        options.screen_size = (200, 160)
+        self.env = Dogfight2dEnv(options=options)
+
+    def tearDown(self):
+        self.env.close()
+        self.tmp.cleanup()
+
+    def test_render_rgb(self):
+        env = self.env
+        env.reset()
+        self.assertIsNone(env.screen)  # 没有打开窗口
+        frame = env.render()
+        self.assertEqual(frame.shape, (160, 200, 3))
+        self.assertEqual(frame.dtype, np.uint8)
+        self.assertTrue((frame == 255).any() and (frame != 255).any())
+        out = np.zeros_like(frame)
+        self.assertIs(env.render_rgb(out=out), out)
+        np.testing.assert_array_equal(out, frame)
+        # rgb_array模式下也会生成画图用的航迹
+        agent = env.get_agent(env.options.red_agents[0])
+        agent.go_to_location(target=(0, 0))
+        self.assertIsNotNone(agent.render_route)
+
+    def test_record(self):
+        env = self.env
+        recorder = VideoRecorder(env=env, folder=self.tmp.name, stride=3, episode_stride=2, format='png')
+        for _ in range(3):
+            env.reset()
+            for _ in range(7):
+                env.update()
+        env.reset()  # 没有进行过的一轮不会录制
+        recorder.close()
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['0', '2'])
+        # 第1、3、6次update，以及最后一帧
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, '0'))), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
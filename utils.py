@@ -9,6 +9,10 @@ import pydogfight
 import os
 import sys
 import time
+import typing
+import queue
+import traceback
+import multiprocessing
 from datetime import datetime
 import json
 from pybts.display import render_node
@@ -17,18 +21,30 @@ import yaml
 from pydogfight.utils import *
 from pydogfight.policy.bt.nodes_rl import RLNode
 from pydogfight.utils.logger import TensorboardLogger
+from pydogfight.utils.video import VideoRecorder
+from pydogfight.envs.recorder import EpisodeRecorder
 import jinja2
 
 
 def folder_run_id(folder: str):
+    """
+    分配一个新的run_id，并创建对应的目录folder/run_id
+    多个进程同时使用同一个输出目录时，通过创建目录（已存在则失败）来保证每个run_id只分配给一个进程
+    """
     os.makedirs(folder, exist_ok=True)
     id_path = os.path.join(folder, "run_id.txt")
     if os.path.exists(id_path):
         with open(id_path, "r") as f:
-            run_id = int(f.read())
+            run_id = int(f.read() or 0)
     else:
         run_id = 0
-    run_id += 1
+    while True:
+        run_id += 1
+        try:
+            os.makedirs(os.path.join(folder, str(run_id)))
+            break
+        except FileExistsError:
+            continue
     with open(id_path, mode="w") as f:
         f.write('{}'.format(run_id))
     return run_id
@@ -130,17 +146,8 @@ class BTManager:
         self.title = config.get('title', config['output'])
         self.desc = config.get('desc', '')
 
-        options = Options()
-        if 'options' in config:
-            options.load_dict(config['options'])
-
-        options.validate()
-
-        if options.device == 'auto':
-            options.device = get_torch_device(options.device)
-
-        env = Dogfight2dEnv(options=options)
-        env.reset()
+        env = create_env(config)
+        options = env.options
         self.config = config
 
         self.env = env
@@ -179,8 +186,30 @@ class BTManager:
         self.env.add_episode_end_handler(lambda _: self.on_episode_end())
         self.env.add_after_update_handler(lambda _: self.after_update())
 
+        # 录制对战画面（不需要显示窗口），配置项是VideoRecorder的参数，例如 video: { stride: 10, format: gif }
+        self.video_recorder: VideoRecorder | None = None
+        if config.get('video'):
+            if self.env.render_mode != 'human':
+                # 录制时也要生成画图用的航迹（Options.render_enabled）
+                options.render_mode = 'rgb_array'
+                self.env.render_mode = 'rgb_array'
+            self.video_recorder = VideoRecorder(
+                    env=self.env,
+                    folder=os.path.join(self.output_run_id, 'video'),
+                    **(config['video'] if isinstance(config['video'], dict) else { }))
+
+        # 把每一轮的状态和动作记录成二进制文件（可以用ReplayEnv回放），例如 record: { episode_stride: 10 }
+        self.episode_recorder: EpisodeRecorder | None = None
+        if config.get('record'):
+            self.episode_recorder = EpisodeRecorder(
+                    env=self.env,
+                    folder=os.path.join(self.output_run_id, 'records'),
+                    **(config['record'] if isinstance(config['record'], dict) else { }))
+
         self.train = train
         self.pbar: tqdm | None = None
+        self.show_pbar = True  # 是否在终端显示进度条（多进程运行时由主进程统一显示）
+        self.progress_handlers: list[typing.Callable[['BTManager'], None]] = []  # 每一轮结束后回调
 
         self.logger_dict: dict[str, TensorboardLogger] = { }
         for color in ['red', 'blue']:
@@ -224,19 +253,30 @@ class BTManager:
         merge_tow_dicts(new_game_info, self.env.game_info)
 
     def on_episode_end(self):
-        reward_dict = { }
-        for policy in self.policies:
-            if not isinstance(policy, BTPolicy):
-                continue
-            if self.track > 0:
+        if self.track > 0:
+            for policy in self.policies:
+                if not isinstance(policy, BTPolicy):
+                    continue
                 board = self.board_dict[policy.agent_name]
                 board.track({
                     **self.env.game_info,
                     policy.agent_name: self.env.get_agent(policy.agent_name).to_dict(),
                 })
-
-            reward_dict[policy.agent.name] = deep_copy(policy.tree.context.get('reward', { }))
-        self.update_reward_to_game_info(reward_dict=reward_dict)
+        self.record_episode_result(episode_result(env=self.env, policies=self.policies))
+
+    def merge_episode_result(self, result: dict):
+        """合并其他进程里跑完的一轮对战结果（self.env本身没有进行这轮对战）"""
+        self.env.battle_area.merge_episode_stats(result)
+        self.env.update_game_info()
+        self.env.game_info['time'] = int(result['time'])
+        self.record_episode_result(result)
+
+    def record_episode_result(self, result: dict):
+        """
+        记录一轮对战的结果：奖励、最近胜率、tensorboard
+        :param result: episode_result的返回值，对战的统计数据已经合并到了self.env.game_info里
+        """
+        self.update_reward_to_game_info(reward_dict=result['reward'])
         self.env.game_info['recent'] = self.result_recorder.record()
 
         # if self.track > 0:
@@ -258,11 +298,11 @@ class BTManager:
                 {
                     'reward': f"{dict_get(self.env.game_info, 'red.reward', 0):.2f} vs {dict_get(self.env.game_info, 'blue.reward', 0):.2f}",
                     # 'reward_evade': f"{dict_get(self.env.game_info, 'red.reward_evade', 0):.2f} vs {dict_get(self.env.game_info, 'blue.reward_evade', 0):.2f}",
-                    'winner': self.env.battle_area.winner,
+                    'winner': result['winner'],
                     'r_win' : f"{dict_get(self.env.game_info, 'recent.red.win', 0)}:{dict_get(self.env.game_info, 'recent.blue.win', 0)}:{dict_get(self.env.game_info, 'recent.red.draw', 0)}",
                     'win'   : f"{self.env.game_info['red']['win']}:{self.env.game_info['blue']['win']}:{self.env.game_info['red']['draw']}",
                     # 'draw'      : f"{self.env.game_info['red']['draw']}",
-                    'time'  : f'{self.env.time:.0f}/{self.env.battle_area.accum_time:.0f}',
+                    'time'  : f"{result['time']:.0f}/{self.env.battle_area.accum_time:.0f}",
                     # 'm_fire'    : f"{self.env.game_info['red']['missile_fired_count']} vs {self.env.game_info['blue']['missile_fired_count']}",
                     # 'm_miss'    : f"{self.env.game_info['red']['missile_miss_count']} vs {self.env.game_info['blue']['missile_miss_count']}",
                     # 'm_hit'     : f"{self.env.game_info['red']['missile_hit_enemy_count']} vs {self.env.game_info['blue']['missile_hit_enemy_count']}"
@@ -271,30 +311,30 @@ class BTManager:
                 })
 
         for color in ['red', 'blue']:
-            self.logger_dict[color].record(f'env/time', self.env.time)
+            self.logger_dict[color].record(f'env/time', result['time'])
             self.logger_dict[color].record(f'env/cost_time', time.time() - self.start_time)
 
-        for agent in self.env.battle_area.agents:
+        for agent in result['agent'].values():
             # 存活时间
-            self.logger_dict[agent.color].record_mean(f'agent/survival_time', agent.survival_time)
+            self.logger_dict[agent['color']].record_mean(f'agent/survival_time', agent['survival_time'])
             # 平均存活时间
-            self.logger_dict[agent.color].record_mean_weighted(f'agent/survival_time', agent.survival_time)
+            self.logger_dict[agent['color']].record_mean_weighted(f'agent/survival_time', agent['survival_time'])
             # # 规避成功率
-            self.logger_dict[agent.color].record_mean_weighted(f'agent/missile_evade_success_rate',
-                                                               agent.missile_evade_success_count,
-                                                               agent.missile_evade_success_count + agent.missile_hit_self_count)
+            self.logger_dict[agent['color']].record_mean_weighted(f'agent/missile_evade_success_rate',
+                                                               agent['missile_evade_success_count'],
+                                                               agent['missile_evade_success_count'] + agent['missile_hit_self_count'])
 
-            self.logger_dict[agent.color].record_mean_weighted(f'agent/missile_evade_success_rate',
-                                                               agent.missile_evade_success_count,
-                                                               agent.missile_evade_success_count + agent.missile_hit_self_count)
+            self.logger_dict[agent['color']].record_mean_weighted(f'agent/missile_evade_success_rate',
+                                                               agent['missile_evade_success_count'],
+                                                               agent['missile_evade_success_count'] + agent['missile_hit_self_count'])
 
             # 命中率
-            self.logger_dict[agent.color].record_mean_weighted(f'agent/missile_hit_enemy_rate',
-                                                               agent.missile_hit_enemy_count,
-                                                               agent.missile_fired_count)
-            self.logger_dict[agent.color].record_mean_weighted(f'agent/missile_hit_enemy_rate',
-                                                               agent.missile_hit_enemy_count,
-                                                               agent.missile_fired_count)
+            self.logger_dict[agent['color']].record_mean_weighted(f'agent/missile_hit_enemy_rate',
+                                                               agent['missile_hit_enemy_count'],
+                                                               agent['missile_fired_count'])
+            self.logger_dict[agent['color']].record_mean_weighted(f'agent/missile_hit_enemy_rate',
+                                                               agent['missile_hit_enemy_count'],
+                                                               agent['missile_fired_count'])
 
         for color in ['red', 'blue']:
 
@@ -319,8 +359,11 @@ class BTManager:
             # if recent_v is not None:
             #     self.logger.record_mean(f'{color}/recent/{k}', recent_v)
 
-        print()
+        if self.show_pbar:
+            print()
         self.pbar.update(1)
+        for handler in self.progress_handlers:
+            handler(self)
         for k, v in self.logger_dict.items():
             v.dump(self.env.episode)
         self.write(f'run.txt', f'{self.env.episode}: {self.pbar.postfix}\n', 'a')
@@ -331,6 +374,9 @@ class BTManager:
     def after_update(self):
         self.update_render_info()
 
+    def add_progress_handler(self, handler: typing.Callable[['BTManager'], None]):
+        self.progress_handlers.append(handler)
+
     def add_bt_policy(
             self,
             agent_name: str,
@@ -338,31 +384,15 @@ class BTManager:
             tree_name_suffix: str = '',
             context: dict = None
     ):
-        self.builder.context = context
-        tree = DogfightTree(
-                env=self.env,
-                agent_name=agent_name,
-                root=self.builder.build_from_file(filepath),
-                name=agent_name + tree_name_suffix,
-                context={
-                    'title'        : self.title,
-                    'desc'         : self.desc,
-                    'filename'     : self.builder.get_relative_filename(filepath=filepath),
-                    'filepath'     : self.builder.find_filepath(filepath=filepath),
-                    'output'       : self.output,
-                    'output_run_id': self.output_run_id,
-                    'run_id'       : self.run_id,
-                    'episode'      : self.env.episode,
-                    'agent_name'   : agent_name,
-                    **(context or { })
-                }
-        ).setup()
-
-        policy = BTPolicy(
+        policy = build_bt_policy(
                 env=self.env,
-                tree=tree,
+                builder=self.builder,
                 agent_name=agent_name,
-        )
+                filepath=filepath,
+                tree_name_suffix=tree_name_suffix,
+                run_context=self.run_context(),
+                context=context)
+        tree = policy.tree
 
         board = pybts.Board(tree=policy.tree, log_dir=self.output_run_id)
         board.clear()
@@ -380,7 +410,7 @@ class BTManager:
                 if track_throttle.should_call(self.env.time):
                     board.track({
                         **self.env.game_info,
-                        'context': policy.tree.context,
+                        'context': policy.tree.context_snapshot(),
                         # agent_name: env.get_agent(agent_name).to_dict(),
                     })
 
@@ -423,19 +453,30 @@ class BTManager:
 
         self.env.render_info = render_info
 
+    def run_context(self) -> dict:
+        """行为树里可以用到的本次运行的信息"""
+        return {
+            'title'        : self.title,
+            'desc'         : self.desc,
+            'output'       : self.output,
+            'output_run_id': self.output_run_id,
+            'run_id'       : self.run_id,
+        }
+
     def update_context(self, context: dict):
         for policy in self.policies:
             if isinstance(policy, BTPolicy):
                 policy.tree.context.update(context)
 
     def run(self, episodes: int):
-        self.pbar = tqdm(total=episodes, desc=f'[{self.output_run_id}] train={self.train}')
+        self.pbar = tqdm(total=episodes, desc=f'[{self.output_run_id}] train={self.train}', disable=not self.show_pbar)
         self.update_context({
             'train'  : self.train,
             'episode': self.env.episode,
         })
 
-        print('开始', self.config)
+        if self.show_pbar:
+            print('开始', self.config)
         env = self.env
 
         policy = MultiAgentPolicy(policies=self.policies)
@@ -450,31 +491,14 @@ class BTManager:
             self.update_context({
                 'episode': self.env.episode,
             })
-            while env.isopen:
-
-                if env.should_update():
-                    policy.take_action()
-                    policy.put_action()
-                    env.update()
-                    info = env.gen_info()
-                    if info['terminated'] or info['truncated']:
-                        policy.take_action()
-                        # 在terminated之后还要再触发一次行为树，不然没办法将最终奖励给到行为树里的节点
-                        # 而且需要强制将所有的RLNode都触发一遍，避免因为条件节点关系部分漏掉
-                        for p in self.policies:
-                            if isinstance(p, BTPolicy):
-                                for node in p.tree.root.iterate():
-                                    if isinstance(node, RLNode):
-                                        node.take_action()
-                        break
-
-                if env.should_render():
-                    env.render()
-
+            play_episode(env=env, policies=self.policies, policy=policy)
             env_time += self.env.time
             env.reset()
             policy.reset()
 
+        if self.video_recorder is not None:
+            self.video_recorder.close()
+
         cost_time = time.time() - self.start_time
         self.write(f'耗时={cost_time:.0f}.txt', '\n'.join(
                 [
@@ -484,6 +508,65 @@ class BTManager:
                 ]
         ))
 
+    def run_parallel(self, episodes: int, workers: int, seed: int | None = None):
+        """
+        评估模式（不训练）下把episodes轮对战分给多个子进程并行执行，子进程用同样的配置创建环境和行为树，
+        每轮对战结束后把统计数据（episode_result）通过队列发回主进程，由主进程更新ResultRecorder和tensorboard
+        行为树的运行数据（track）不会记录
+        :param seed: 第i个子进程使用seed+i作为随机种子
+        """
+        assert not self.train, 'run_parallel only supports evaluation (train=False)'
+        workers = max(1, min(workers, episodes))
+        shards = [episodes // workers + int(i < episodes % workers) for i in range(workers)]
+
+        self.pbar = tqdm(total=episodes, desc=f'[{self.output_run_id}] workers={workers}', disable=not self.show_pbar)
+        self.start_time = time.time()
+        config = merge_config(self.config, { 'options': { 'render': False } })
+
+        ctx = multiprocessing.get_context('spawn')
+        result_queue = ctx.Queue()
+        processes = [
+            ctx.Process(
+                    target=_run_eval_shard,
+                    args=(i, config, shards[i], None if seed is None else seed + i, self.run_context(), result_queue),
+                    daemon=True)
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        running = set(range(workers))
+        try:
+            while len(running) > 0:
+                try:
+                    kind, shard, data = result_queue.get(timeout=1)
+                except queue.Empty:
+                    for i in running:
+                        if not processes[i].is_alive() and processes[i].exitcode != 0:
+                            raise RuntimeError(f'evaluation worker {i} exited with code {processes[i].exitcode}')
+                    continue
+                if kind == 'episode':
+                    self.merge_episode_result(data)
+                elif kind == 'done':
+                    running.discard(shard)
+                elif kind == 'error':
+                    raise RuntimeError(f'evaluation worker {shard} failed:\n{data}')
+        finally:
+            for process in processes:
+                if process.is_alive() and len(running) > 0:
+                    process.terminate()
+                process.join()
+
+        cost_time = time.time() - self.start_time
+        self.write(f'耗时={cost_time:.0f}.txt', '\n'.join(
+                [
+                    f'耗时: {cost_time:.2f} 秒',
+                    f'平均耗时 {cost_time / episodes: .2f}秒',
+                    f'平局局时 {self.env.battle_area.accum_time / max(self.env.episode, 1): .0f}秒',
+                    f'进程数 {workers}',
+                ]
+        ))
+
     def episode_file(self, file: str):
         return os.path.join('episodes', str(self.env.episode), file)
 
@@ -517,6 +600,125 @@ class BTManager:
                                                      'children_count'])
 
 
+def create_env(config: dict) -> Dogfight2dEnv:
+    """根据配置创建环境"""
+    options = Options()
+    if 'options' in config:
+        options.load_dict(config['options'])
+
+    options.validate()
+
+    if options.device == 'auto':
+        options.device = get_torch_device(options.device)
+
+    env = Dogfight2dEnv(options=options)
+    env.reset()
+    return env
+
+
+def build_bt_policy(
+        env: Dogfight2dEnv,
+        builder: bt.CustomBTBuilder,
+        agent_name: str,
+        filepath: str,
+        tree_name_suffix: str = '',
+        run_context: dict = None,
+        context: dict = None) -> BTPolicy:
+    """从行为树文件创建agent的策略"""
+    builder.context = context
+    tree = DogfightTree(
+            env=env,
+            agent_name=agent_name,
+            root=builder.build_from_file(filepath),
+            name=agent_name + tree_name_suffix,
+            context={
+                **(run_context or { }),
+                'filename'  : builder.get_relative_filename(filepath=filepath),
+                'filepath'  : builder.find_filepath(filepath=filepath),
+                'episode'   : env.episode,
+                'agent_name': agent_name,
+                **(context or { })
+            }
+    ).setup()
+
+    return BTPolicy(
+            env=env,
+            tree=tree,
+            agent_name=agent_name,
+    )
+
+
+def play_episode(env: Dogfight2dEnv, policies: list[Policy], policy: Policy):
+    """运行一轮对战直到结束（不会reset）"""
+    while env.isopen:
+
+        if env.should_update():
+            policy.take_action()
+            policy.put_action()
+            env.update()
+            info = env.gen_info()
+            if info['terminated'] or info['truncated']:
+                policy.take_action()
+                # 在terminated之后还要再触发一次行为树，不然没办法将最终奖励给到行为树里的节点
+                # 而且需要强制将所有的RLNode都触发一遍，避免因为条件节点关系部分漏掉
+                for p in policies:
+                    if isinstance(p, BTPolicy):
+                        for node in p.tree.root.iterate():
+                            if isinstance(node, RLNode):
+                                node.take_action()
+                break
+
+        if env.should_render():
+            env.render()
+
+
+def episode_result(env: Dogfight2dEnv, policies: list[Policy]) -> dict:
+    """
+    一轮对战的结果，在episode_end之后调用，可以序列化（多进程评估时由子进程发给主进程）
+    :return: BattleArea.episode_stats()，再加上每个agent行为树里的奖励reward
+    """
+    result = env.battle_area.episode_stats()
+    result['reward'] = { }
+    for policy in policies:
+        if isinstance(policy, BTPolicy):
+            result['reward'][policy.agent.name] = deep_copy(policy.tree.context.get('reward', { }))
+    return result
+
+
+def _run_eval_shard(
+        shard: int, config: dict, episodes: int, seed: int | None, run_context: dict,
+        result_queue: multiprocessing.Queue):
+    """BTManager.run_parallel的子进程：运行episodes轮对战，每轮的结果放进result_queue"""
+    try:
+        if seed is not None:
+            from stable_baselines3.common.utils import set_random_seed
+            set_random_seed(seed)
+        env = create_env(config)
+        builder = bt.CustomBTBuilder(folders=[config['output'], 'scripts'])
+        policies: list[Policy] = []
+        for agent_name in env.options.agents():
+            agent_color = 'red' if agent_name in env.options.red_agents else 'blue'
+            policies.append(build_bt_policy(
+                    env=env,
+                    builder=builder,
+                    agent_name=agent_name,
+                    filepath=config['policy'].get(agent_name, config['policy'].get(agent_color)),
+                    run_context=run_context,
+                    context=config.get('context', { })))
+        env.add_episode_end_handler(lambda _: result_queue.put(('episode', shard, episode_result(env, policies))))
+
+        policy = MultiAgentPolicy(policies=policies)
+        for i in range(episodes):
+            for p in policies:
+                p.tree.context.update({ 'train': False, 'episode': env.episode })
+            play_episode(env=env, policies=policies, policy=policy)
+            env.reset()
+            policy.reset()
+        result_queue.put(('done', shard, None))
+    except Exception:
+        result_queue.put(('error', shard, traceback.format_exc()))
+
+
 class ResultRecorder:
     """
     对战结果记录